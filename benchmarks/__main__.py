@@ -0,0 +1,70 @@
+"""
+Run the benchmarks:
+
+    python -m benchmarks [-k FILTER] [--output results.json] [--baseline baseline.json]
+
+With `--baseline`, exits with status 1 if any benchmark is slower than the
+baseline by more than `--threshold`.
+"""
+import argparse
+import os
+import sys
+
+import django
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help="only run benchmarks whose names contain this (may be repeated)")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks and exit")
+    parser.add_argument('--repeat', type=int, default=5, help="timings per benchmark (default: 5)")
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help="seconds to spend timing each benchmark (default: 0.5)")
+    parser.add_argument('-o', '--output', help="write results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results in this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="slowdown counted as a regression, as a fraction (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+    from benchmarks import cases  # noqa: F401 (registers the benchmarks)
+    from benchmarks.harness import BENCHMARKS, compare, format_time, load, run, save
+
+    names = [n for n in BENCHMARKS if not args.filter or any(f in n for f in args.filter)]
+    if args.list:
+        print('\n'.join(names))
+        return 0
+
+    width = max(len(n) for n in names) if names else 0
+    def progress(name: str, stats: dict) -> None:
+        print(f"{name:<{width}}  {format_time(stats['median']):>10}  ±{format_time(stats['stdev'])}", flush=True)
+
+    results = run(names, args.repeat, args.min_time, progress)
+    if args.output:
+        save(results, args.output)
+
+    if not args.baseline:
+        return 0
+
+    comparisons = compare(results, load(args.baseline), args.threshold)
+    print()
+    for c in comparisons:
+        flag = '  REGRESSION' if c['regression'] else ''
+        print(
+            f"{c['name']:<{width}}  {format_time(c['baseline']):>10} -> "
+            f"{format_time(c['current']):>10}  {c['ratio']:5.2f}x{flag}"
+        )
+    regressions = [c for c in comparisons if c['regression']]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+The benchmarks. Importing this module registers them; Django must be set up
+first, since some of them use the database.
+"""
+import json
+from dataclasses import dataclass
+from itertools import cycle
+
+from flippy import Flippy
+from flippy.backends import DjangoBackend, FlipperCloudBackend, MemoryBackend
+from flippy.core import Feature, FeatureEncoder
+from flippy.gates import PercentageOfActorsGate
+
+from benchmarks.harness import benchmark
+from tests.fake_flipper_cloud import FakeFlipperCloud
+
+FEATURE_COUNTS = (10, 1000, 10000)
+ACTOR_COUNTS = (10, 1000, 10000)
+CATALOG_SIZE = 100
+
+
+@dataclass
+class User:
+    pk: int
+
+
+@dataclass
+class Account:
+    number: str
+
+    def get_flipper_id(self):
+        return f'Account;{self.number}'
+
+
+def make_feature(
+        key: str,
+        boolean: bool | None = None,
+        actors: int = 0,
+        groups: int = 0,
+        percentage_of_actors: int | None = None,
+        percentage_of_time: int | None = None,
+    ) -> Feature:
+    feature = Feature(key)
+    feature.boolean_gate.value = boolean
+    feature.actors_gate.value = [f'User;{i}' for i in range(actors)]
+    feature.groups_gate.value = [f'group_{i}' for i in range(groups)]
+    feature.percentage_of_actors_gate.value = percentage_of_actors
+    feature.percentage_of_time_gate.value = percentage_of_time
+    return feature
+
+
+def catalog(count: int = CATALOG_SIZE, prefix: str = 'feature') -> list[Feature]:
+    "A mix of gates, roughly like a real set of flags."
+    features = []
+    for i in range(count):
+        match i % 5:
+            case 0:
+                features.append(make_feature(f'{prefix}_{i}', boolean=True))
+            case 1:
+                features.append(make_feature(f'{prefix}_{i}', actors=20))
+            case 2:
+                features.append(make_feature(f'{prefix}_{i}', groups=3))
+            case 3:
+                features.append(make_feature(f'{prefix}_{i}', percentage_of_actors=25))
+            case 4:
+                features.append(make_feature(f'{prefix}_{i}'))
+    return features
+
+
+def memory_backend(features: list[Feature]) -> MemoryBackend:
+    backend = MemoryBackend()
+    for feature in features:
+        backend.add_feature(feature)
+    return backend
+
+
+def as_json(features: list[Feature]) -> str:
+    return json.dumps({f.key: f for f in features}, cls=FeatureEncoder)
+
+
+# Flippy.is_enabled, by gate type
+
+GATES = {
+    'boolean': dict(boolean=True),
+    'off': dict(),
+    'actors': dict(actors=100),
+    'groups': dict(groups=10),
+    'percentage_of_actors': dict(percentage_of_actors=50),
+    'percentage_of_time': dict(percentage_of_time=50),
+}
+
+def _is_enabled_for_gate(gates: dict):
+    def setup():
+        flippy = Flippy(memory_backend([make_feature('f', **gates)]))
+        user = User(50)
+        return lambda: flippy.is_enabled('f', user)
+    return setup
+
+for _gate, _gates in GATES.items():
+    benchmark(f'is_enabled[gate={_gate}]')(_is_enabled_for_gate(_gates))
+
+
+# Flippy.is_enabled, by the number of actors (the target isn't one of them)
+
+def _is_enabled_for_actors(count: int):
+    def setup():
+        flippy = Flippy(memory_backend([make_feature('f', actors=count)]))
+        user = User(-1)
+        return lambda: flippy.is_enabled('f', user)
+    return setup
+
+for _count in ACTOR_COUNTS:
+    benchmark(f'is_enabled[actors={_count}]')(_is_enabled_for_actors(_count))
+
+
+# Flippy.is_enabled, by the number of features in the backend
+
+def _is_enabled_for_features(count: int):
+    def setup():
+        flippy = Flippy(memory_backend(catalog(count)))
+        user = User(1)
+        keys = cycle(f'feature_{i}' for i in range(0, count, max(1, count // 10)))
+        return lambda: flippy.is_enabled(next(keys), user)
+    return setup
+
+for _count in FEATURE_COUNTS:
+    benchmark(f'is_enabled[features={_count}]')(_is_enabled_for_features(_count))
+
+
+@benchmark('is_enabled[memoized]')
+def _():
+    flippy = Flippy(memory_backend([make_feature('f', actors=20)]), memoize=True)
+    user = User(1)
+    return lambda: flippy.is_enabled('f', user)
+
+
+@benchmark('is_enabled[missing]')
+def _():
+    flippy = Flippy(MemoryBackend())
+    return lambda: flippy.is_enabled('missing')
+
+
+# Turning targets into Flipper IDs
+
+@benchmark('_to_flipper_id[pk]')
+def _():
+    flippy = Flippy(MemoryBackend())
+    user = User(42)
+    return lambda: flippy._to_flipper_id(user)
+
+
+@benchmark('_to_flipper_id[get_flipper_id]')
+def _():
+    flippy = Flippy(MemoryBackend())
+    account = Account('A-42')
+    return lambda: flippy._to_flipper_id(account)
+
+
+# Serialization
+
+for _count in (10, 1000):
+    def _from_api(count=_count):
+        payload = make_feature('f', actors=count, groups=3, percentage_of_actors=10).to_api()
+        return lambda: Feature.from_api(payload)
+    benchmark(f'Feature.from_api[actors={_count}]')(_from_api)
+
+    def _to_api(count=_count):
+        feature = make_feature('f', actors=count, groups=3, percentage_of_actors=10)
+        return feature.to_api
+    benchmark(f'Feature.to_api[actors={_count}]')(_to_api)
+
+
+@benchmark('PercentageOfActorsGate.is_open')
+def _():
+    gate = PercentageOfActorsGate(50)
+    return lambda: gate.is_open('User;12345', 'my_cool_feature')
+
+
+# Backends
+
+@benchmark('MemoryBackend.get')
+def _():
+    backend = memory_backend(catalog())
+    return lambda: backend.get('feature_1')
+
+
+@benchmark(f'MemoryBackend.get_all[features={CATALOG_SIZE}]')
+def _():
+    return memory_backend(catalog()).get_all
+
+
+@benchmark(f'MemoryBackend.from_json[features={CATALOG_SIZE}]')
+def _():
+    backend = MemoryBackend()
+    state = as_json(catalog())
+    return lambda: backend.from_json(state)
+
+
+def django_backend(features: list[Feature]) -> DjangoBackend:
+    backend = DjangoBackend()
+    backend.from_json(as_json(features))
+    return backend
+
+
+@benchmark('DjangoBackend.get')
+def _():
+    backend = django_backend(catalog())
+    return lambda: backend.get('feature_1')
+
+
+@benchmark(f'DjangoBackend.get_all[features={CATALOG_SIZE}]')
+def _():
+    return django_backend(catalog()).get_all
+
+
+@benchmark(f'DjangoBackend.from_json[features={CATALOG_SIZE},unchanged]')
+def _():
+    features = catalog()
+    backend = django_backend(features)
+    state = as_json(features)
+    return lambda: backend.from_json(state)
+
+
+@benchmark(f'DjangoBackend.from_json[features={CATALOG_SIZE},changed]')
+def _():
+    # alternate between two catalogs, so that every call rewrites everything
+    states = cycle([as_json(catalog(prefix='a')), as_json(catalog(prefix='b'))])
+    backend = django_backend([])
+    return lambda: backend.from_json(next(states))
+
+
+@benchmark('FlipperCloudBackend.get[fake]')
+def _():
+    cloud = FakeFlipperCloud()
+    for feature in catalog():
+        cloud.backend.add_feature(feature)
+    backend = FlipperCloudBackend('token', transport=cloud.transport())
+    return lambda: backend.get('feature_1')
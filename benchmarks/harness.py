@@ -0,0 +1,121 @@
+"""
+A small harness for timing hot paths and comparing the results against a
+baseline. Benchmarks are registered with `@benchmark(name)` on a setup
+function, which does any expensive preparation and returns the function to
+time.
+"""
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable
+
+import django
+
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    "Register a setup function returning the function to time."
+    def register(setup: Callable[[], Callable[[], object]]):
+        if name in BENCHMARKS:
+            raise ValueError(f"{name} is already a benchmark")
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, min_time: float = 0.5) -> dict:
+    """
+    Time `fn`, in seconds per call. Calls are looped so that each of the
+    `repeat` timings takes at least `min_time / repeat` seconds.
+    """
+    timer = timeit.Timer(fn)
+    target = min_time / repeat
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= target:
+            break
+        if elapsed * 10 < target:
+            number *= 10
+        else:
+            number = math.ceil(number * target / elapsed)
+
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return {
+        'median': statistics.median(times),
+        'min': min(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'loops': number,
+        'repeat': repeat,
+    }
+
+
+def run(
+        names: list[str] | None = None,
+        repeat: int = 5,
+        min_time: float = 0.5,
+        progress: Callable[[str, dict], None] | None = None,
+    ) -> dict:
+    "Run the named benchmarks (by default, all of them), returning JSON-friendly results."
+    results = {}
+    for name in names if names is not None else BENCHMARKS:
+        fn = BENCHMARKS[name]()
+        results[name] = measure(fn, repeat, min_time)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+        },
+        'benchmarks': results,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = 0.2) -> list[dict]:
+    """
+    Compare medians of the benchmarks in both `results` and `baseline`.
+    Each comparison's `ratio` is current time over baseline time; it's a
+    regression when that's more than `1 + threshold`.
+    """
+    comparisons = []
+    for name, current in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        ratio = current['median'] / base['median'] if base['median'] else math.inf
+        comparisons.append({
+            'name': name,
+            'baseline': base['median'],
+            'current': current['median'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return comparisons
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results: dict, path: str) -> None:
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
@@ -0,0 +1,269 @@
+"""
+Load-test testproj's pages with each backend configuration:
+
+    python -m benchmarks.load [--configs memory,django,...] [--flags 100] [--concurrency 4]
+
+Each configuration runs in its own process, since Flippy builds its backend
+once per process. The process seeds `--flags` flags (plus testproj's
+`background_red`) with a mix of gates, then sends `--requests` requests from
+`--concurrency` threads through Django's test client, choosing pages from
+`PAGES` with a seeded random mix. It reports requests per second, latency
+percentiles, and SQL queries per request.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# page -> weight
+PAGES = {
+    '/': 1,
+    '/app': 4,
+    '/flags?count=20': 2,
+}
+
+
+def _chaos():
+    return {
+        'FLIPPY_BACKEND': 'ChaosBackend',
+        'FLIPPY_ARGS': {
+            'inner': 'DjangoBackend',
+            'latency_distribution': ('lognormal', -7, 0.5),  # about 1ms
+            'error_rate': 0.01,
+            'errors': ('unavailable', 'timeout'),
+            'seed': 42,
+        },
+    }
+
+
+def _cloud():
+    from tests.fake_flipper_cloud import FakeFlipperCloud
+    cloud = FakeFlipperCloud(latency=0.002, seed=42)
+    settings = {
+        'FLIPPY_BACKEND': 'FlipperCloudBackend',
+        'FLIPPY_ARGS': {'token': 'load-test', 'transport': cloud.transport()},
+    }
+    return settings, cloud.backend
+
+
+# name -> Flippy settings (or a function returning them, and the backend to seed)
+CONFIGS = {
+    'memory': {'FLIPPY_BACKEND': 'MemoryBackend'},
+    'django': {'FLIPPY_BACKEND': 'DjangoBackend'},
+    'snapshot': {'FLIPPY_BACKEND': 'DjangoSnapshotBackend'},
+    'layered': {'FLIPPY_BACKEND': [('MemoryCache', {'ttl': 5}), 'DjangoBackend']},
+    'chaos': _chaos,
+    'cloud': _cloud,
+}
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def authoritative(backend):
+    "The backend which actually stores state, inside any wrappers or caches."
+    while True:
+        if hasattr(backend, 'inner'):
+            backend = backend.inner
+        elif hasattr(backend, 'backend'):
+            backend = backend.backend
+        else:
+            return backend
+
+
+def setup_django(name: str, database: str):
+    "Configure Django with testproj's settings, the named backend, and a scratch database."
+    sys.path.insert(0, str(ROOT / 'testproj'))
+    sys.path.insert(0, str(ROOT))
+
+    import django
+    from django.conf import settings
+    from testproj import settings as testproj_settings
+
+    config = CONFIGS[name]
+    seed_backend = None
+    if callable(config):
+        config = config()
+        if isinstance(config, tuple):
+            config, seed_backend = config
+
+    overrides = {k: getattr(testproj_settings, k) for k in dir(testproj_settings) if k.isupper()}
+    overrides.update(
+        DEBUG=False,
+        ALLOWED_HOSTS=['testserver'],
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': database}},
+        LOGGING={'version': 1, 'disable_existing_loggers': False, 'root': {'level': 'ERROR'}},
+        **config,
+    )
+    settings.configure(**overrides)
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    return seed_backend
+
+
+def seed(backend, flags: int) -> None:
+    from benchmarks.cases import as_json, catalog, make_feature
+
+    # testproj's demo feature, on for User 1
+    features = [make_feature('background_red', actors=5)] + catalog(flags, prefix='flag')
+    backend.from_json(as_json(features))
+
+
+def drive(requests: int, concurrency: int, warmup: int, rng_seed: int) -> dict:
+    from django.db import connection
+    from django.test import Client
+
+    pages = list(PAGES)
+    weights = [PAGES[p] for p in pages]
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(index: int, count: int, record: bool) -> None:
+        nonlocal errors
+        client = Client()
+        rng = random.Random(rng_seed + index)
+        executed = 0
+        def count_queries(execute, sql, params, many, context):
+            nonlocal executed
+            executed += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            for _ in range(count):
+                page = rng.choices(pages, weights)[0]
+                executed = 0
+                start = time.perf_counter()
+                response = client.get(page)
+                elapsed = time.perf_counter() - start
+                if record:
+                    with lock:
+                        latencies.append(elapsed)
+                        queries.append(executed)
+                        if response.status_code != 200:
+                            errors += 1
+        connection.close()
+
+    def run(total: int, record: bool) -> float:
+        per_worker = [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+        threads = [
+            threading.Thread(target=worker, args=(i, n, record))
+            for i, n in enumerate(per_worker)
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start
+
+    run(warmup, record=False)
+    elapsed = run(requests, record=True)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed,
+        'latency': {
+            'mean': statistics.mean(latencies),
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies),
+        },
+        'queries_per_request': statistics.mean(queries),
+    }
+
+
+def run_config(name: str, args) -> dict:
+    "Run one configuration in this process."
+    with tempfile.TemporaryDirectory() as scratch:
+        seed_backend = setup_django(name, os.path.join(scratch, 'load.sqlite3'))
+
+        from flippy.config import flippy_backend
+        seed(authoritative(flippy_backend) if seed_backend is None else seed_backend, args.flags)
+        results = drive(args.requests, args.concurrency, args.warmup, args.seed)
+    results['config'] = name
+    return results
+
+
+def run_all(args) -> list[dict]:
+    "Run each configuration in a fresh process."
+    results = []
+    for name in args.configs:
+        child = subprocess.run(
+            [
+                sys.executable, '-m', 'benchmarks.load', '--child', name,
+                '--flags', str(args.flags),
+                '--requests', str(args.requests),
+                '--concurrency', str(args.concurrency),
+                '--warmup', str(args.warmup),
+                '--seed', str(args.seed),
+            ],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            print(f"{name} failed:\n{child.stderr}", file=sys.stderr)
+            continue
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print(format_result(result), flush=True)
+    return results
+
+
+def format_result(r: dict) -> str:
+    ms = {k: v * 1000 for k, v in r['latency'].items()}
+    return (
+        f"{r['config']:<10} {r['requests_per_second']:8.1f} req/s  "
+        f"p50 {ms['p50']:7.2f}ms  p90 {ms['p90']:7.2f}ms  p99 {ms['p99']:7.2f}ms  "
+        f"{r['queries_per_request']:5.1f} queries/req  {r['errors']} errors"
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load', description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--configs', type=lambda s: s.split(','), default=list(CONFIGS),
+                        help=f"comma-separated configurations (default: {','.join(CONFIGS)})")
+    parser.add_argument('--flags', type=int, default=100, help="flags to seed (default: 100)")
+    parser.add_argument('--requests', type=int, default=1000, help="requests to time per configuration (default: 1000)")
+    parser.add_argument('--concurrency', type=int, default=4, help="client threads (default: 4)")
+    parser.add_argument('--warmup', type=int, default=50, help="untimed requests first (default: 50)")
+    parser.add_argument('--seed', type=int, default=42, help="seed for the page mix (default: 42)")
+    parser.add_argument('-o', '--output', help="write results to this JSON file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_config(args.child, args)))
+        return 0
+
+    unknown = [c for c in args.configs if c not in CONFIGS]
+    if unknown:
+        parser.error(f"unknown configurations: {', '.join(unknown)}")
+
+    results = run_all(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'pages': PAGES, 'flags': args.flags, 'results': results}, f, indent=2)
+            f.write('\n')
+    return 0 if len(results) == len(args.configs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Per-request accounting of what Flippy did: which features were checked, how
+many backend calls and SQL queries that took, and how long it all took. It's
+meant for development, to spot views and templates which check flags in a
+loop before they reach production.
+
+With `FLIPPY_REQUEST_STATS = True` in settings, `flippy_middleware` keeps a
+`RequestStats` for each request in `request.flippy_stats`, and sums it up in
+an `X-Flippy-Stats` response header. `flippy.panels.FlippyPanel` shows it in
+Django Debug Toolbar.
+"""
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from flippy import deadline
+from flippy.backends.base import BaseBackend
+from flippy.core import FeatureName
+from flippy.instrumentation import InstrumentedBackend, Outcome
+
+HEADER = 'X-Flippy-Stats'
+
+
+@dataclass
+class Evaluation:
+    result: bool
+    outcome: Outcome
+    duration: float
+
+
+@dataclass
+class RequestStats:
+    # feature -> each time it was checked
+    flags: dict[FeatureName, list[Evaluation]] = field(default_factory=dict)
+    evaluation_time: float = 0
+    # backend method -> number of calls
+    backend_calls: dict[str, int] = field(default_factory=dict)
+    backend_time: float = 0
+    queries: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def evaluations(self) -> int:
+        return sum(len(e) for e in self.flags.values())
+
+    @property
+    def total_backend_calls(self) -> int:
+        return sum(self.backend_calls.values())
+
+    def evaluated(self, feature: FeatureName, result: bool, outcome: Outcome, duration: float) -> None:
+        with self._lock:
+            self.flags.setdefault(feature, []).append(Evaluation(result, outcome, duration))
+            self.evaluation_time += duration
+
+    def backend_called(self, method: str, duration: float, queries: int) -> None:
+        with self._lock:
+            self.backend_calls[method] = self.backend_calls.get(method, 0) + 1
+            self.backend_time += duration
+            self.queries += queries
+
+    def summary(self) -> str:
+        "A one-line summary, as used in the response header."
+        return (
+            f'flags={len(self.flags)}; evaluations={self.evaluations}; '
+            f'backend-calls={self.total_backend_calls}; queries={self.queries}; '
+            f'time={self.evaluation_time * 1000:.2f}ms'
+        )
+
+
+current: ContextVar[RequestStats | None] = ContextVar('flippy_request_stats', default=None)
+
+
+class RequestAccounting:
+    """
+    A listener which adds each feature check to the current request's
+    `RequestStats`. `FLIPPY_REQUEST_STATS` registers one.
+    """
+    def evaluated(self, feature: FeatureName, result: bool, outcome: Outcome, duration: float) -> None:
+        stats = current.get()
+        if stats is not None:
+            stats.evaluated(feature, result, outcome, duration)
+
+    def backend_called(self, backend: str, method: str, duration: float, error: BaseException | None) -> None:
+        # counted by AccountingBackend, which only wraps requests' backends
+        pass
+
+
+class AccountingBackend(InstrumentedBackend):
+    """
+    Wraps the backend for one request, and counts its calls (and the SQL
+    queries they make) in that request's `RequestStats`. Unlike its parent,
+    it doesn't tell listeners; the configured backend already does if
+    there are any.
+    """
+    def __init__(self, inner: BaseBackend, stats: RequestStats):
+        super().__init__(inner)
+        self.stats = stats
+
+    def _call(self, method: str, fn, *args):
+        from django.db import connections
+
+        queries = 0
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            # wrappers are per connection, and connections are per thread, so
+            # this only counts queries made by this call
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count))
+                return deadline.call_within(self.inner, fn, *args)
+        finally:
+            self.stats.backend_called(method, time.perf_counter() - start, queries)
@@ -1,11 +1,21 @@
 from flippy.backends.base import BaseBackend
+from flippy.backends.chaos import ChaosBackend
 from flippy.backends.django import DjangoBackend
+from flippy.backends.django_snapshot import DjangoSnapshotBackend
 from flippy.backends.flipper_cloud import FlipperCloudBackend
+from flippy.backends.layered import (BaseCache, DjangoCache, LayeredBackend,
+                                    MemoryCache)
 from flippy.backends.memory import MemoryBackend
 
 __all__ = [
     BaseBackend,
+    ChaosBackend,
     DjangoBackend,
+    DjangoSnapshotBackend,
     FlipperCloudBackend,
+    LayeredBackend,
     MemoryBackend,
+    BaseCache,
+    DjangoCache,
+    MemoryCache,
 ]
@@ -1,7 +1,10 @@
 from abc import ABCMeta, abstractmethod
 import json
+from typing import Iterable
 
-from flippy.core import FeatureEncoder, FeatureName, Feature, Gate
+from flippy.core import Change, FeatureEncoder, FeatureName, Feature, Gate
+from flippy.deadline import call_with_deadline
+from flippy.exceptions import FeatureNotFound
 
 
 class BaseBackend(metaclass=ABCMeta):
@@ -50,9 +53,13 @@ class BaseBackend(metaclass=ABCMeta):
     def get_multi(self, features: list[FeatureName]) -> list[Feature]:
         "Get all gate values for several features at once."
         # default implementation; feel free to use or override
+        # features which don't exist are left out, like the other backends do
         values = []
         for feature in features:
-            values.append(self.get(feature))
+            try:
+                values.append(self.get(feature))
+            except FeatureNotFound:
+                pass
         return values
 
     @abstractmethod
@@ -76,6 +83,89 @@ class BaseBackend(metaclass=ABCMeta):
         "Clear current state and replace with state from a JSON-formatted string."
         pass
 
+    def version(self) -> int | None:
+        """
+        A value which increases every time any feature changes, so that
+        caches can cheaply check whether they're still current.
+        Returns None if this backend can't tell.
+        """
+        return None
+
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        """
+        Get all gate values for features which changed after `revision`
+        (a value previously returned by `version`). Removed features aren't
+        included; `get_removed_since` finds those.
+        """
+        # default implementation; feel free to use or override
+        # without per-feature revisions, all we can say is whether
+        # anything at all has changed
+        if revision is not None and self.version() == revision:
+            return []
+        return self.get_all()
+
+    def get_removed_since(self, revision: int, known: Iterable[FeatureName]) -> set[FeatureName]:
+        """
+        Which of the `known` features (the ones a caller had at `revision`,
+        a value previously returned by `version`) have been removed since.
+        Together with `get_changed_since`, this brings a copy up to date.
+        """
+        # default implementation; feel free to use or override
+        if revision is not None and self.version() == revision:
+            return set()
+        return set(known) - self.features()
+
+    def invalidate(self, feature: FeatureName | None = None) -> None:
+        """
+        Forget any cached state for `feature` (or for every feature), such as
+        when told that it changed somewhere else.
+        """
+        pass
+
+    def apply_changes(self, changes: list[Change]) -> None:
+        """
+        Replay changes (such as from `DjangoBackend.get_changes_since`)
+        against this backend, in order.
+        """
+        for change in changes:
+            match change.operation:
+                case 'add':
+                    self.add(change.feature)
+                case 'remove':
+                    self.remove(change.feature)
+                case 'clear':
+                    self.clear(change.feature)
+                case 'enable':
+                    self.enable(change.feature, change.gate, change.thing)
+                case 'disable':
+                    self.disable(change.feature, change.gate, change.thing)
+                case _:
+                    raise ValueError(f"{change.operation} is not a known operation")
+
+    def call_with_deadline(self, timeout: float, fn, *args):
+        """
+        Call `fn(*args)` (one of this backend's methods), raising `TimeoutError`
+        if it takes more than `timeout` seconds. By default the call runs on a
+        small pool of background threads; backends which must stay on the
+        calling thread, like the Django ones, enforce the timeout themselves.
+        """
+        return call_with_deadline(timeout, fn, *args)
+
+    # lifecycle hooks
+    # Servers like gunicorn (with --preload) import the app once in a master
+    # process and then fork workers. Backends which cache state can load it in
+    # `warm_up` so that every worker starts warm and shares those pages
+    # copy-on-write. Anything which must not be shared across a fork (sockets,
+    # threads, locks) should be rebuilt in `after_fork`.
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        pass
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        pass
+    # end lifecycle hooks
+
     # dict implementation
     # note, there's no setting of values because that doesn't fit the
     # dict contract cleanly
@@ -0,0 +1,197 @@
+import random
+import threading
+from typing import Callable, Iterable
+
+from flippy import deadline
+from flippy.backends.base import BaseBackend
+from flippy.core import Feature, FeatureName, Gate
+from flippy.exceptions import BackendUnavailable, FeatureNotFound
+
+# errors ChaosBackend knows how to inject; `not_found` only applies to
+# calls about a single feature
+ERRORS = {
+    'not_found': lambda feature: FeatureNotFound(feature),
+    'timeout': lambda feature: TimeoutError('injected timeout'),
+    'unavailable': lambda feature: BackendUnavailable('injected failure'),
+}
+
+
+class ChaosBackend(BaseBackend):
+    """
+    Wraps another backend and makes it slow and flaky, for seeing how the
+    rest of the stack copes:
+
+    ```python
+    # settings.py
+
+    FLIPPY_BACKEND = 'ChaosBackend'
+    FLIPPY_ARGS = {
+        'inner': 'DjangoBackend',
+        'latency_distribution': ('lognormal', -4, 0.5),
+        'error_rate': 0.01,
+        'seed': 42,
+    }
+    ```
+
+    `inner` is a backend, or a specification like the ones `FLIPPY_BACKEND`
+    allows (built with `inner_args`). Every call first sleeps for a delay
+    drawn from `latency_distribution`, which is a number of seconds, a
+    callable taking a `random.Random`, or one of:
+
+    - `('uniform', low, high)`
+    - `('normal', mean, stddev)` (negative draws count as 0)
+    - `('lognormal', mu, sigma)`
+    - `('exponential', mean)`
+
+    Then, with probability `error_rate`, it raises one of `errors` instead
+    of calling the inner backend: `'not_found'` (`FeatureNotFound`),
+    `'timeout'` (`TimeoutError`), or `'unavailable'` (`BackendUnavailable`).
+    Given a `seed`, the same sequence of calls sees the same delays and errors.
+    """
+    def __init__(
+            self,
+            inner,
+            latency_distribution=0,
+            error_rate: float = 0,
+            errors: tuple[str, ...] = ('not_found', 'timeout'),
+            seed: int | None = None,
+            inner_args=None,
+        ):
+        if not isinstance(inner, BaseBackend):
+            from flippy.backends.loading import build_backend
+            inner = build_backend(inner, inner_args)
+        for error in errors:
+            if error not in ERRORS:
+                raise ValueError(f"{error} is not a known error; try one of {', '.join(ERRORS)}")
+
+        self.inner: BaseBackend = inner
+        self._latency = self._make_latency(latency_distribution)
+        self._error_rate = error_rate
+        self._errors = errors
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _make_latency(distribution) -> Callable[[random.Random], float]:
+        if callable(distribution):
+            return distribution
+        if isinstance(distribution, (int, float)):
+            return lambda r: distribution
+
+        name, *params = distribution
+        match name:
+            case 'uniform':
+                return lambda r: r.uniform(*params)
+            case 'normal':
+                return lambda r: max(0, r.gauss(*params))
+            case 'lognormal':
+                return lambda r: r.lognormvariate(*params)
+            case 'exponential':
+                return lambda r: r.expovariate(1 / params[0])
+            case _:
+                raise ValueError(f"{name} is not a known latency distribution")
+
+    def _chaos(self, feature: FeatureName | None = None) -> None:
+        "Sleep, and maybe raise an error."
+        with self._lock:
+            delay = self._latency(self._random)
+            fail = self._random.random() < self._error_rate
+            errors = [e for e in self._errors if feature is not None or e != 'not_found']
+            error = self._random.choice(errors) if fail and errors else None
+
+        if delay > 0:
+            # cut short (with a TimeoutError) by any deadline the caller set
+            deadline.sleep(delay)
+        if error is not None:
+            raise ERRORS[error](feature)
+
+    def features(self) -> set[FeatureName]:
+        "Get the set of known features."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.features)
+
+    def add(self, feature: FeatureName) -> bool:
+        "Add a feature to the set of known features."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.add, feature)
+
+    def remove(self, feature: FeatureName) -> bool:
+        "Remove a feature from the set of known features."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.remove, feature)
+
+    def clear(self, feature: FeatureName) -> bool:
+        "Clear all gate values for a feature."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.clear, feature)
+
+    def get(self, feature: FeatureName) -> Feature:
+        "Get all gate values for a feature."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.get, feature)
+
+    def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Enable a gate for a thing."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.enable, feature, gate, thing)
+
+    def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Disable a gate for a thing."
+        self._chaos(feature)
+        return deadline.call_within(self.inner, self.inner.disable, feature, gate, thing)
+
+    def get_multi(self, features: list[FeatureName]) -> list[Feature]:
+        "Get all gate values for several features at once."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.get_multi, features)
+
+    def get_all(self) -> list[Feature]:
+        "Get all gate values for all features at once."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.get_all)
+
+    def to_json(self) -> str:
+        "Produce a JSON-formatted string containing state for all features."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.to_json)
+
+    def from_json(self, new_state: str) -> None:
+        "Clear current state and replace with state from a JSON-formatted string."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.from_json, new_state)
+
+    def version(self) -> int | None:
+        "The inner backend's version."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.version)
+
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        "Get all gate values for features changed after `revision`."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.get_changed_since, revision)
+
+    def get_removed_since(self, revision: int, known: Iterable[FeatureName]) -> set[FeatureName]:
+        "Which of the `known` features were removed after `revision`."
+        self._chaos()
+        return deadline.call_within(self.inner, self.inner.get_removed_since, revision, known)
+
+    def call_with_deadline(self, timeout: float, fn, *args):
+        """
+        Call `fn(*args)` with a deadline covering both the injected latency
+        and the inner backend, which gets whatever time is left.
+        """
+        with deadline.limit(timeout):
+            return fn(*args)
+
+    def invalidate(self, feature: FeatureName | None = None) -> None:
+        "Forget any cached state for `feature` (or for every feature)."
+        self.inner.invalidate(feature)
+
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        self.inner.warm_up()
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        self._lock = threading.Lock()
+        self.inner.after_fork()
@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service which keeps failing. After `failure_threshold`
+    consecutive failures the breaker opens, and calls aren't allowed for
+    `reset_timeout` seconds. After that a single trial call is allowed
+    through: if it succeeds the breaker closes again, otherwise it re-opens.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        "One of 'closed', 'open', or 'half-open'."
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return 'open'
+            return 'half-open'
+
+    def allow(self) -> bool:
+        "Whether a call may go ahead right now."
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            # half-open: only one trial call at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def success(self) -> None:
+        "Record a successful call."
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def failure(self) -> None:
+        "Record a failed call."
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
@@ -1,55 +1,111 @@
 import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Iterable
+try:
+    import fcntl
+except ImportError:
+    # not on Windows
+    fcntl = None
 
 from flippy.backends import BaseBackend
-from flippy.core import Feature, FeatureEncoder, FeatureName, Gate
-from flippy.exceptions import FeatureNotFound
+from flippy.backends.singleflight import SingleFlight
+from flippy.core import Change, Feature, FeatureEncoder, FeatureName, Gate
+from flippy.exceptions import ChangeLogTruncated, FeatureNotFound
+from flippy.tracing import span
 
 from django.core.exceptions import ImproperlyConfigured
 try:
-    from flippy.models import FlippyFeature, FlippyActorGate, FlippyGroupGate
+    from flippy.models import (FlippyActorGate, FlippyChange, FlippyFeature,
+                               FlippyGroupGate, FlippyVersion)
 except ImproperlyConfigured:
     pass
 
 from django.core.exceptions import ValidationError
-from django.db.utils import IntegrityError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.db.utils import DatabaseError, IntegrityError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+VERSION_ID = 1
 
 
 class DjangoBackend(BaseBackend):
     """
     A backend implemented as Django models.
     """
+    def __init__(
+        self,
+        version_file: str | None = None,
+        change_log_retention: timedelta | None = None,
+    ):
+        """
+        If you pass a `version_file`, the version is written there after
+        every write, and `version` reads it from the file instead of querying
+        the database. This only helps processes which share a filesystem with
+        every writer.
+
+        Every write is also recorded in a change log (see `get_changes_since`).
+        `compact_change_log` deletes entries older than `change_log_retention`;
+        by default they're kept forever.
+        """
+        self._version_file = version_file
+        self._change_log_retention = change_log_retention
+        self._flights = SingleFlight()
+
     def features(self) -> set[FeatureName]:
         "Get the set of known features."
-        return set([f.key for f in FlippyFeature.objects.all()])
+        with span('flippy.django.features'):
+            return set([f.key for f in FlippyFeature.objects.all()])
 
     def add(self, feature: FeatureName) -> bool:
         "Add a feature to the set of known features."
-        try:
-            FlippyFeature(key=feature).save()
-            return True
-        except IntegrityError:
-            return False
+        with span('flippy.django.write', {'flippy.operation': 'add', 'flippy.feature': feature}):
+            try:
+                with transaction.atomic():
+                    FlippyFeature(key=feature).save()
+                    self._record([Change(feature, 'add')])
+                return True
+            except IntegrityError:
+                return False
 
     def remove(self, feature: FeatureName) -> bool:
         "Remove a feature from the set of known features."
-        try:
-            feature = FlippyFeature.objects.get(key=feature)
-            feature.delete()
-            return True
-        except FlippyFeature.DoesNotExist:
-            return False
+        with span('flippy.django.write', {'flippy.operation': 'remove', 'flippy.feature': feature}):
+            try:
+                with transaction.atomic():
+                    FlippyFeature.objects.get(key=feature).delete()
+                    self._record([Change(feature, 'remove')])
+                return True
+            except FlippyFeature.DoesNotExist:
+                return False
 
     def clear(self, feature: FeatureName) -> bool:
         "Clear all gate values for a feature."
-        try:
-            feature = FlippyFeature.objects.get(key=feature)
-            feature.clear()
-            return True
-        except FlippyFeature.DoesNotExist:
-            return False
+        with span('flippy.django.write', {'flippy.operation': 'clear', 'flippy.feature': feature}):
+            try:
+                with transaction.atomic():
+                    FlippyFeature.objects.get(key=feature).clear()
+                    self._record([Change(feature, 'clear')])
+                return True
+            except FlippyFeature.DoesNotExist:
+                return False
 
     def get(self, feature: FeatureName) -> Feature:
         "Get all gate values for a feature."
+        with span('flippy.django.get', {'flippy.feature': feature}):
+            # Don't share what we read inside a transaction with other threads;
+            # it may not be committed yet.
+            if transaction.get_connection().in_atomic_block:
+                return self._get(feature)
+            return self._flights.do(('get', feature), self._get, feature)
+
+    def _get(self, feature: FeatureName) -> Feature:
         try:
             feature = FlippyFeature.objects.get(key=feature)
             return feature.as_feature()
@@ -58,11 +114,19 @@ class DjangoBackend(BaseBackend):
 
     def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Enable a gate for a thing."
-        try:
-            feature = FlippyFeature.objects.get(key=feature)
-        except FlippyFeature.DoesNotExist:
-            return False
+        attributes = {'flippy.operation': 'enable', 'flippy.feature': feature, 'flippy.gate': gate.value}
+        with span('flippy.django.write', attributes), transaction.atomic():
+            try:
+                flippy_feature = FlippyFeature.objects.get(key=feature)
+            except FlippyFeature.DoesNotExist:
+                return False
 
+            changed = self._enable(flippy_feature, gate, thing)
+            if changed:
+                self._record([Change(feature, 'enable', gate, thing)])
+            return changed
+
+    def _enable(self, feature: 'FlippyFeature', gate: Gate, thing: str | int | None) -> bool:
         match gate:
             case Gate.Boolean:
                 feature.boolean = True
@@ -70,13 +134,15 @@ class DjangoBackend(BaseBackend):
                 return True
             case Gate.Actors:
                 try:
-                    feature.enabled_actors.create(key=thing)
+                    with transaction.atomic():
+                        feature.enabled_actors.create(key=thing)
                     return True
                 except IntegrityError:
                     return False
             case Gate.Groups:
                 try:
-                    feature.enabled_groups.create(key=thing)
+                    with transaction.atomic():
+                        feature.enabled_groups.create(key=thing)
                     return True
                 except IntegrityError:
                     return False
@@ -101,11 +167,19 @@ class DjangoBackend(BaseBackend):
 
     def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Disable a gate for a thing."
-        try:
-            feature = FlippyFeature.objects.get(key=feature)
-        except FlippyFeature.DoesNotExist:
-            return False
+        attributes = {'flippy.operation': 'disable', 'flippy.feature': feature, 'flippy.gate': gate.value}
+        with span('flippy.django.write', attributes), transaction.atomic():
+            try:
+                flippy_feature = FlippyFeature.objects.get(key=feature)
+            except FlippyFeature.DoesNotExist:
+                return False
 
+            changed = self._disable(flippy_feature, gate, thing)
+            if changed:
+                self._record([Change(feature, 'disable', gate, thing)])
+            return changed
+
+    def _disable(self, feature: 'FlippyFeature', gate: Gate, thing: str | int | None) -> bool:
         match gate:
             case Gate.Boolean:
                 feature.boolean = False
@@ -144,26 +218,317 @@ class DjangoBackend(BaseBackend):
 
     def get_multi(self, features: list[FeatureName]) -> list[Feature]:
         "Get all gate values for several features at once."
-        features = FlippyFeature.objects.filter(key__in=features)
-        return [f.as_feature() for f in features]
+        with span('flippy.django.get_multi', {'flippy.features': len(features)}):
+            features = self._with_gates().filter(key__in=features)
+            return [f.as_feature() for f in features]
 
     def get_all(self) -> list[Feature]:
         "Get all gate values for all features at once."
-        features = FlippyFeature.objects.all()
+        with span('flippy.django.get_all'):
+            if transaction.get_connection().in_atomic_block:
+                return self._get_all()
+            return self._flights.do(('get_all',), self._get_all)
+
+    def _get_all(self) -> list[Feature]:
+        features = self._with_gates().all()
         return [f.as_feature() for f in features]
 
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        "Get all gate values for features changed after `revision`."
+        with span('flippy.django.get_changed_since'):
+            features = self._with_gates().filter(revision__gt=revision)
+            return [f.as_feature() for f in features]
+
+    def get_removed_since(self, revision: int, known: Iterable[FeatureName]) -> set[FeatureName]:
+        "Which of the `known` features were removed after `revision`, from the change log."
+        with span('flippy.django.get_removed_since'):
+            try:
+                self._check_change_log(revision)
+            except ChangeLogTruncated:
+                # the log can't tell any more, so compare against what exists
+                return super().get_removed_since(revision, known)
+
+            removed = set(
+                FlippyChange.objects
+                .filter(sequence__gt=revision, operation='remove', feature__in=set(known))
+                .values_list('feature', flat=True)
+            )
+            # some may have been added back since
+            return removed - set(
+                FlippyFeature.objects.filter(key__in=removed).values_list('key', flat=True)
+            )
+
+    def _with_gates(self):
+        return FlippyFeature.objects.prefetch_related('enabled_actors', 'enabled_groups')
+
     def to_json(self) -> str:
         "Produce a JSON-formatted string containing state for all features."
         return super().to_json()
 
     def from_json(self, new_state: str) -> None:
         "Clear current state and replace with state from a JSON-formatted string."
-        return self._from_json_naive(new_state)
-
-    def _from_json_naive(self, new_state: str) -> None:
-        FlippyFeature.objects.all().delete()
-        features_raw = json.loads(new_state)
-        for value in features_raw.values():
-            f = Feature.from_api(value)
-            # FlippyFeature.from_feature saves the object
-            ff = FlippyFeature.from_feature(f)
+        # Rather than deleting everything and starting over, only touch (and
+        # log) the features which actually differ.
+        new_features = [Feature.from_api(v) for v in json.loads(new_state).values()]
+        new_keys = {f.key for f in new_features}
+        changes = []
+
+        with span('flippy.django.from_json'), transaction.atomic():
+            existing = {ff.key: ff for ff in self._with_gates().all()}
+
+            for key, flippy_feature in existing.items():
+                if key not in new_keys:
+                    flippy_feature.delete()
+                    changes.append(Change(key, 'remove'))
+
+            for feature in new_features:
+                flippy_feature = existing.get(feature.key)
+                if flippy_feature is None:
+                    flippy_feature = FlippyFeature.objects.create(key=feature.key)
+                    changes.append(Change(feature.key, 'add'))
+                elif flippy_feature.as_feature() == feature:
+                    continue
+                else:
+                    flippy_feature.clear()
+                    changes.append(Change(feature.key, 'clear'))
+                changes.extend(self._set_gates(flippy_feature, feature))
+
+            if changes:
+                self._record(changes)
+
+    def _set_gates(self, flippy_feature: 'FlippyFeature', feature: Feature) -> list[Change]:
+        # expects a freshly created or cleared feature
+        key = feature.key
+        changes = []
+
+        if feature.boolean_gate.value is not None:
+            flippy_feature.boolean = feature.boolean_gate.value
+            operation = 'enable' if feature.boolean_gate.value else 'disable'
+            changes.append(Change(key, operation, Gate.Boolean))
+        for actor in feature.actors_gate.value:
+            flippy_feature.enabled_actors.create(key=actor)
+            changes.append(Change(key, 'enable', Gate.Actors, actor))
+        for group in feature.groups_gate.value:
+            flippy_feature.enabled_groups.create(key=group)
+            changes.append(Change(key, 'enable', Gate.Groups, group))
+        if feature.percentage_of_actors_gate.value is not None:
+            flippy_feature.percentage_of_actors = feature.percentage_of_actors_gate.value
+            changes.append(Change(key, 'enable', Gate.PercentageOfActors, flippy_feature.percentage_of_actors))
+        if feature.percentage_of_time_gate.value is not None:
+            flippy_feature.percentage_of_time = feature.percentage_of_time_gate.value
+            changes.append(Change(key, 'enable', Gate.PercentageOfTime, flippy_feature.percentage_of_time))
+
+        flippy_feature.save()
+        return changes
+
+    def get_changes_since(self, sequence: int, limit: int | None = None) -> list[Change]:
+        """
+        Get the changes logged after `sequence` (a value previously returned by
+        `version`), oldest first. Apply them to another backend with
+        `apply_changes` to follow this one.
+
+        Raises `ChangeLogTruncated` if some of those changes have already been
+        compacted away, in which case you need to reload everything.
+        """
+        self._check_change_log(sequence)
+        changes = FlippyChange.objects.filter(sequence__gt=sequence).order_by('sequence')
+        if limit is not None:
+            changes = changes[:limit]
+        return [c.as_change() for c in changes]
+
+    def _check_change_log(self, sequence: int) -> None:
+        "Raise `ChangeLogTruncated` if changes after `sequence` have been compacted away."
+        compacted_through = (
+            FlippyVersion.objects
+            .filter(pk=VERSION_ID)
+            .values_list('compacted_through', flat=True)
+            .first()
+        )
+        if sequence < (compacted_through or 0):
+            raise ChangeLogTruncated(sequence, compacted_through)
+
+    def compact_change_log(self, before: datetime | None = None) -> int:
+        """
+        Delete change log entries older than `before` (by default, older than
+        the configured `change_log_retention`). Returns how many were deleted.
+        """
+        if before is None:
+            if self._change_log_retention is None:
+                return 0
+            before = timezone.now() - self._change_log_retention
+
+        with transaction.atomic():
+            last = (
+                FlippyChange.objects
+                .filter(created_at__lt=before)
+                .aggregate(Max('sequence'))['sequence__max']
+            )
+            if last is None:
+                return 0
+
+            deleted, _ = FlippyChange.objects.filter(sequence__lte=last).delete()
+            stamp, _ = FlippyVersion.objects.select_for_update().get_or_create(pk=VERSION_ID)
+            stamp.compacted_through = max(stamp.compacted_through, last)
+            stamp.save(update_fields=['compacted_through'])
+        return deleted
+
+    def call_with_deadline(self, timeout: float, fn, *args):
+        """
+        Call `fn(*args)` on this thread, so that it uses the request's own
+        database connection and transaction, and ask the database to cancel
+        any query still running after `timeout` seconds, raising
+        `TimeoutError`. PostgreSQL, MySQL and SQLite can do this; on other
+        databases the timeout isn't enforced.
+
+        Inside a transaction (such as with `ATOMIC_REQUESTS`), the call runs
+        in a savepoint, so that a cancelled query only rolls back the check
+        rather than aborting the rest of the transaction.
+        """
+        connection = transaction.get_connection()
+        savepoint = transaction.atomic() if connection.in_atomic_block else nullcontext()
+        start = time.monotonic()
+        try:
+            with savepoint, _statement_timeout(connection, timeout):
+                return fn(*args)
+        except OperationalError as e:
+            if time.monotonic() - start < timeout:
+                raise
+            raise TimeoutError(f"Query took more than {timeout}s") from e
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        self._flights = SingleFlight()
+
+    def version(self) -> int | None:
+        """
+        A value which increases every time any feature changes, so that
+        caches can cheaply check whether they're still current.
+        """
+        if self._version_file:
+            version = self._read_version_file()
+            if version is not None:
+                return version
+        return self._read_version()
+
+    def _read_version(self) -> int:
+        with span('flippy.django.version'):
+            version = (
+                FlippyVersion.objects
+                .filter(pk=VERSION_ID)
+                .values_list('version', flat=True)
+                .first()
+            )
+        return version or 0
+
+    def _record(self, changes: list[Change]) -> None:
+        """
+        Called inside the writing transaction after every successful write,
+        to bump the version and feature revisions and log the changes.
+        """
+        version = self._bump_version(len(changes))
+        for sequence, change in enumerate(changes, start=version - len(changes) + 1):
+            change.sequence = sequence
+        FlippyChange.objects.bulk_create([FlippyChange.from_change(c) for c in changes])
+
+        # `update` skips auto_now, so set updated_at ourselves
+        (
+            FlippyFeature.objects
+            .filter(key__in={c.feature for c in changes})
+            .update(revision=version, updated_at=timezone.now())
+        )
+
+    def _bump_version(self, by: int = 1) -> int:
+        # the row lock also serializes concurrent writers
+        stamp, _ = FlippyVersion.objects.select_for_update().get_or_create(pk=VERSION_ID)
+        stamp.version += by
+        stamp.save(update_fields=['version'])
+
+        if self._version_file:
+            transaction.on_commit(self._write_version_file, robust=True)
+        return stamp.version
+
+    def _read_version_file(self) -> int | None:
+        try:
+            with open(self._version_file) as f:
+                return int(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_version_file(self) -> None:
+        # This runs after the write has committed, so it mustn't raise: the
+        # write succeeded either way. If the file can't be updated, remove it
+        # so that `version` falls back to the database rather than reporting
+        # a stale version.
+        try:
+            self._replace_version_file()
+        except OSError:
+            logger.exception(f"Couldn't write the Flippy version to {self._version_file}")
+            try:
+                os.remove(self._version_file)
+            except OSError:
+                pass
+
+    def _replace_version_file(self) -> None:
+        # Commit callbacks from concurrent writers can run in any order, so
+        # write the latest committed version rather than our own, and never
+        # move the file backwards. The lock makes reading the version and
+        # replacing the file one step, so that a slower process can't
+        # replace a newer version with the older one it read.
+        with open(f"{self._version_file}.lock", 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            version = self._read_version()
+            if version <= (self._read_version_file() or 0):
+                return
+
+            temp_file = f"{self._version_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'w') as f:
+                f.write(str(version))
+            os.replace(temp_file, self._version_file)
+
+
+@contextmanager
+def _statement_timeout(connection, timeout: float):
+    "Have `connection` cancel queries that run for more than `timeout` seconds."
+    ms = max(1, int(timeout * 1000))
+    connection.ensure_connection()
+
+    if connection.vendor == 'sqlite':
+        deadline = time.monotonic() + timeout
+        # returning True from the handler interrupts the running query
+        connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, 1000)
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, 1000)
+        return
+
+    if connection.vendor == 'postgresql':
+        get_sql = "SELECT current_setting('statement_timeout')"
+        set_sql = "SELECT set_config('statement_timeout', %s, false)"
+        value = f'{ms}ms'
+    elif connection.vendor == 'mysql' and connection.mysql_is_mariadb:
+        get_sql = "SELECT @@SESSION.max_statement_time"
+        set_sql = "SET SESSION max_statement_time = %s"
+        value = timeout
+    elif connection.vendor == 'mysql':
+        get_sql = "SELECT @@SESSION.max_execution_time"
+        set_sql = "SET SESSION max_execution_time = %s"
+        value = ms
+    else:
+        yield
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(get_sql)
+        previous = cursor.fetchone()[0]
+        cursor.execute(set_sql, [value])
+    try:
+        yield
+    finally:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(set_sql, [previous])
+        except DatabaseError:
+            # in a failed transaction; rolling it back restores the setting
+            pass
@@ -0,0 +1,132 @@
+import json
+from datetime import timedelta
+
+from flippy.backends.django import DjangoBackend
+from flippy.core import Change, Feature, FeatureName
+from flippy.exceptions import FeatureNotFound
+
+from django.core.exceptions import ImproperlyConfigured
+try:
+    from flippy.models import FlippySnapshot
+except ImproperlyConfigured:
+    pass
+
+from django.db import transaction
+
+SNAPSHOT_ID = 1
+
+
+class DjangoSnapshotBackend(DjangoBackend):
+    """
+    A Django backend which also keeps the entire feature state, in the same
+    shape `to_json` emits, in a single versioned row.
+
+    Writes go to the normalized tables (just like `DjangoBackend`) and update
+    the snapshot row in the same transaction. Reads load everything with one
+    primary-key fetch, and afterwards only check `version` to see whether
+    they need to load it again.
+
+    All writers must use this backend (or call `rebuild_snapshot` afterwards),
+    otherwise the snapshot won't reflect their changes.
+    """
+    def __init__(
+        self,
+        version_file: str | None = None,
+        change_log_retention: timedelta | None = None,
+    ):
+        super().__init__(version_file, change_log_retention)
+        # (version, {feature name: API payload})
+        self._cache: tuple[int | None, dict[FeatureName, dict]] = (None, {})
+
+    def features(self) -> set[FeatureName]:
+        "Get the set of known features."
+        return set(self._state().keys())
+
+    def get(self, feature: FeatureName) -> Feature:
+        "Get all gate values for a feature."
+        try:
+            return Feature.from_api(self._state()[feature])
+        except KeyError:
+            raise FeatureNotFound(feature)
+
+    def get_multi(self, features: list[FeatureName]) -> list[Feature]:
+        "Get all gate values for several features at once."
+        state = self._state()
+        return [Feature.from_api(state[f]) for f in features if f in state]
+
+    def get_all(self) -> list[Feature]:
+        "Get all gate values for all features at once."
+        return [Feature.from_api(f) for f in self._state().values()]
+
+    def to_json(self) -> str:
+        "Produce a JSON-formatted string containing state for all features."
+        return json.dumps(self._state(), separators=(',', ':'))
+
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        self._state()
+
+    def rebuild_snapshot(self) -> None:
+        "Regenerate the snapshot row from the normalized tables."
+        with transaction.atomic():
+            # bump the version so that other processes reload it
+            self._bump_version()
+            snapshot, _ = FlippySnapshot.objects.select_for_update().get_or_create(pk=SNAPSHOT_ID)
+            self._save(snapshot, self._normalized_state())
+
+    def _state(self) -> dict[FeatureName, dict]:
+        # Don't cache or share what we read inside a transaction; it may not
+        # be committed yet, and may still be rolled back.
+        if transaction.get_connection().in_atomic_block:
+            return self._read_state()
+
+        cached_version, state = self._cache
+        version = self.version()
+        if cached_version is not None and version == cached_version:
+            return state
+        return self._flights.do(('state', version), self._load_state, version)
+
+    def _load_state(self, version: int) -> dict[FeatureName, dict]:
+        state = self._read_state()
+        self._cache = (version, state)
+        return state
+
+    def _read_state(self) -> dict[FeatureName, dict]:
+        data = (
+            FlippySnapshot.objects
+            .filter(pk=SNAPSHOT_ID)
+            .values_list('data', flat=True)
+            .first()
+        )
+        if data is None:
+            # No snapshot yet. Reads don't write, so build the state from the
+            # normalized tables; the next write (or `rebuild_snapshot`)
+            # saves a snapshot.
+            return self._normalized_state()
+        return json.loads(data)
+
+    def _record(self, changes: list[Change]) -> None:
+        super()._record(changes)
+        snapshot, created = FlippySnapshot.objects.select_for_update().get_or_create(pk=SNAPSHOT_ID)
+
+        if created:
+            state = self._normalized_state()
+        else:
+            state = json.loads(snapshot.data)
+            keys = {c.feature for c in changes}
+            fresh = {f.key: f.to_api() for f in DjangoBackend.get_multi(self, list(keys))}
+            for key in keys:
+                if key in fresh:
+                    state[key] = fresh[key]
+                else:
+                    state.pop(key, None)
+
+        self._save(snapshot, state)
+
+    def _normalized_state(self) -> dict[FeatureName, dict]:
+        return {f.key: f.to_api() for f in DjangoBackend._get_all(self)}
+
+    def _save(self, snapshot: 'FlippySnapshot', state: dict[FeatureName, dict]) -> None:
+        snapshot.version += 1
+        snapshot.data = json.dumps(state, separators=(',', ':'))
+        snapshot.save()
@@ -1,14 +1,29 @@
+import json
+import logging
+import os
 import platform
+import random
 import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from json.decoder import JSONDecodeError
+from typing import Any, Callable, Iterable
 
 import httpx
 
 from flippy.backends import BaseBackend
-from flippy.core import Feature, FeatureName, Gate
-from flippy.exceptions import (FeatureNotFound, FlipperIdInvalid,
-                               GroupNotRegistered, NameInvalid,
-                               PercentageInvalid)
+from flippy.backends.circuitbreaker import CircuitBreaker
+from flippy.backends.singleflight import SingleFlight
+from flippy.backends.writebehind import WriteBehindQueue
+from flippy.core import Change, Feature, FeatureName, Gate
+from flippy.exceptions import (BackendUnavailable, FeatureNotFound,
+                               FlipperIdInvalid, GroupNotRegistered,
+                               NameInvalid, PercentageInvalid)
+from flippy.tracing import span
+
+logger = logging.getLogger(__name__)
 
 FLIPPER_CLOUD_BASE_URL = 'https://www.flippercloud.io/adapter'
 SYSTEM_PLATFORM = f"{platform.machine() or 'unknown'}-{platform.system() or 'unknown'}"
@@ -39,25 +54,144 @@ class FlipperCloudBackend(BaseBackend):
     Note that this is not the preferred implementation, as it'll cause a service
     to service call on every invocation. However, it's good for scaffolding and
     kicking tires.
+
+    Reads are retried (with jittered exponential backoff) on network errors
+    and server errors. After `failure_threshold` consecutive failed reads, a
+    circuit breaker stops calling Flipper Cloud for `reset_timeout` seconds.
+    While Flipper Cloud is unreachable, reads are served from the last
+    known good state: everything this process has read so far, plus the
+    contents of `snapshot_path` (if given), which is rewritten every time
+    all features are read. Reads which can't be served that way raise
+    `BackendUnavailable`.
+
+    `get_multi` asks for at most `max_keys_per_request` features per request,
+    and makes up to `max_concurrent_requests` of those requests at once.
+    Connections are kept alive for `keepalive_expiry` seconds. Pass
+    `http2=True` to use HTTP/2, which needs `httpx[http2]` installed.
+
+    With `write_behind=True`, changes are queued and sent from background
+    threads (see `WriteBehindQueue`), and return `True` right away. Errors
+    go to `on_error(change, exception)`. Call `flush()` to wait for them.
+
+    `base_url` and `transport` point the backend somewhere other than
+    Flipper Cloud, such as a local stand-in for tests.
     """
-    def __init__(self, token: str):
+    def __init__(
+            self,
+            token: str,
+            connect_timeout: float = 2,
+            read_timeout: float = 5,
+            retries: int = 2,
+            backoff: float = 0.1,
+            failure_threshold: int = 5,
+            reset_timeout: float = 30,
+            snapshot_path: str | None = None,
+            max_keys_per_request: int = 100,
+            max_concurrent_requests: int = 4,
+            max_connections: int = 10,
+            keepalive_expiry: float = 30,
+            http2: bool = False,
+            write_behind: bool = False,
+            max_concurrent_writes: int = 4,
+            on_error: Callable[[Change, Exception], Any] | None = None,
+            base_url: str = FLIPPER_CLOUD_BASE_URL,
+            transport: httpx.BaseTransport | None = None,
+        ):
         if not token:
             raise ValueError('must pass a Flipper Cloud token')
 
-        self.client = httpx.Client(
-            base_url=FLIPPER_CLOUD_BASE_URL,
-            headers=HEADERS | { "Flipper-Cloud-Token": token },
+        self._token = token
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._retries = retries
+        self._backoff = backoff
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._snapshot_path = snapshot_path
+        self._max_keys_per_request = max_keys_per_request
+        self._max_concurrent_requests = max_concurrent_requests
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
         )
+        self._http2 = http2
+        self._base_url = base_url
+        self._transport = transport
+
+        self.client = self._make_client()
+        self._flights = SingleFlight()
+        self._breaker = self._make_breaker()
+        self._executor_lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._writes = None
+        if write_behind:
+            self._writes = WriteBehindQueue(self._apply_now, max_concurrent_writes, on_error)
+
+        # last known good state
+        self._snapshot_lock = threading.Lock()
+        self._snapshot: dict[FeatureName, Feature] = {}
+        self._snapshot_complete = False
+        if snapshot_path:
+            self._load_snapshot_file()
+
+    def _make_client(self) -> httpx.Client:
+        return httpx.Client(
+            base_url=self._base_url,
+            headers=HEADERS | { "Flipper-Cloud-Token": self._token },
+            timeout=self._timeout,
+            limits=self._limits,
+            http2=self._http2,
+            transport=self._transport,
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self._max_concurrent_requests,
+                    thread_name_prefix='flippy-cloud',
+                )
+            return self._executor
+
+    def _make_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(self._failure_threshold, self._reset_timeout)
+
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        try:
+            self.get_all()
+        except BackendUnavailable:
+            logger.warning("Flipper Cloud is unavailable; starting from the last known good state")
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        # Don't close the inherited client: its sockets are still in use by
+        # the parent process. Just stop using it.
+        self.client = self._make_client()
+        self._flights = SingleFlight()
+        self._breaker = self._make_breaker()
+        self._snapshot_lock = threading.Lock()
+        # the parent's threads don't exist in a forked child
+        self._executor_lock = threading.Lock()
+        self._executor = None
+        if self._writes is not None:
+            self._writes.after_fork()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        "Wait for queued changes to be sent. False if time ran out."
+        if self._writes is None:
+            return True
+        return self._writes.flush(timeout)
 
     def features(self) -> set[FeatureName]:
         "Get the set of known features."
-        r = self.client.get('/features?exclude_gate_names=true')
-        self._raise_from_cloud(r)
-
-        return {f['key'] for f in r.json()['features']}
+        return {f.key for f in self.get_all()}
 
     def add(self, feature: FeatureName) -> bool:
         "Add a feature to the set of known features."
+        return self._write(Change(feature, 'add'))
+
+    def _add(self, feature: FeatureName) -> bool:
         body = { 'name': feature }
         r = self.client.post('/features', json=body)
         self._raise_from_cloud(r, { 'feature': feature })
@@ -65,25 +199,53 @@ class FlipperCloudBackend(BaseBackend):
 
     def remove(self, feature: FeatureName) -> bool:
         "Remove a feature from the set of known features."
+        return self._write(Change(feature, 'remove'))
+
+    def _remove(self, feature: FeatureName) -> bool:
         r = self.client.delete(f'/features/{feature}')
         self._raise_from_cloud(r, { 'feature': feature })
+        if r.is_success:
+            self._remember([], missing=[feature])
         return r.is_success
 
     def clear(self, feature: FeatureName) -> bool:
         "Clear all gate values for a feature."
+        return self._write(Change(feature, 'clear'))
+
+    def _clear(self, feature: FeatureName) -> bool:
         r = self.client.delete(f'features/{feature}/clear')
         self._raise_from_cloud(r, { 'feature': feature })
         return r.is_success
 
     def get(self, feature: FeatureName) -> Feature:
         "Get all gate values for a feature."
-        r = self.client.get(f'/features/{feature}')
+        return self._flights.do(('get', feature), self._get, feature)
 
-        self._raise_from_cloud(r, { 'feature': feature })
-        return Feature.from_api(r.json())        
+    def _get(self, feature: FeatureName) -> Feature:
+        try:
+            r = self._read(f'/features/{feature}')
+        except BackendUnavailable:
+            with self._snapshot_lock:
+                if feature in self._snapshot:
+                    return self._snapshot[feature]
+                if self._snapshot_complete:
+                    raise FeatureNotFound(feature)
+            raise
+
+        try:
+            self._raise_from_cloud(r, { 'feature': feature })
+        except FeatureNotFound:
+            self._remember([], missing=[feature])
+            raise
+        value = Feature.from_api(r.json())
+        self._remember([value])
+        return value
 
     def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Enable a gate for a thing."
+        return self._write(Change(feature, 'enable', gate, thing))
+
+    def _enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         body = self._body_for_gate(gate, thing)
         qs = { 'allow_unregistered_groups': 'true' } if gate == Gate.Groups else {}
         r = self.client.post(
@@ -97,6 +259,9 @@ class FlipperCloudBackend(BaseBackend):
 
     def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Disable a gate for a thing."
+        return self._write(Change(feature, 'disable', gate, thing))
+
+    def _disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         body = self._body_for_gate(gate, thing)
         qs = { 'allow_unregistered_groups': 'true' } if gate == Gate.Groups else {}
         # httpx doesn't accept `json` on .delete(), but the body is a required part
@@ -114,24 +279,165 @@ class FlipperCloudBackend(BaseBackend):
 
     def get_multi(self, features: list[FeatureName]) -> list[Feature]:
         "Get all gate values for several features at once."
+        # long lists of keys don't fit in one URL
+        n = self._max_keys_per_request
+        chunks = [features[i:i + n] for i in range(0, len(features), n)]
+        try:
+            if len(chunks) <= 1:
+                values = self._get_chunk(features)
+            else:
+                results = self._get_executor().map(self._get_chunk, chunks)
+                values = [f for chunk in results for f in chunk]
+        except BackendUnavailable:
+            with self._snapshot_lock:
+                if self._snapshot_complete or all(f in self._snapshot for f in features):
+                    return [self._snapshot[f] for f in features if f in self._snapshot]
+            raise
+
+        found = {f.key for f in values}
+        self._remember(values, missing=[f for f in features if f not in found])
+        return values
+
+    def _get_chunk(self, features: list[FeatureName]) -> list[Feature]:
         qs = {
             'exclude_gate_names': 'true',
             'keys': ','.join(features),
         }
-        r = self.client.get('/features', params=qs)
+        r = self._read('/features', params=qs)
         self._raise_from_cloud(r)
-
         return [Feature.from_api(f) for f in r.json()['features']]
 
     def get_all(self) -> list[Feature]:
         "Get all gate values for all features at once."
+        return self._flights.do(('get_all',), self._get_all)
+
+    def _get_all(self) -> list[Feature]:
         qs = {
             'exclude_gate_names': 'true',
         }
-        r = self.client.get('/features', params=qs)
+        try:
+            r = self._read('/features', params=qs)
+        except BackendUnavailable:
+            with self._snapshot_lock:
+                if self._snapshot_complete:
+                    return list(self._snapshot.values())
+            raise
+
         self._raise_from_cloud(r)
+        values = [Feature.from_api(f) for f in r.json()['features']]
+        self._remember(values, complete=True)
+        return values
 
-        return [Feature.from_api(f) for f in r.json()['features']]
+    def _write(self, change: Change) -> bool:
+        if self._writes is not None:
+            self._writes.put(change)
+            return True
+        return self._apply_now(change)
+
+    def _apply_now(self, change: Change) -> bool:
+        attributes = {'flippy.operation': change.operation, 'flippy.feature': change.feature}
+        if change.gate is not None:
+            attributes['flippy.gate'] = change.gate.value
+        with span('flippy.cloud.write', attributes):
+            match change.operation:
+                case 'add':
+                    return self._add(change.feature)
+                case 'remove':
+                    return self._remove(change.feature)
+                case 'clear':
+                    return self._clear(change.feature)
+                case 'enable':
+                    return self._enable(change.feature, change.gate, change.thing)
+                case 'disable':
+                    return self._disable(change.feature, change.gate, change.thing)
+                case _:
+                    raise ValueError(f"{change.operation} is not a known operation")
+
+    def _read(self, url: str, **kwargs) -> httpx.Response:
+        "GET from Flipper Cloud, with retries, through the circuit breaker."
+        with span('flippy.cloud.request', {'http.method': 'GET', 'url.path': url}) as s:
+            if not self._breaker.allow():
+                s.set_attribute('flippy.attempts', 0)
+                raise BackendUnavailable('Flipper Cloud circuit breaker is open')
+
+            error = None
+            for attempt in range(self._retries + 1):
+                if attempt:
+                    # "full jitter" keeps retrying clients from moving in lockstep
+                    time.sleep(random.uniform(0, self._backoff * 2 ** (attempt - 1)))
+                s.set_attribute('flippy.attempts', attempt + 1)
+                try:
+                    r = self.client.get(url, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+                    continue
+                except BaseException:
+                    # anything else (too many redirects, a decoding error) must
+                    # still settle the breaker, or a half-open trial never ends
+                    self._breaker.failure()
+                    raise
+                s.set_attribute('http.status_code', r.status_code)
+                if r.is_server_error or r.status_code == 429:
+                    error = httpx.HTTPStatusError(
+                        f'Flipper Cloud responded {r.status_code}',
+                        request=r.request,
+                        response=r,
+                    )
+                    continue
+                self._breaker.success()
+                return r
+
+            self._breaker.failure()
+            raise BackendUnavailable(f'Flipper Cloud is unavailable: {error}') from error
+
+    def _remember(
+            self,
+            features: list[Feature],
+            complete: bool = False,
+            missing: Iterable[FeatureName] = (),
+        ) -> None:
+        """
+        Update the last known good state: replace it entirely if `features`
+        is `complete`, otherwise merge them in and drop any `missing` ones,
+        which Flipper Cloud says no longer exist.
+        """
+        pruned = False
+        with self._snapshot_lock:
+            if complete:
+                self._snapshot = {f.key: f for f in features}
+                self._snapshot_complete = True
+            else:
+                self._snapshot.update((f.key, f) for f in features)
+                for key in missing:
+                    pruned = self._snapshot.pop(key, None) is not None or pruned
+            snapshot = list(self._snapshot.values())
+        # don't bring removed features back from the file after a restart
+        if self._snapshot_path and (complete or (pruned and self._snapshot_complete)):
+            self._write_snapshot_file(snapshot)
+
+    def _load_snapshot_file(self) -> None:
+        try:
+            with open(self._snapshot_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.warning(f"Couldn't read Flipper Cloud snapshot from {self._snapshot_path}")
+            return
+
+        self._snapshot = {k: Feature.from_api(v) for k, v in state.items()}
+        self._snapshot_complete = True
+
+    def _write_snapshot_file(self, features: list[Feature]) -> None:
+        state = {f.key: f.to_api() for f in features}
+        directory = os.path.dirname(os.path.abspath(self._snapshot_path))
+        try:
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.flippy-snapshot-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+            os.replace(tmp, self._snapshot_path)
+        except OSError:
+            logger.warning(f"Couldn't write Flipper Cloud snapshot to {self._snapshot_path}")
 
     def _body_for_gate(self, gate: Gate, thing: str | int | None) -> dict:
         match gate:
@@ -0,0 +1,391 @@
+import time
+from abc import ABCMeta, abstractmethod
+from typing import Iterable
+
+from flippy import deadline
+from flippy.backends.base import BaseBackend
+from flippy.core import Feature, FeatureName, Gate
+from flippy.tracing import span
+
+
+class BaseCache(metaclass=ABCMeta):
+    """
+    A cache tier for `LayeredBackend`. Caches only remember what they're
+    given; a miss is always reported as None.
+    """
+    @abstractmethod
+    def get(self, feature: FeatureName) -> Feature | None:
+        "Get a cached feature, or None on a miss."
+        pass
+
+    def get_many(self, features: list[FeatureName]) -> dict[FeatureName, Feature]:
+        "Get the cached features among `features`."
+        # default implementation; feel free to use or override
+        found = {}
+        for feature in features:
+            value = self.get(feature)
+            if value is not None:
+                found[feature] = value
+        return found
+
+    @abstractmethod
+    def get_all(self) -> list[Feature] | None:
+        "Get the cached list of all features, or None on a miss."
+        pass
+
+    @abstractmethod
+    def set(self, feature: Feature) -> None:
+        "Cache a feature."
+        pass
+
+    def set_many(self, features: list[Feature]) -> None:
+        "Cache several features."
+        # default implementation; feel free to use or override
+        for feature in features:
+            self.set(feature)
+
+    @abstractmethod
+    def set_all(self, features: list[Feature]) -> None:
+        "Cache the list of all features (and each of them individually)."
+        pass
+
+    @abstractmethod
+    def delete(self, feature: FeatureName) -> None:
+        "Forget a feature, along with the list of all features."
+        pass
+
+    def delete_many(self, features: list[FeatureName]) -> None:
+        "Forget several features, along with the list of all features."
+        # default implementation; feel free to use or override
+        for feature in features:
+            self.delete(feature)
+
+    @abstractmethod
+    def clear(self) -> None:
+        "Forget everything, including features this cache doesn't know the names of."
+        pass
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        pass
+
+
+class MemoryCache(BaseCache):
+    """
+    An in-process cache. Each process has its own copy, so other processes'
+    writes only show up here once entries are `ttl` seconds old.
+    """
+    def __init__(self, ttl: float = 5):
+        self._ttl = ttl
+        # name -> (expiry, feature)
+        self._features: dict[FeatureName, tuple[float, Feature]] = {}
+        self._all: tuple[float, list[Feature]] | None = None
+
+    def get(self, feature: FeatureName) -> Feature | None:
+        "Get a cached feature, or None on a miss."
+        try:
+            expiry, value = self._features[feature]
+        except KeyError:
+            return None
+        if expiry < time.monotonic():
+            return None
+        return value
+
+    def get_all(self) -> list[Feature] | None:
+        "Get the cached list of all features, or None on a miss."
+        cached = self._all
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    def set(self, feature: Feature) -> None:
+        "Cache a feature."
+        self._features[feature.key] = (time.monotonic() + self._ttl, feature)
+
+    def set_all(self, features: list[Feature]) -> None:
+        "Cache the list of all features (and each of them individually)."
+        expiry = time.monotonic() + self._ttl
+        self._features.update((f.key, (expiry, f)) for f in features)
+        self._all = (expiry, features)
+
+    def delete(self, feature: FeatureName) -> None:
+        "Forget a feature, along with the list of all features."
+        self._features.pop(feature, None)
+        self._all = None
+
+    def clear(self) -> None:
+        "Forget everything."
+        self._features = {}
+        self._all = None
+
+
+class DjangoCache(BaseCache):
+    """
+    A cache tier stored in one of Django's configured caches (like Redis or
+    Memcached), so it can be shared between processes.
+
+    Keys include a generation number, also kept in the cache, so that
+    `clear` can drop every entry at once (by moving to a new generation)
+    without knowing what's cached.
+    """
+    def __init__(self, alias: str = 'default', ttl: float = 60, key_prefix: str = 'flippy'):
+        self._alias = alias
+        self._ttl = ttl
+        self._key_prefix = key_prefix
+
+    @property
+    def _cache(self):
+        from django.core.cache import caches
+        return caches[self._alias]
+
+    @property
+    def _generation_key(self) -> str:
+        return f'{self._key_prefix}:generation'
+
+    def _generation(self) -> int:
+        generation = self._cache.get(self._generation_key)
+        if generation is None:
+            # first use, or evicted: start from the clock, so that this is
+            # newer than any generation used before
+            self._cache.add(self._generation_key, time.time_ns() // 1000, None)
+            generation = self._cache.get(self._generation_key)
+        return generation
+
+    def _key(self, generation: int, feature: FeatureName) -> str:
+        return f'{self._key_prefix}:{generation}:feature:{feature}'
+
+    def _all_key(self, generation: int) -> str:
+        return f'{self._key_prefix}:{generation}:all'
+
+    def get(self, feature: FeatureName) -> Feature | None:
+        "Get a cached feature, or None on a miss."
+        value = self._cache.get(self._key(self._generation(), feature))
+        return None if value is None else Feature.from_api(value)
+
+    def get_many(self, features: list[FeatureName]) -> dict[FeatureName, Feature]:
+        "Get the cached features among `features`."
+        generation = self._generation()
+        keys = {self._key(generation, f): f for f in features}
+        values = self._cache.get_many(keys.keys())
+        return {keys[k]: Feature.from_api(v) for k, v in values.items()}
+
+    def get_all(self) -> list[Feature] | None:
+        "Get the cached list of all features, or None on a miss."
+        values = self._cache.get(self._all_key(self._generation()))
+        return None if values is None else [Feature.from_api(v) for v in values]
+
+    def set(self, feature: Feature) -> None:
+        "Cache a feature."
+        self._cache.set(self._key(self._generation(), feature.key), feature.to_api(), self._ttl)
+
+    def set_many(self, features: list[Feature]) -> None:
+        "Cache several features."
+        generation = self._generation()
+        self._cache.set_many({self._key(generation, f.key): f.to_api() for f in features}, self._ttl)
+
+    def set_all(self, features: list[Feature]) -> None:
+        "Cache the list of all features (and each of them individually)."
+        generation = self._generation()
+        self._cache.set_many({self._key(generation, f.key): f.to_api() for f in features}, self._ttl)
+        self._cache.set(self._all_key(generation), [f.to_api() for f in features], self._ttl)
+
+    def delete(self, feature: FeatureName) -> None:
+        "Forget a feature, along with the list of all features."
+        self.delete_many([feature])
+
+    def delete_many(self, features: list[FeatureName]) -> None:
+        "Forget several features, along with the list of all features."
+        generation = self._generation()
+        self._cache.delete_many([self._key(generation, f) for f in features] + [self._all_key(generation)])
+
+    def clear(self) -> None:
+        "Forget everything, in every process, by moving to a new generation."
+        try:
+            self._cache.incr(self._generation_key)
+        except ValueError:
+            # the generation was evicted; the next read starts a new one
+            pass
+
+
+class LayeredBackend(BaseBackend):
+    """
+    A backend which puts one or more cache tiers in front of an authoritative
+    backend, like this:
+
+    ```python
+    LayeredBackend([MemoryCache(ttl=5), DjangoCache(ttl=60), DjangoBackend()])
+    ```
+
+    Reads fall through the tiers in order and backfill the faster ones on
+    the way back. Writes go to the authoritative backend (the last tier)
+    and then invalidate the cache tiers, so this process immediately reads
+    its own writes. Other processes see them once their caches expire.
+    """
+    def __init__(self, tiers: list):
+        *caches, backend = tiers
+        if not isinstance(backend, BaseBackend):
+            raise ValueError("the last tier must be a backend")
+        for cache in caches:
+            if not isinstance(cache, BaseCache):
+                raise ValueError(f"{cache} is not a cache")
+
+        self.caches: list[BaseCache] = caches
+        self.backend: BaseBackend = backend
+
+    def features(self) -> set[FeatureName]:
+        "Get the set of known features."
+        return {f.key for f in self.get_all()}
+
+    def add(self, feature: FeatureName) -> bool:
+        "Add a feature to the set of known features."
+        result = self.backend.add(feature)
+        self._invalidate(feature)
+        return result
+
+    def remove(self, feature: FeatureName) -> bool:
+        "Remove a feature from the set of known features."
+        result = self.backend.remove(feature)
+        self._invalidate(feature)
+        return result
+
+    def clear(self, feature: FeatureName) -> bool:
+        "Clear all gate values for a feature."
+        result = self.backend.clear(feature)
+        self._invalidate(feature)
+        return result
+
+    def get(self, feature: FeatureName) -> Feature:
+        "Get all gate values for a feature."
+        with span('flippy.layered.get', {'flippy.feature': feature}) as s:
+            for tier, cache in enumerate(self.caches):
+                deadline.check()
+                value = cache.get(feature)
+                if value is not None:
+                    s.set_attribute('flippy.cache_tier', type(cache).__name__)
+                    for upper in self.caches[:tier]:
+                        upper.set(value)
+                    return value
+
+            s.set_attribute('flippy.cache_tier', 'backend')
+            value = deadline.call_within(self.backend, self.backend.get, feature)
+            for cache in self.caches:
+                cache.set(value)
+            return value
+
+    def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Enable a gate for a thing."
+        result = self.backend.enable(feature, gate, thing)
+        self._invalidate(feature)
+        return result
+
+    def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Disable a gate for a thing."
+        result = self.backend.disable(feature, gate, thing)
+        self._invalidate(feature)
+        return result
+
+    def get_multi(self, features: list[FeatureName]) -> list[Feature]:
+        "Get all gate values for several features at once."
+        found: dict[FeatureName, Feature] = {}
+        missing = list(features)
+
+        with span('flippy.layered.get_multi', {'flippy.features': len(features)}) as s:
+            for tier, cache in enumerate(self.caches):
+                if not missing:
+                    break
+                deadline.check()
+                hits = cache.get_many(missing)
+                if hits:
+                    for upper in self.caches[:tier]:
+                        upper.set_many(list(hits.values()))
+                    found.update(hits)
+                    missing = [f for f in missing if f not in hits]
+            s.set_attribute('flippy.cache_hits', len(found))
+
+            if missing:
+                fetched = deadline.call_within(self.backend, self.backend.get_multi, missing)
+                for cache in self.caches:
+                    cache.set_many(fetched)
+                found.update((f.key, f) for f in fetched)
+
+        return [found[f] for f in features if f in found]
+
+    def get_all(self) -> list[Feature]:
+        "Get all gate values for all features at once."
+        with span('flippy.layered.get_all') as s:
+            for tier, cache in enumerate(self.caches):
+                deadline.check()
+                values = cache.get_all()
+                if values is not None:
+                    s.set_attribute('flippy.cache_tier', type(cache).__name__)
+                    for upper in self.caches[:tier]:
+                        upper.set_all(values)
+                    return values
+
+            s.set_attribute('flippy.cache_tier', 'backend')
+            values = deadline.call_within(self.backend, self.backend.get_all)
+            for cache in self.caches:
+                cache.set_all(values)
+            return values
+
+    def to_json(self) -> str:
+        "Produce a JSON-formatted string containing state for all features."
+        return super().to_json()
+
+    def from_json(self, new_state: str) -> None:
+        "Clear current state and replace with state from a JSON-formatted string."
+        before = self.backend.features()
+        self.backend.from_json(new_state)
+        changed = list(before | self.backend.features())
+        for cache in self.caches:
+            cache.delete_many(changed)
+
+    def version(self) -> int | None:
+        "The authoritative backend's version."
+        return self.backend.version()
+
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        "Get all gate values for features changed after `revision`."
+        return self.backend.get_changed_since(revision)
+
+    def get_removed_since(self, revision: int, known: Iterable[FeatureName]) -> set[FeatureName]:
+        "Which of the `known` features were removed after `revision`."
+        return self.backend.get_removed_since(revision, known)
+
+    def call_with_deadline(self, timeout: float, fn, *args):
+        """
+        Call `fn(*args)` with a deadline covering the cache tiers too. Reads
+        stop with `TimeoutError` once the deadline has passed between tiers,
+        and the authoritative backend gets whatever time is left. A single
+        cache round-trip is only as bounded as the cache's own timeouts.
+        """
+        with deadline.limit(timeout):
+            return fn(*args)
+
+    def invalidate(self, feature: FeatureName | None = None) -> None:
+        "Forget any cached state for `feature` (or for every feature)."
+        if feature is None:
+            # not just the features the backend has now: ones just removed
+            # need to go too
+            for cache in self.caches:
+                cache.clear()
+        else:
+            self._invalidate(feature)
+        self.backend.invalidate(feature)
+
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        self.backend.warm_up()
+        values = self.backend.get_all()
+        for cache in self.caches:
+            cache.set_all(values)
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        for cache in self.caches:
+            cache.after_fork()
+        self.backend.after_fork()
+
+    def _invalidate(self, feature: FeatureName) -> None:
+        for cache in self.caches:
+            cache.delete(feature)
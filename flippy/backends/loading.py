@@ -0,0 +1,55 @@
+import logging
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def import_backend(name: str) -> type:
+    "Get a backend (or cache) class from its dotted path or built-in name."
+    if '.' not in name:
+        logger.debug('Assuming this is a built-in backend')
+        name = f'flippy.backends.{name}'
+
+    try:
+        return import_string(name)
+    except ImportError:
+        raise ImproperlyConfigured(
+            f"Backend `{name}` was not found; try passing a fully-qualified path as a dotted string."
+        )
+
+
+def build_backend(spec, args=None):
+    """
+    Build a backend from a specification like the ones allowed in settings:
+
+    - a class name or dotted path, like `'DjangoBackend'`, built with `args`
+    - a tuple of `(name, args)`
+    - a list of specifications, which become the tiers of a `LayeredBackend`
+
+    `args` may be a list or tuple (positional arguments), a dict (keyword
+    arguments), or a str (a single argument).
+    """
+    if isinstance(spec, list):
+        from flippy.backends.layered import LayeredBackend
+        if args:
+            logger.warning("Ignoring args for a list of backend tiers; give each tier its own")
+        return LayeredBackend([build_backend(tier) for tier in spec])
+
+    if isinstance(spec, tuple):
+        spec, args = spec
+
+    cls = import_backend(spec)
+
+    if args is None:
+        return cls()
+    if isinstance(args, (list, tuple)):
+        return cls(*args)
+    if isinstance(args, dict):
+        return cls(**args)
+    if isinstance(args, str):
+        return cls(args)
+
+    logger.warning("Backend args had content, but it wasn't a list, tuple, dict, or str")
+    return cls()
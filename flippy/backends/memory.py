@@ -10,6 +10,8 @@ class MemoryBackend(BaseBackend):
     """A memory-only implementation of Flippy."""
     def __init__(self):
         self._features: dict[FeatureName: Feature] = {}
+        self._version = 0
+        self._revisions: dict[FeatureName, int] = {}
 
     def features(self) -> set[FeatureName]:
         "Get the set of known features."
@@ -20,6 +22,7 @@ class MemoryBackend(BaseBackend):
         if feature in self._features:
             return False
         self._features[feature] = Feature(key=feature)
+        self._changed(feature)
         return True
 
     def add_feature(self, feature: Feature) -> bool:
@@ -27,12 +30,15 @@ class MemoryBackend(BaseBackend):
         if feature.key in self._features:
             return False
         self._features[feature.key] = feature
+        self._changed(feature.key)
         return True
 
     def remove(self, feature: FeatureName) -> bool:
         "Remove a feature from the set of known features."
         try:
             self._features.pop(feature)
+            self._revisions.pop(feature, None)
+            self._version += 1
             return True
         except KeyError:
             return False
@@ -42,6 +48,8 @@ class MemoryBackend(BaseBackend):
         if feature not in self._features:
             return False
         self._features[feature] = Feature(key=feature)
+        self._changed(feature)
+        return True
 
     def get(self, feature: FeatureName) -> Feature:
         "Get all gate values for a feature."
@@ -52,8 +60,12 @@ class MemoryBackend(BaseBackend):
 
     def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Enable a gate for a thing."
-        feature = self._features[feature]
+        changed = self._enable(self._features[feature], gate, thing)
+        if changed:
+            self._changed(feature)
+        return changed
 
+    def _enable(self, feature: Feature, gate: Gate, thing: str | int | None) -> bool:
         match gate:
             case Gate.Boolean:
                 feature.boolean_gate.value = True
@@ -83,8 +95,12 @@ class MemoryBackend(BaseBackend):
 
     def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
         "Disable a gate for a thing."
-        feature = self._features[feature]
+        changed = self._disable(self._features[feature], gate, thing)
+        if changed:
+            self._changed(feature)
+        return changed
 
+    def _disable(self, feature: Feature, gate: Gate, thing: str | int | None) -> bool:
         match gate:
             case Gate.Boolean:
                 feature.boolean_gate.value = False
@@ -100,10 +116,10 @@ class MemoryBackend(BaseBackend):
                     return True
                 return False
             case Gate.PercentageOfActors:
-                feature.percentageofactors_gate.value = None
+                feature.percentage_of_actors_gate.value = None
                 return True
             case Gate.PercentageOfTime:
-                feature.percentageoftime_gate.value = None
+                feature.percentage_of_time_gate.value = None
                 return True
             case Gate.Expression:
                 raise NotImplementedError("ExpressionGate isn't supported")
@@ -128,3 +144,20 @@ class MemoryBackend(BaseBackend):
         features_raw = json.loads(new_state)
         for k, v in features_raw.items():
             self._features[k] = Feature.from_api(v)
+        self._version += 1
+        self._revisions = dict.fromkeys(self._features, self._version)
+
+    def version(self) -> int | None:
+        """
+        A value which increases every time any feature changes, so that
+        caches can cheaply check whether they're still current.
+        """
+        return self._version
+
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        "Get all gate values for features changed after `revision`."
+        return self.get_multi([f for f, r in self._revisions.items() if r > revision])
+
+    def _changed(self, feature: FeatureName) -> None:
+        self._version += 1
+        self._revisions[feature] = self._version
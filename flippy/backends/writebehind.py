@@ -0,0 +1,153 @@
+import atexit
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Callable
+
+from flippy.core import Change, FeatureName, Gate
+
+logger = logging.getLogger(__name__)
+
+# gates which hold a single value, so a later change replaces an earlier one
+# no matter what the thing is
+SINGLE_VALUE_GATES = {Gate.Boolean, Gate.PercentageOfActors, Gate.PercentageOfTime}
+
+# queues to flush when the process exits; weak, so that registering doesn't
+# keep every queue ever built alive
+_queues: 'weakref.WeakSet[WriteBehindQueue]' = weakref.WeakSet()
+
+
+class WriteBehindQueue:
+    """
+    Queues changes and applies them from background threads. Changes to one
+    feature are applied in order, one at a time; up to `max_workers`
+    features are worked on at once.
+
+    Changes which are overridden before they're sent are dropped: enabling
+    and then disabling an actor only sends the disable, changing a
+    percentage three times only sends the last one, and clearing or
+    removing a feature drops everything still waiting for that feature.
+
+    Errors are passed to `on_error(change, exception)`, or logged if there
+    isn't one. Call `flush()` to wait for everything queued so far.
+    """
+    def __init__(
+            self,
+            apply: Callable[[Change], Any],
+            max_workers: int = 4,
+            on_error: Callable[[Change, Exception], Any] | None = None,
+        ):
+        self._apply = apply
+        self._max_workers = max_workers
+        self._on_error = on_error
+        self._reset()
+        _queues.add(self)
+
+    def _reset(self) -> None:
+        self._cond = threading.Condition()
+        # feature -> changes waiting to be sent, in order
+        self._pending: dict[FeatureName, list[Change]] = {}
+        # features which a worker is currently sending changes for
+        self._busy: set[FeatureName] = set()
+        self._workers: list[threading.Thread] = []
+
+    def put(self, change: Change) -> None:
+        "Queue a change."
+        with self._cond:
+            pending = self._pending.setdefault(change.feature, [])
+            pending[:] = [c for c in pending if not self._overrides(change, c)]
+            pending.append(change)
+            self._start_worker()
+            self._cond.notify()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        "Wait for every queued change to be applied. False if time ran out."
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def after_fork(self) -> None:
+        "Drop the parent's queue and threads in a forked child."
+        self._reset()
+
+    @staticmethod
+    def _overrides(new: Change, old: Change) -> bool:
+        "Whether `new` makes it pointless to send `old`."
+        match new.operation:
+            case 'remove':
+                return True
+            case 'clear':
+                return old.operation in ('clear', 'enable', 'disable')
+            case 'add':
+                return old.operation == 'add'
+            case 'enable' | 'disable':
+                if old.operation not in ('enable', 'disable') or old.gate != new.gate:
+                    return False
+                return new.gate in SINGLE_VALUE_GATES or old.thing == new.thing
+        return False
+
+    def _start_worker(self) -> None:
+        # called with the lock held
+        self._workers = [t for t in self._workers if t.is_alive()]
+        if len(self._workers) >= min(self._max_workers, len(self._pending)):
+            return
+        t = threading.Thread(target=self._work, name='flippy-write-behind', daemon=True)
+        self._workers.append(t)
+        t.start()
+
+    def _next_feature(self) -> FeatureName | None:
+        # called with the lock held
+        for feature in self._pending:
+            if feature not in self._busy:
+                return feature
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                feature = self._next_feature()
+                if feature is None:
+                    # nothing for this worker; let it go and start another
+                    # one when there's more to do
+                    self._workers.remove(threading.current_thread())
+                    return
+                changes = self._pending.pop(feature)
+                self._busy.add(feature)
+
+            try:
+                for change in changes:
+                    try:
+                        self._apply(change)
+                    except Exception as e:
+                        self._report(change, e)
+            finally:
+                with self._cond:
+                    self._busy.discard(feature)
+                    if self._pending:
+                        self._start_worker()
+                    self._cond.notify_all()
+
+    def _report(self, change: Change, error: Exception) -> None:
+        if self._on_error is None:
+            logger.exception(f"Couldn't apply {change}")
+            return
+        try:
+            self._on_error(change, error)
+        except Exception:
+            logger.exception(f"on_error failed for {change}")
+
+    def _flush_at_exit(self) -> None:
+        if not self.flush(timeout=10):
+            logger.warning("Gave up waiting for queued Flippy changes at exit")
+
+
+@atexit.register
+def _flush_all_at_exit() -> None:
+    for queue in list(_queues):
+        queue._flush_at_exit()
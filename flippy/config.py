@@ -1,34 +1,24 @@
 import logging
+import os
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
-from django.utils.module_loading import import_string
+from django.db import connections
 
-from flippy.backends import DjangoBackend
+from flippy import instrumentation, profiling, recording, tracing
+from flippy.backends.loading import build_backend
+from flippy.registry import FeatureRegistry
 
 logger = logging.getLogger(__name__)
 
-# get class
+# get the backend specification: a class name or dotted path, or a list of
+# them to build a LayeredBackend
 try:
     _backend = settings.FLIPPY_BACKEND
     logger.debug('Flippy backend found in settings: "%s"', _backend)
-
-    # get a class from the string
-    try:
-        if '.' not in _backend:
-            logger.debug('Assuming this is a built-in backend')
-            _backend = f'flippy.backends.{_backend}'
-        _class = import_string(_backend)
-
-    except ImportError:
-        raise ImproperlyConfigured(
-            f"Backend `{_backend}` was not found; try passing a fully-qualified path as a dotted string."
-        )
-
 except AttributeError:
     # default if nothing is configured
     logger.debug('Did not find FLIPPY_BACKEND in settings; defaulting to DjangoBackend')
-    _class = DjangoBackend
+    _backend = 'DjangoBackend'
 
 # check for settings
 try:
@@ -38,12 +28,97 @@ except AttributeError:
     _args = []
 
 # build it
-if isinstance(_args, (list, tuple)):
-    flippy_backend = _class(*_args)
-elif isinstance(_args, dict):
-    flippy_backend = _class(**_args)
-elif isinstance(_args, str):
-    flippy_backend = _class(_args)
-else:
-    logger.warn("settings.FLIPPY_ARGS had content, but it wasn't a list, tuple, dict, or str")
-    flippy_backend = _class()
+flippy_backend = build_backend(_backend, _args)
+
+# listeners for metrics and the like; these also need backend calls timed
+try:
+    _listeners = settings.FLIPPY_LISTENERS
+except AttributeError:
+    logger.debug('No FLIPPY_LISTENERS found in settings; not instrumenting')
+    _listeners = []
+
+if _listeners:
+    instrumentation.listeners.extend(instrumentation.build_listener(l) for l in _listeners)
+    flippy_backend = instrumentation.InstrumentedBackend(flippy_backend)
+
+try:
+    _tracer = settings.FLIPPY_TRACER
+except AttributeError:
+    logger.debug('No FLIPPY_TRACER found in settings; not tracing')
+    _tracer = None
+
+if _tracer is not None:
+    tracing.set_tracer(instrumentation.build_listener(_tracer))
+
+# count what Flippy does in each request (see flippy.accounting)
+try:
+    flippy_request_stats = settings.FLIPPY_REQUEST_STATS
+except AttributeError:
+    logger.debug('No FLIPPY_REQUEST_STATS found in settings; defaulting to False')
+    flippy_request_stats = False
+
+if flippy_request_stats:
+    from flippy.accounting import RequestAccounting
+    instrumentation.listeners.append(RequestAccounting())
+
+# sample slow feature checks, and where they came from
+try:
+    _profile = settings.FLIPPY_PROFILE
+except AttributeError:
+    logger.debug('No FLIPPY_PROFILE found in settings; not profiling')
+    _profile = None
+
+if _profile:
+    profiling.set_profiler(profiling.Profiler(**({} if _profile is True else _profile)))
+
+# record a sample of feature checks, for replaying later
+try:
+    _record = settings.FLIPPY_RECORD
+except AttributeError:
+    logger.debug('No FLIPPY_RECORD found in settings; not recording')
+    _record = None
+
+if _record:
+    recording.set_recorder(recording.Recorder(**_record))
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=recording.recorder.after_fork)
+
+# Forked children (such as gunicorn workers started with --preload) must
+# never share sockets, threads, or locks with their parent.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=flippy_backend.after_fork)
+
+# optionally load state now, so that forked workers start warm
+try:
+    _warm_up = settings.FLIPPY_WARM_UP
+except AttributeError:
+    logger.debug('No FLIPPY_WARM_UP found in settings; defaulting to False')
+    _warm_up = False
+
+if _warm_up:
+    flippy_backend.warm_up()
+    # don't let forked workers inherit (and share) the database connection
+    # warming up opened; each will open its own
+    connections.close_all()
+
+# what we know about features without asking the backend
+try:
+    _miss_ttl = settings.FLIPPY_MISS_TTL
+except AttributeError:
+    logger.debug('No FLIPPY_MISS_TTL found in settings; not caching missing features')
+    _miss_ttl = 0
+
+try:
+    _declared_only = settings.FLIPPY_DECLARED_ONLY
+except AttributeError:
+    logger.debug('No FLIPPY_DECLARED_ONLY found in settings; defaulting to False')
+    _declared_only = False
+
+flippy_registry = FeatureRegistry(miss_ttl=_miss_ttl, declared_only=_declared_only)
+
+# how long to wait for the backend when checking a feature
+try:
+    flippy_timeout = settings.FLIPPY_TIMEOUT
+except AttributeError:
+    logger.debug('No FLIPPY_TIMEOUT found in settings; waiting as long as it takes')
+    flippy_timeout = None
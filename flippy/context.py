@@ -1,53 +1,97 @@
 from django.core.exceptions import ImproperlyConfigured
-from django.utils.functional import lazy
+from django.utils.functional import SimpleLazyObject
 
 from flippy import Flippy
-from flippy.config import flippy_backend
+from flippy.config import flippy_backend, flippy_registry, flippy_timeout
 
 
 class FeatureContext:
+    # Attributes are private so they can't be mistaken for (or hide) template
+    # lookups. Results are remembered, so checking a flag inside a loop only
+    # evaluates it once per request.
     def __init__(self, flippy: Flippy, name, request):
-        self.flippy = flippy
-        self.name = name
-        self.request = request
-    
+        self._flippy = flippy
+        self._name = name
+        self._request = request
+        self._results: dict[str, bool] = {}
+
     def for_user(self) -> bool:
-        try:
-            user = self.request.user
-        except AttributeError:
-            raise ImproperlyConfigured(
-                "request.user doesn't exist; make sure "
-                "django.contrib.auth.context_processors.auth is on in your settings."
-            )
-        return self.flippy.is_enabled(self.name, user)
-    
+        if 'user' not in self._results:
+            try:
+                user = self._request.user
+            except AttributeError:
+                raise ImproperlyConfigured(
+                    "request.user doesn't exist; make sure "
+                    "django.contrib.auth.context_processors.auth is on in your settings."
+                )
+            self._results['user'] = self._flippy.is_enabled(self._name, user)
+        return self._results['user']
+
     def globally(self) -> bool:
-        return self.flippy.is_enabled(self.name)
-    
+        if 'global' not in self._results:
+            self._results['global'] = self._flippy.is_enabled(self._name)
+        return self._results['global']
+
     def __bool__(self):
         raise NotImplementedError(
-            f"Asking for `flippy.{self.name}` isn't implemented. "
+            f"Asking for `flippy.{self._name}` isn't implemented. "
             "(It seems like a trap / easy typo to make, with unintended consequences.) "
-            f"You probably want `flippy.{self.name}.globally` instead."
+            f"You probably want `flippy.{self._name}.globally` instead."
         )
 
 
 class FlippyContext:
     def __init__(self, request):
-        self.flippy = Flippy(flippy_backend)
-        self.request = request
-    
+        self._request = request
+        # share the request's Flippy (and what it has already read) if the
+        # middleware is installed
+        self._flippy = getattr(request, 'flippy', None) or Flippy(
+            flippy_backend, flippy_registry, flippy_timeout, memoize=True,
+        )
+        self._features: dict[str, FeatureContext] = {}
+        self._results: dict[tuple[str, str | None], bool] = {}
+
+    # These are underscored, so they can't collide with feature names.
+    def _prefetch(self, names) -> None:
+        self._flippy.prefetch(names)
+
+    def _is_enabled(self, name: str, target=None) -> bool:
+        # Used by the template tags. Results are remembered for global checks
+        # and for the request's user; other targets still share the
+        # request's memoized reads.
+        if target is None:
+            key = None
+        elif target is getattr(self._request, 'user', None):
+            key = 'user'
+        else:
+            return self._flippy.is_enabled(name, target)
+
+        try:
+            return self._results[(name, key)]
+        except KeyError:
+            result = self._results[(name, key)] = self._flippy.is_enabled(name, target)
+            return result
+
     def __getattr__(self, name: str) -> FeatureContext:
-        if self.flippy.feature_exists(name):
-            return FeatureContext(self.flippy, name, self.request)
+        if name.startswith('_'):
+            raise AttributeError(name=name, obj=self)
+
+        try:
+            return self._features[name]
+        except KeyError:
+            pass
+
+        # declared features are known even if the backend hasn't heard of them;
+        # otherwise, this read is memoized and reused when the flag is evaluated
+        if flippy_registry.is_declared(name) or self._flippy.feature_exists(name):
+            context = self._features[name] = FeatureContext(self._flippy, name, self._request)
+            return context
         raise AttributeError(name=name, obj=self)
 
 
 def processor(request):
-    # Only instantiate the FlippyContext if someone actually requests it.
-    # Because you have to call `flippy.<feature_name>`, the FeatureContext
-    # is essentially already lazy.
-    c = lambda: FlippyContext(request)
+    # Only instantiate the FlippyContext if someone actually requests it,
+    # and then only once per request.
     return {
-        'flippy': lazy(c, FlippyContext),
+        'flippy': SimpleLazyObject(lambda: FlippyContext(request)),
     }
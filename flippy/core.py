@@ -11,6 +11,8 @@ FeatureName = NewType('FeatureName', str)
 
 FlagState = Literal['on', 'conditional', 'off']
 
+Operation = Literal['add', 'remove', 'clear', 'enable', 'disable']
+
 
 class Gate(Enum):
     Boolean = 'boolean'
@@ -100,3 +102,16 @@ class FeatureEncoder(json.JSONEncoder):
         if isinstance(obj, Feature):
             return obj.to_api()
         return json.JSONEncoder.default(self, obj)
+
+
+@dataclass
+class Change:
+    """
+    A single mutation, in terms of the backend operation which made it.
+    Backends which keep a change log number them with a `sequence`.
+    """
+    feature: FeatureName
+    operation: Operation
+    gate: Gate | None = None
+    thing: str | int | None = None
+    sequence: int | None = None
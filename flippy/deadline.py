@@ -0,0 +1,97 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable
+
+# Backend calls with a deadline run on a small, shared pool of threads. If a
+# backend hangs, at most this many threads are stuck on it; further calls
+# queue up behind them and simply time out.
+MAX_WORKERS = 8
+
+_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(MAX_WORKERS, thread_name_prefix='flippy-deadline')
+        return _executor
+
+
+def call_with_deadline(timeout: float, fn: Callable, *args) -> Any:
+    "Call `fn(*args)`, raising `TimeoutError` if it takes more than `timeout` seconds."
+    future = _get_executor().submit(contextvars.copy_context().run, fn, *args)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        # only helps if the call hasn't started yet; a running call is
+        # abandoned, and its result thrown away
+        future.cancel()
+        raise
+
+
+# Wrapping backends (caches, instrumentation, chaos) add time of their own
+# on top of the backend they wrap, so they enforce a deadline themselves: they
+# set it here, check what's left before any slow step of their own, and give
+# only what's left to the wrapped backend.
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar('flippy_deadline', default=None)
+
+
+@contextmanager
+def limit(timeout: float):
+    "Give everything in this block `timeout` seconds (or less, if already inside a deadline)."
+    end = time.monotonic() + timeout
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    "Seconds left before the current deadline, or None if there isn't one."
+    end = _deadline.get()
+    return None if end is None else end - time.monotonic()
+
+
+def check() -> None:
+    "Raise `TimeoutError` if the current deadline has passed."
+    left = remaining()
+    if left is not None and left <= 0:
+        raise TimeoutError("Deadline passed")
+
+
+def sleep(seconds: float) -> None:
+    "Sleep, but raise `TimeoutError` instead of sleeping past the current deadline."
+    left = remaining()
+    if left is not None and seconds >= left:
+        time.sleep(max(0, left))
+        raise TimeoutError("Deadline passed")
+    time.sleep(seconds)
+
+
+def call_within(backend, fn: Callable, *args) -> Any:
+    "Call `fn(*args)` (a method of `backend`) with whatever's left of the current deadline."
+    left = remaining()
+    if left is None:
+        return fn(*args)
+    if left <= 0:
+        raise TimeoutError("Deadline passed")
+    return backend.call_with_deadline(left, fn, *args)
+
+
+def _after_fork() -> None:
+    # the parent's threads don't exist in a forked child
+    global _lock, _executor
+    _lock = threading.Lock()
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
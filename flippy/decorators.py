@@ -0,0 +1,26 @@
+from functools import wraps
+
+from flippy.core import FeatureName
+
+
+def uses_flags(*features: FeatureName):
+    """
+    Declare the features a view checks, so they're read from the backend in
+    one go before the view runs (instead of one at a time as they're checked).
+    Needs `flippy.middleware.flippy_middleware`.
+
+    ```python
+    @uses_flags('my_cool_feature', 'my_other_feature')
+    def index(request):
+        ...
+    ```
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            flippy = getattr(request, 'flippy', None)
+            if flippy is not None:
+                flippy.prefetch(features)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -14,3 +14,5 @@ class GroupNotRegistered(Exception): pass
 class PercentageInvalid(Exception): pass
 class FlipperIdInvalid(Exception): pass
 class NameInvalid(Exception): pass
+class ChangeLogTruncated(Exception): pass
+class BackendUnavailable(Exception): pass
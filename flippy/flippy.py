@@ -1,10 +1,18 @@
+import logging
+import time
 from dataclasses import dataclass
+from typing import Iterable
+
+from flippy import instrumentation, profiling, recording
 from flippy.backends.base import BaseBackend
-from flippy.core import FeatureName, Gate
-from flippy.exceptions import FeatureNotFound
+from flippy.core import Feature, FeatureName, Gate
+from flippy.exceptions import BackendUnavailable, FeatureNotFound
+from flippy.registry import FeatureRegistry
 
 ACTOR_IF_NO_TARGET = "anonymous"
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class FeatureState:
@@ -29,16 +37,38 @@ class Flippy:
     f = Flippy(MemoryBackend())
     ```
     """
-    def __init__(self, backend: BaseBackend):
+    def __init__(
+            self,
+            backend: BaseBackend,
+            registry: FeatureRegistry | None = None,
+            timeout: float | None = None,
+            memoize: bool = False,
+        ):
         """
         Available backends include:
         - `flippy.backends.MemoryBackend`
         - `flippy.backends.DjangoBackend`
         - `flippy.backends.FlipperCloudBackend`
+
+        The optional `registry` holds declared features and their defaults,
+        and remembers features which turned out to be missing. Share one
+        registry between `Flippy` objects (like `flippy.config.flippy_registry`)
+        so that they all benefit.
+
+        `timeout` is the default number of seconds `is_enabled` waits for
+        the backend (by default, as long as it takes).
+
+        With `memoize`, each feature is read from the backend at most once
+        (until it's changed through this object), so checks stay consistent
+        and cheap. The middleware uses a memoizing `Flippy` for each request.
         """
         self._backend = backend
+        self._registry = registry or FeatureRegistry()
+        self._timeout = timeout
+        # feature -> value, or None if it doesn't exist
+        self._memo: dict[FeatureName, Feature | None] | None = {} if memoize else None
     
-    def is_enabled(self, feature: FeatureName, target = None) -> bool:
+    def is_enabled(self, feature: FeatureName, target = None, timeout: float | None = None) -> bool:
         """
         Checks whether a particular feature is enabled for a particular object
         (or globally, if you don't pass in a target).
@@ -77,18 +107,76 @@ class Flippy:
         banana = Fruit(name='banana', produce_lookup_code='4011')
         flippy.is_enabled('my_cool_feature', banana)
         ```
+
+        Features which don't exist (or which the registry knows are missing,
+        or which aren't declared when the registry is `declared_only`) get
+        their declared default without asking the backend. So do features
+        which can't be checked because the backend is unavailable.
+
+        If the backend doesn't answer within `timeout` seconds (or the
+        timeout given to `Flippy` itself), the last value seen for the
+        feature is used instead, or the declared default if there isn't one.
+
+        ```python
+        flippy.is_enabled('my_cool_feature', user, timeout=0.05)
+        ```
         """
+        profiler = profiling.profiler
+        sampled = profiler is not None and profiler.sample()
+        recorder = recording.recorder
+        recorded = recorder is not None and recorder.sample()
+        if not (instrumentation.listeners or sampled or recorded):
+            return self._evaluate(feature, target, timeout)[0]
+
+        memoized = self._memo is not None and feature in self._memo
+        start = time.perf_counter()
+        result, outcome = self._evaluate(feature, target, timeout)
+        duration = time.perf_counter() - start
+        instrumentation.evaluated(feature, result, outcome, duration)
+        if sampled:
+            profiler.record(
+                'is_enabled', feature, self._backend,
+                'memoized' if memoized and outcome == 'found' else outcome,
+                duration,
+            )
+        if recorded:
+            recorder.record(feature, None if target is None else self._to_flipper_id(target), result)
+        return result
+
+    def _evaluate(self, feature: FeatureName, target, timeout: float | None) -> tuple[bool, str]:
+        "Check a feature, returning the result and how it was arrived at."
+        registry = self._registry
+        if not registry.should_look_up(feature):
+            return registry.default(feature), 'skipped'
+
+        if timeout is None:
+            timeout = self._timeout
+
+        outcome = 'found'
         try:
-            f = self._backend.get(feature)
+            f = self._get(feature, timeout)
         except FeatureNotFound:
-            return False
+            registry.record_missing(feature)
+            registry.forget(feature)
+            return registry.default(feature), 'not_found'
+        except BackendUnavailable as e:
+            logger.warning(f"Using the default for {feature}: {e}")
+            return registry.default(feature), 'unavailable'
+        except TimeoutError:
+            registry.record_timeout(feature)
+            outcome = 'timeout'
+            f = registry.last_seen(feature)
+            if f is None:
+                logger.warning(f"Checking {feature} timed out after {timeout}s; using the default")
+                return registry.default(feature), outcome
+            logger.warning(f"Checking {feature} timed out after {timeout}s; using the last value seen")
 
         # if the boolean gate is on or off, that's final
         match f.state:
             case 'on':
-                return True
+                return True, outcome
             case 'off':
-                return False
+                return False, outcome
 
         # if the feature is conditional and no target was given, use a constant
         if target is None:
@@ -103,13 +191,13 @@ class Flippy:
             f.percentage_of_time_gate.is_open(actor, feature),
             f.expression_gate.is_open(actor, feature),
         ]):
-            return True
+            return True, outcome
         
         # TODO: special check whether actor is a member of an enabled group
         # (using the Django authentication system)
         ...
         
-        return False
+        return False, outcome
     
     def create(self, feature: FeatureName) -> bool:
         """
@@ -120,8 +208,51 @@ class Flippy:
         flag's state without explicitly creating it, it's up to the backend
         whether to support that or raise an exception.
         """
-        return self._backend.add(feature)
+        result = self._backend.add(feature)
+        self._registry.forget_missing(feature)
+        self._forget(feature)
+        return result
     
+    def prefetch(self, features: Iterable[FeatureName]) -> None:
+        """
+        Read several features from the backend at once, so that checking
+        them afterwards doesn't cost a read each. This only helps a
+        memoizing `Flippy`, like `request.flippy`.
+
+        ```python
+        request.flippy.prefetch(['my_cool_feature', 'my_other_feature'])
+        ```
+        """
+        memo = self._memo
+        if memo is None:
+            return
+
+        registry = self._registry
+        wanted = [
+            f for f in dict.fromkeys(features)
+            if f not in memo and registry.should_look_up(f)
+        ]
+        if not wanted:
+            return
+
+        try:
+            if self._timeout is None:
+                found = self._backend.get_multi(wanted)
+            else:
+                found = self._backend.call_with_deadline(self._timeout, self._backend.get_multi, wanted)
+        except (BackendUnavailable, FeatureNotFound, TimeoutError):
+            # each feature will be read on its own when it's checked
+            logger.warning(f"Couldn't prefetch {', '.join(wanted)}")
+            return
+
+        for f in found:
+            memo[f.key] = f
+            registry.remember(f)
+        for feature in wanted:
+            if feature not in memo:
+                memo[feature] = None
+                registry.record_missing(feature)
+
     def get_all_feature_names(self) -> set[FeatureName]:
         """
         Get a list of all known feature flag names.
@@ -132,11 +263,22 @@ class Flippy:
         """
         Check if a specific feature name is known to this backend.
         """
+        if not self._registry.should_look_up(feature):
+            return False
+
         try:
-            self._backend.get(feature)
+            self._get(feature, self._timeout)
             return True
         except FeatureNotFound:
+            self._registry.record_missing(feature)
             return False
+        except BackendUnavailable:
+            return self._registry.is_declared(feature)
+        except TimeoutError:
+            return (
+                self._registry.is_declared(feature)
+                or self._registry.last_seen(feature) is not None
+            )
     
     def get_feature_state(self, feature: FeatureName) -> FeatureState:
         """
@@ -147,7 +289,17 @@ class Flippy:
         This method is provided so that it's possible to build a frontend
         (web, CLI, etc.) for controlling feature flags.
         """
-        f = self._backend.get(feature)
+        profiler = profiling.profiler
+        if profiler is None or not profiler.sample():
+            f = self._backend.get(feature)
+        else:
+            start = time.perf_counter()
+            try:
+                f = self._backend.get(feature)
+            except FeatureNotFound:
+                profiler.record('get_feature_state', feature, self._backend, 'not_found', time.perf_counter() - start)
+                raise
+            profiler.record('get_feature_state', feature, self._backend, 'found', time.perf_counter() - start)
         return FeatureState(
             key=f.key,
             boolean=f.boolean_gate.value,
@@ -165,6 +317,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.enable(f.key, Gate.Boolean)
+            self._forget(feature)
         except FeatureNotFound:
             pass
 
@@ -177,6 +330,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.enable(f.key, Gate.Actors, self._to_flipper_id(target))
+            self._forget(feature)
         except FeatureNotFound:
             pass
     
@@ -195,6 +349,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.enable(f.key, Gate.Groups, self._to_flipper_id(target))
+            self._forget(feature)
         except FeatureNotFound:
             pass
     
@@ -214,6 +369,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.enable(f.key, Gate.PercentageOfActors, percentage)
+            self._forget(feature)
         except FeatureNotFound:
             pass
 
@@ -233,6 +389,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.enable(f.key, Gate.PercentageOfTime, percentage)
+            self._forget(feature)
         except FeatureNotFound:
             pass
 
@@ -248,6 +405,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.disable(f.key, Gate.Boolean)
+            self._forget(feature)
         except FeatureNotFound:
             pass
 
@@ -258,6 +416,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.disable(f.key, Gate.Actors, self._to_flipper_id(target))
+            self._forget(feature)
         except FeatureNotFound:
             pass
     
@@ -268,6 +427,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.disable(f.key, Gate.Groups, self._to_flipper_id(target))
+            self._forget(feature)
         except FeatureNotFound:
             pass
     
@@ -279,6 +439,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.disable(f.key, Gate.PercentageOfActors)
+            self._forget(feature)
         except FeatureNotFound:
             pass
 
@@ -290,6 +451,7 @@ class Flippy:
         try:
             f = self._backend.get(feature)
             self._backend.disable(f.key, Gate.PercentageOfTime)
+            self._forget(feature)
         except FeatureNotFound:
             pass
     
@@ -299,7 +461,9 @@ class Flippy:
         which clears all state associated with the flag, setting it back to
         disabled for _everyone_ including those you had previously opted in.
         """
-        return self._backend.clear(feature)
+        result = self._backend.clear(feature)
+        self._forget(feature)
+        return result
 
     def destroy(self, feature: FeatureName) -> bool:
         """
@@ -307,7 +471,36 @@ class Flippy:
         destructive action clearing all state and removing the flag from the
         set of "known features".
         """
-        return self._backend.remove(feature)
+        result = self._backend.remove(feature)
+        self._forget(feature)
+        return result
+
+    def _get(self, feature: FeatureName, timeout: float | None) -> Feature:
+        memo = self._memo
+        if memo is not None and feature in memo:
+            f = memo[feature]
+            if f is None:
+                raise FeatureNotFound(feature)
+            return f
+
+        try:
+            if timeout is None:
+                f = self._backend.get(feature)
+            else:
+                f = self._backend.call_with_deadline(timeout, self._backend.get, feature)
+        except FeatureNotFound:
+            if memo is not None:
+                memo[feature] = None
+            raise
+
+        self._registry.remember(f)
+        if memo is not None:
+            memo[feature] = f
+        return f
+
+    def _forget(self, feature: FeatureName) -> None:
+        if self._memo is not None:
+            self._memo.pop(feature, None)
 
     def _to_flipper_id(self, object) -> str:
         if hasattr(object, 'get_flipper_id'):
@@ -0,0 +1,371 @@
+"""
+Hooks for seeing what Flippy is doing: which features are checked, what
+the answers are, and how long backends take.
+
+Listeners are registered in `listeners` (or with `FLIPPY_LISTENERS` in
+settings). When there are none, the only cost is checking that the list is
+empty.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from typing import Any, Iterable, Protocol
+
+from flippy import deadline
+from flippy.backends.base import BaseBackend
+from flippy.core import Feature, FeatureName, Gate
+from flippy.exceptions import FeatureNotFound
+
+logger = logging.getLogger(__name__)
+
+# What happened when a feature was checked:
+# - 'found': the backend had it
+# - 'not_found': the backend doesn't know it (the default was used)
+# - 'skipped': the registry said not to look it up (the default was used)
+# - 'unavailable': the backend couldn't be reached (the default was used)
+# - 'timeout': the backend was too slow (the last value or default was used)
+Outcome = str
+
+
+class Listener(Protocol):
+    def evaluated(self, feature: FeatureName, result: bool, outcome: Outcome, duration: float) -> None:
+        "Called after `Flippy.is_enabled` checks a feature."
+        ...
+
+    def backend_called(self, backend: str, method: str, duration: float, error: BaseException | None) -> None:
+        "Called after a call to an `InstrumentedBackend` returns or raises."
+        ...
+
+
+listeners: list[Listener] = []
+
+
+def evaluated(feature: FeatureName, result: bool, outcome: Outcome, duration: float) -> None:
+    "Tell every listener about a feature check."
+    for listener in listeners:
+        try:
+            listener.evaluated(feature, result, outcome, duration)
+        except Exception:
+            logger.exception(f"Flippy listener {listener} failed")
+
+
+def backend_called(backend: str, method: str, duration: float, error: BaseException | None) -> None:
+    "Tell every listener about a backend call."
+    for listener in listeners:
+        try:
+            listener.backend_called(backend, method, duration, error)
+        except Exception:
+            logger.exception(f"Flippy listener {listener} failed")
+
+
+def build_listener(spec) -> Listener:
+    "Build a listener (or sink, or tracer) from a dotted path, or a tuple of `(dotted path, kwargs)`."
+    from django.utils.module_loading import import_string
+
+    if isinstance(spec, tuple):
+        spec, kwargs = spec
+    else:
+        kwargs = {}
+    return import_string(spec)(**kwargs)
+
+
+# seconds; the last bucket catches everything slower
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+
+class Histogram:
+    "Counts of observations falling at or under each bucket's upper bound."
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        "The upper bound of the bucket holding the `q`th quantile."
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+        }
+
+
+class Sink(Protocol):
+    def emit(self, snapshot: dict) -> None:
+        "Send a snapshot of aggregated metrics somewhere."
+        ...
+
+
+class LoggingSink:
+    "Logs each snapshot as JSON."
+    def __init__(self, logger_name: str = 'flippy.metrics', level: int = logging.INFO):
+        self._logger = logging.getLogger(logger_name)
+        self._level = level
+
+    def emit(self, snapshot: dict) -> None:
+        self._logger.log(self._level, json.dumps(snapshot, separators=(',', ':')))
+
+
+class JSONLinesSink:
+    "Appends each snapshot to a file, one JSON object per line."
+    def __init__(self, path: str):
+        self._path = path
+
+    def emit(self, snapshot: dict) -> None:
+        with open(self._path, 'a') as f:
+            f.write(json.dumps(snapshot, separators=(',', ':')) + '\n')
+
+
+class Metrics:
+    """
+    A listener which aggregates counters and latency histograms per feature
+    and per backend method, in process:
+
+    ```python
+    # settings.py
+
+    FLIPPY_LISTENERS = [
+        ('flippy.instrumentation.Metrics', {
+            'sinks': ['flippy.instrumentation.LoggingSink'],
+            'interval': 60,
+        }),
+    ]
+    ```
+
+    Every `interval` seconds (if given), the next event exports a snapshot
+    to each of `sinks` and starts counting afresh. You can also call
+    `export()` or `snapshot()` yourself. Sinks may be given like listeners
+    in `FLIPPY_LISTENERS`, as dotted paths.
+    """
+    def __init__(
+            self,
+            sinks: list[Sink] | None = None,
+            interval: float | None = None,
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        ):
+        self.sinks = [
+            build_listener(s) if isinstance(s, (str, tuple)) else s
+            for s in sinks or []
+        ]
+        self.interval = interval
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._started = time.time()
+        self._last_export = time.monotonic()
+        self._features: dict[FeatureName, dict[str, Any]] = {}
+        self._calls: dict[tuple[str, str], dict[str, Any]] = {}
+
+    def evaluated(self, feature: FeatureName, result: bool, outcome: Outcome, duration: float) -> None:
+        with self._lock:
+            stats = self._features.get(feature)
+            if stats is None:
+                stats = self._features[feature] = {
+                    'calls': 0, 'true': 0, 'false': 0,
+                    'not_found': 0, 'errors': 0, 'timeouts': 0,
+                    'latency': Histogram(self.buckets),
+                }
+            stats['calls'] += 1
+            stats['true' if result else 'false'] += 1
+            match outcome:
+                case 'not_found' | 'skipped':
+                    stats['not_found'] += 1
+                case 'unavailable':
+                    stats['errors'] += 1
+                case 'timeout':
+                    stats['timeouts'] += 1
+            stats['latency'].observe(duration)
+        self._maybe_export()
+
+    def backend_called(self, backend: str, method: str, duration: float, error: BaseException | None) -> None:
+        with self._lock:
+            stats = self._calls.get((backend, method))
+            if stats is None:
+                stats = self._calls[(backend, method)] = {
+                    'calls': 0, 'not_found': 0, 'errors': 0,
+                    'latency': Histogram(self.buckets),
+                }
+            stats['calls'] += 1
+            if isinstance(error, FeatureNotFound):
+                stats['not_found'] += 1
+            elif error is not None:
+                stats['errors'] += 1
+            stats['latency'].observe(duration)
+        self._maybe_export()
+
+    def snapshot(self, reset: bool = False) -> dict:
+        "Everything counted so far, as a JSON-friendly dict."
+        with self._lock:
+            snapshot = {
+                'started': self._started,
+                'ended': time.time(),
+                'features': {
+                    feature: self._export_stats(stats)
+                    for feature, stats in self._features.items()
+                },
+                'backend_calls': {
+                    f'{backend}.{method}': self._export_stats(stats)
+                    for (backend, method), stats in self._calls.items()
+                },
+            }
+            if reset:
+                self._reset()
+        return snapshot
+
+    def export(self, reset: bool = True) -> dict:
+        "Send a snapshot to every sink."
+        snapshot = self.snapshot(reset=reset)
+        for sink in self.sinks:
+            try:
+                sink.emit(snapshot)
+            except Exception:
+                logger.exception(f"Flippy metrics sink {sink} failed")
+        return snapshot
+
+    @staticmethod
+    def _export_stats(stats: dict) -> dict:
+        return {k: v.to_dict() if isinstance(v, Histogram) else v for k, v in stats.items()}
+
+    def _maybe_export(self) -> None:
+        if self.interval is None:
+            return
+        with self._lock:
+            due = time.monotonic() - self._last_export >= self.interval
+            if due:
+                # claim this export so other threads don't also do it
+                self._last_export = time.monotonic()
+        if due:
+            self.export()
+
+
+class InstrumentedBackend(BaseBackend):
+    """
+    Wraps another backend and tells listeners how long each call took, and
+    whether it raised. `FLIPPY_LISTENERS` wraps the configured backend in one
+    of these automatically.
+    """
+    def __init__(self, inner: BaseBackend, name: str | None = None):
+        self.inner = inner
+        self.name = name or inner.__class__.__name__
+
+    def __getattr__(self, name: str):
+        # anything beyond the backend protocol (compact_change_log,
+        # rebuild_snapshot, flush, ...) goes straight to the inner backend
+        if name == 'inner':
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def _call(self, method: str, fn, *args):
+        if not listeners:
+            return deadline.call_within(self.inner, fn, *args)
+
+        start = time.perf_counter()
+        error = None
+        try:
+            return deadline.call_within(self.inner, fn, *args)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            backend_called(self.name, method, time.perf_counter() - start, error)
+
+    def features(self) -> set[FeatureName]:
+        "Get the set of known features."
+        return self._call('features', self.inner.features)
+
+    def add(self, feature: FeatureName) -> bool:
+        "Add a feature to the set of known features."
+        return self._call('add', self.inner.add, feature)
+
+    def remove(self, feature: FeatureName) -> bool:
+        "Remove a feature from the set of known features."
+        return self._call('remove', self.inner.remove, feature)
+
+    def clear(self, feature: FeatureName) -> bool:
+        "Clear all gate values for a feature."
+        return self._call('clear', self.inner.clear, feature)
+
+    def get(self, feature: FeatureName) -> Feature:
+        "Get all gate values for a feature."
+        return self._call('get', self.inner.get, feature)
+
+    def enable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Enable a gate for a thing."
+        return self._call('enable', self.inner.enable, feature, gate, thing)
+
+    def disable(self, feature: FeatureName, gate: Gate, thing: str | int | None=None) -> bool:
+        "Disable a gate for a thing."
+        return self._call('disable', self.inner.disable, feature, gate, thing)
+
+    def get_multi(self, features: list[FeatureName]) -> list[Feature]:
+        "Get all gate values for several features at once."
+        return self._call('get_multi', self.inner.get_multi, features)
+
+    def get_all(self) -> list[Feature]:
+        "Get all gate values for all features at once."
+        return self._call('get_all', self.inner.get_all)
+
+    def to_json(self) -> str:
+        "Produce a JSON-formatted string containing state for all features."
+        return self._call('to_json', self.inner.to_json)
+
+    def from_json(self, new_state: str) -> None:
+        "Clear current state and replace with state from a JSON-formatted string."
+        return self._call('from_json', self.inner.from_json, new_state)
+
+    def version(self) -> int | None:
+        "The inner backend's version."
+        return self._call('version', self.inner.version)
+
+    def get_changed_since(self, revision: int) -> list[Feature]:
+        "Get all gate values for features changed after `revision`."
+        return self._call('get_changed_since', self.inner.get_changed_since, revision)
+
+    def get_removed_since(self, revision: int, known: Iterable[FeatureName]) -> set[FeatureName]:
+        "Which of the `known` features were removed after `revision`."
+        return self._call('get_removed_since', self.inner.get_removed_since, revision, known)
+
+    def call_with_deadline(self, timeout: float, fn, *args):
+        """
+        Call `fn(*args)` with a deadline covering this wrapper too; the inner
+        backend gets whatever time is left.
+        """
+        with deadline.limit(timeout):
+            return fn(*args)
+
+    def invalidate(self, feature: FeatureName | None = None) -> None:
+        "Forget any cached state for `feature` (or for every feature)."
+        self.inner.invalidate(feature)
+
+    def warm_up(self) -> None:
+        "Load any state this backend caches, such as before forking workers."
+        self.inner.warm_up()
+
+    def after_fork(self) -> None:
+        "Rebuild per-process resources (clients, threads, locks) in a forked child."
+        self.inner.after_fork()
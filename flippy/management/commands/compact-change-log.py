@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from flippy.config import flippy_backend
+
+
+class Command(BaseCommand):
+    help = "Delete old entries from the Flippy change log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=float,
+            help="Keep this many days of changes (default: the backend's change_log_retention)",
+        )
+
+    def handle(self, *args, **options):
+        if not hasattr(flippy_backend, 'compact_change_log'):
+            raise CommandError(
+                f"{flippy_backend.__class__.__name__} doesn't keep a change log"
+            )
+
+        before = None
+        if options['days'] is not None:
+            before = timezone.now() - timedelta(days=options['days'])
+
+        deleted = flippy_backend.compact_change_log(before)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} change log entries")
+        )
@@ -0,0 +1,55 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from flippy.profiling import format_site, top_sites
+
+
+class Command(BaseCommand):
+    help = "Report the slowest feature checks recorded by FLIPPY_PROFILE"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            help="A profile written by FLIPPY_PROFILE (default: its 'path' setting)",
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=20,
+            help="How many call sites to show (default: 20)",
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help="Print the report as JSON",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path is None:
+            profile = getattr(settings, 'FLIPPY_PROFILE', None)
+            path = profile.get('path') if isinstance(profile, dict) else None
+        if not path:
+            raise CommandError(
+                "Pass --path, or set a 'path' in FLIPPY_PROFILE"
+            )
+
+        sites = []
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        sites.extend(json.loads(line)['sites'])
+        except FileNotFoundError:
+            raise CommandError(f"{path} doesn't exist; has anything been profiled yet?")
+        sites = top_sites(sites, options['top'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(sites, indent=2))
+            return
+        if not sites:
+            self.stdout.write("No slow feature checks were recorded")
+            return
+        for site in sites:
+            self.stdout.write(format_site(site))
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from flippy import Flippy, recording
+from flippy.backends.loading import build_backend
+from flippy.config import flippy_backend, flippy_registry
+from flippy.recording import read_trace, replay, trace_files
+
+
+class Command(BaseCommand):
+    help = "Replay feature checks recorded by FLIPPY_RECORD, and compare the results"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help="Trace files (default: FLIPPY_RECORD's 'path' and its rotated files)",
+        )
+        parser.add_argument(
+            '--backend',
+            help="Replay against this backend, like FLIPPY_BACKEND (default: the configured backend)",
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help="Only replay the first this many checks",
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1,
+            help="Replay this many times, for a steadier throughput (default: 1)",
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=10,
+            help="How many mismatches to show (default: 10)",
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths']
+        if not paths:
+            record = getattr(settings, 'FLIPPY_RECORD', None)
+            if not record:
+                raise CommandError("Pass trace files, or set a 'path' in FLIPPY_RECORD")
+            paths = trace_files(record['path'])
+        if not paths:
+            raise CommandError("Nothing has been recorded yet")
+
+        records = list(read_trace(paths))
+        if options['limit'] is not None:
+            records = records[:options['limit']]
+        if not records:
+            raise CommandError("The trace is empty")
+
+        backend = flippy_backend if options['backend'] is None else build_backend(options['backend'])
+        flippy = Flippy(backend, flippy_registry)
+
+        # don't record the replayed checks, perhaps into the very trace
+        # being replayed
+        recorder = recording.recorder
+        recording.set_recorder(None)
+        try:
+            for _ in range(options['repeat']):
+                result = replay(flippy, records)
+                self.stdout.write(
+                    f"Replayed {result.checks} checks in {result.seconds:.3f}s "
+                    f"({result.checks_per_second:,.0f}/s)"
+                )
+        finally:
+            recording.set_recorder(recorder)
+
+        if not result.mismatches:
+            self.stdout.write(self.style.SUCCESS("All results matched"))
+            return
+
+        for record in result.mismatches[:options['show']]:
+            self.stdout.write(
+                f"{record.feature} for {record.flipper_id or '(no target)'}: "
+                f"recorded {record.result}, got {not record.result}"
+            )
+        raise CommandError(
+            f"{len(result.mismatches)} of {result.checks} results differed "
+            "(features with a percentage of time gate can differ by chance)"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from flippy.config import flippy_backend
+
+
+class Command(BaseCommand):
+    help = "Regenerate DjangoSnapshotBackend's snapshot from the Flippy tables"
+
+    def handle(self, *args, **options):
+        if not hasattr(flippy_backend, 'rebuild_snapshot'):
+            raise CommandError(
+                f"{flippy_backend.__class__.__name__} doesn't keep a snapshot"
+            )
+
+        flippy_backend.rebuild_snapshot()
+
+        self.stdout.write(
+            self.style.SUCCESS("Rebuilt the snapshot")
+        )
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand, CommandError
 from flippy.config import flippy_backend
 from flippy.backends import FlipperCloudBackend
+from flippy.sync import copy_from_cloud, reads_from_cloud
 from os import environ
 
 try:
@@ -18,13 +19,13 @@ class Command(BaseCommand):
                 "FLIPPER_CLOUD_TOKEN must be set in the environment for sync to operate"
             )
 
-        if isinstance(flippy_backend, FlipperCloudBackend):
+        if reads_from_cloud(flippy_backend):
             raise CommandError(
                 "Will not sync from Flipper Cloud back to Flipper Cloud"
             )
 
         source = FlipperCloudBackend(TOKEN)
-        flippy_backend.from_json(source.to_json())
+        copy_from_cloud(flippy_backend, source)
 
         self.stdout.write(
             self.style.SUCCESS(
@@ -1,12 +1,30 @@
 from flippy import Flippy
-from flippy.config import flippy_backend
+from flippy import accounting
+from flippy.config import (flippy_backend, flippy_registry,
+                           flippy_request_stats, flippy_timeout)
 
 
 def flippy_middleware(get_response):
-    flippy = Flippy(flippy_backend)
-
     def middleware(request):
-        request.flippy = flippy
+        if flippy_request_stats:
+            return accounted(request)
+
+        # a fresh Flippy per request, so that each feature is read at most
+        # once per request
+        request.flippy = Flippy(flippy_backend, flippy_registry, flippy_timeout, memoize=True)
         response = get_response(request)
         return response
+
+    def accounted(request):
+        stats = request.flippy_stats = accounting.RequestStats()
+        backend = accounting.AccountingBackend(flippy_backend, stats)
+        request.flippy = Flippy(backend, flippy_registry, flippy_timeout, memoize=True)
+
+        token = accounting.current.set(stats)
+        try:
+            response = get_response(request)
+        finally:
+            accounting.current.reset(token)
+        response[accounting.HEADER] = stats.summary()
+        return response
     return middleware
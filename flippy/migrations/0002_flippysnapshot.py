@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flippy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlippySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('data', models.TextField(default='{}')),
+            ],
+        ),
+    ]
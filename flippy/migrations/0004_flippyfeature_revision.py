@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flippy', '0003_flippyversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flippyfeature',
+            name='revision',
+            field=models.PositiveBigIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='flippyfeature',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
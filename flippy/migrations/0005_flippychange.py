@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flippy', '0004_flippyfeature_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlippyChange',
+            fields=[
+                ('sequence', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('feature', models.CharField(max_length=150)),
+                ('operation', models.CharField(max_length=16)),
+                ('gate', models.CharField(default=None, max_length=32, null=True)),
+                ('thing', models.CharField(default=None, max_length=150, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['sequence'],
+            },
+        ),
+        migrations.AddField(
+            model_name='flippyversion',
+            name='compacted_through',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
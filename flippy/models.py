@@ -1,7 +1,7 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-from flippy.core import Feature
+from flippy.core import Change, Feature, Gate
 
 
 class FlippyFeature(models.Model):
@@ -23,6 +23,9 @@ class FlippyFeature(models.Model):
             MaxValueValidator(100),
         ]
     )
+    # the global version (see FlippyVersion) as of this feature's last change
+    revision = models.PositiveBigIntegerField(default=0, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.key
@@ -91,3 +94,65 @@ class FlippyGroupGate(models.Model):
     
     def __str__(self):
         return self.key
+
+
+class FlippySnapshot(models.Model):
+    # The entire feature state, serialized the same way `to_json` does,
+    # kept in a single row by `DjangoSnapshotBackend`.
+    version = models.PositiveBigIntegerField(default=0)
+    data = models.TextField(default='{}')
+
+    def __str__(self):
+        return f"snapshot v{self.version}"
+
+
+class FlippyVersion(models.Model):
+    # A single row whose version is bumped by every write through
+    # `DjangoBackend`, so caches can cheaply tell whether anything changed.
+    version = models.PositiveBigIntegerField(default=0)
+    # the highest change log sequence which has been compacted away
+    compacted_through = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"version {self.version}"
+
+
+class FlippyChange(models.Model):
+    # An append-only log of every write through `DjangoBackend`, so that
+    # followers can apply deltas instead of reloading everything.
+    # The sequence is the global version (see FlippyVersion) after the change.
+    sequence = models.PositiveBigIntegerField(primary_key=True)
+    feature = models.CharField(max_length=150)
+    operation = models.CharField(max_length=16)
+    gate = models.CharField(max_length=32, null=True, default=None)
+    thing = models.CharField(max_length=150, null=True, default=None)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['sequence']
+
+    def __str__(self):
+        return f"{self.sequence}: {self.operation} {self.feature}"
+
+    def as_change(self) -> Change:
+        gate = None if self.gate is None else Gate(self.gate)
+        thing = self.thing
+        if thing is not None and gate in (Gate.PercentageOfActors, Gate.PercentageOfTime):
+            thing = int(thing)
+        return Change(
+            feature=self.feature,
+            operation=self.operation,
+            gate=gate,
+            thing=thing,
+            sequence=self.sequence,
+        )
+
+    @classmethod
+    def from_change(cls, change: Change):
+        return cls(
+            sequence=change.sequence,
+            feature=change.feature,
+            operation=change.operation,
+            gate=None if change.gate is None else change.gate.value,
+            thing=None if change.thing is None else str(change.thing),
+        )
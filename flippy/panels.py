@@ -0,0 +1,87 @@
+"""
+A Django Debug Toolbar panel showing what Flippy did during a request:
+
+```python
+# settings.py
+
+FLIPPY_REQUEST_STATS = True
+DEBUG_TOOLBAR_PANELS = [
+    # ... the usual panels ...
+    'flippy.panels.FlippyPanel',
+]
+```
+
+Only import this module if django-debug-toolbar is installed.
+"""
+from debug_toolbar.panels import Panel
+from django.utils.html import format_html, format_html_join
+
+
+class FlippyPanel(Panel):
+    title = 'Flippy'
+
+    @property
+    def nav_subtitle(self) -> str:
+        stats = self.get_stats()
+        if not stats:
+            return ''
+        return (
+            f"{stats['flag_count']} flags, {stats['backend_call_count']} backend calls "
+            f"in {stats['backend_time'] * 1000:.1f}ms"
+        )
+
+    def generate_stats(self, request, response):
+        stats = getattr(request, 'flippy_stats', None)
+        if stats is None:
+            return
+        # stats are stored between requests, so keep them JSON-friendly
+        self.record_stats({
+            'flag_count': len(stats.flags),
+            'evaluations': stats.evaluations,
+            'evaluation_time': stats.evaluation_time,
+            'backend_call_count': stats.total_backend_calls,
+            'backend_calls': stats.backend_calls,
+            'backend_time': stats.backend_time,
+            'queries': stats.queries,
+            'flags': [
+                {
+                    'feature': feature,
+                    'count': len(evaluations),
+                    'results': sorted({str(e.result) for e in evaluations}),
+                    'outcomes': sorted({e.outcome for e in evaluations}),
+                    'time': sum(e.duration for e in evaluations),
+                }
+                for feature, evaluations in stats.flags.items()
+            ],
+        })
+
+    @property
+    def content(self) -> str:
+        stats = self.get_stats()
+        if not stats:
+            return format_html(
+                '<p>No stats were recorded. Set <code>FLIPPY_REQUEST_STATS = True</code> '
+                'and add <code>flippy_middleware</code>.</p>'
+            )
+
+        # format_html escapes its arguments into strings first, so numbers
+        # have to be formatted before they're passed in
+        summary = format_html(
+            '<p>{} checks of {} flags took {}ms. '
+            'Backend calls: {} ({}ms, {} SQL queries).</p>',
+            stats['evaluations'], stats['flag_count'], f"{stats['evaluation_time'] * 1000:.2f}",
+            ', '.join(f'{m} ×{n}' for m, n in stats['backend_calls'].items()) or 'none',
+            f"{stats['backend_time'] * 1000:.2f}", stats['queries'],
+        )
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (f['feature'], f['count'], ', '.join(f['results']), ', '.join(f['outcomes']), f"{f['time'] * 1000:.2f}")
+                for f in stats['flags']
+            ),
+        )
+        return format_html(
+            '{}<table><thead><tr><th>Feature</th><th>Checks</th><th>Results</th>'
+            '<th>Outcomes</th><th>Time (ms)</th></tr></thead><tbody>{}</tbody></table>',
+            summary, rows,
+        )
@@ -0,0 +1,227 @@
+"""
+A sampling profiler for finding the code which checks features too often or
+too slowly, such as template loops and hot views.
+
+With `FLIPPY_PROFILE` in settings (or a `profiler` set here), a fraction of
+`Flippy.is_enabled` and `Flippy.get_feature_state` calls are timed. Those
+slower than the threshold are recorded along with the backend, how the
+feature was found, and where the call came from: a template and line, or a
+file, line and function. Every `interval` seconds, the slowest call sites
+are logged to the `flippy.profile` logger (and appended to `path`, for the
+`flippy-profile` management command to report on). When no profiler is
+set, the only cost is checking that it isn't.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any
+
+import django
+
+from flippy.backends.base import BaseBackend
+from flippy.core import FeatureName
+
+logger = logging.getLogger('flippy.profile')
+
+_FLIPPY_DIR = os.path.dirname(__file__) + os.sep
+_DJANGO_DIR = os.path.dirname(django.__file__) + os.sep
+
+
+def call_site() -> str:
+    """
+    Where Flippy was called from: the template and line being rendered, if
+    any, otherwise the first frame outside of Flippy and Django.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_DJANGO_DIR):
+            # django.template.base.Node.render_annotated is on the stack for
+            # every template node being rendered
+            if frame.f_code.co_name == 'render_annotated':
+                node = frame.f_locals.get('self')
+                origin = getattr(node, 'origin', None)
+                token = getattr(node, 'token', None)
+                if origin is not None and token is not None:
+                    return f'{origin.template_name or origin.name}:{token.lineno}'
+        elif not filename.startswith(_FLIPPY_DIR):
+            return f'{filename}:{frame.f_lineno} ({frame.f_code.co_name})'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def backend_name(backend: BaseBackend) -> str:
+    # InstrumentedBackend is only a wrapper; name what it wraps
+    from flippy.instrumentation import InstrumentedBackend
+    while isinstance(backend, InstrumentedBackend):
+        backend = backend.inner
+    return backend.__class__.__name__
+
+
+class Profiler:
+    """
+    Samples `sample_rate` of feature checks, and records the ones taking at
+    least `threshold` seconds:
+
+    ```python
+    # settings.py
+
+    FLIPPY_PROFILE = {
+        'sample_rate': 0.01,
+        'threshold': 0.005,
+        'interval': 300,
+        'path': '/var/tmp/flippy-profile.jsonl',
+    }
+    ```
+
+    Every `interval` seconds (if given), the next recorded call logs the
+    `top` slowest call sites (by total time), appends them to `path` (if
+    given), and starts afresh. You can also call `report()` or `export()`
+    yourself.
+    """
+    def __init__(
+            self,
+            sample_rate: float = 0.01,
+            threshold: float = 0.005,
+            top: int = 20,
+            interval: float | None = 300,
+            path: str | None = None,
+            seed: int | None = None,
+        ):
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.top = top
+        self.interval = interval
+        self.path = path
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._started = time.time()
+        self._last_export = time.monotonic()
+        # (method, feature, call site, backend) -> stats
+        self._sites: dict[tuple[str, FeatureName, str, str], dict[str, Any]] = {}
+
+    def sample(self) -> bool:
+        "Whether to time this call."
+        return self._random.random() < self.sample_rate
+
+    def record(
+            self,
+            method: str,
+            feature: FeatureName,
+            backend: BaseBackend,
+            outcome: str,
+            duration: float,
+        ) -> None:
+        """
+        Record a sampled call, if it was slow enough. `outcome` is how the
+        feature was found (see `flippy.instrumentation`), or `'memoized'`
+        if the `Flippy` object had already read it.
+        """
+        if duration < self.threshold:
+            return
+
+        key = (method, feature, call_site(), backend_name(backend))
+        with self._lock:
+            stats = self._sites.get(key)
+            if stats is None:
+                stats = self._sites[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'outcomes': {}}
+            stats['count'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+            stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+        self._maybe_export()
+
+    def report(self, top: int | None = None, reset: bool = False) -> dict:
+        "The slowest call sites so far, as a JSON-friendly dict."
+        with self._lock:
+            sites = [
+                {
+                    'method': method,
+                    'feature': feature,
+                    'call_site': site,
+                    'backend': backend,
+                    **stats,
+                    'outcomes': dict(stats['outcomes']),
+                }
+                for (method, feature, site, backend), stats in self._sites.items()
+            ]
+            report = {
+                'started': self._started,
+                'ended': time.time(),
+                'sample_rate': self.sample_rate,
+                'threshold': self.threshold,
+                'sites': top_sites(sites, top or self.top),
+            }
+            if reset:
+                self._reset()
+        return report
+
+    def export(self, reset: bool = True) -> dict:
+        "Log the report, and append it to `path`."
+        report = self.report(reset=reset)
+        if not report['sites']:
+            return report
+
+        lines = [f"Slowest Flippy call sites (sampling {self.sample_rate:.2%} of calls):"]
+        lines.extend(format_site(s) for s in report['sites'])
+        logger.info('\n'.join(lines))
+        if self.path:
+            try:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(report, separators=(',', ':')) + '\n')
+            except OSError:
+                logger.exception(f"Couldn't write the Flippy profile to {self.path}")
+        return report
+
+    def _maybe_export(self) -> None:
+        if self.interval is None:
+            return
+        with self._lock:
+            due = time.monotonic() - self._last_export >= self.interval
+            if due:
+                # claim this export so other threads don't also do it
+                self._last_export = time.monotonic()
+        if due:
+            self.export()
+
+
+def top_sites(sites: list[dict], top: int) -> list[dict]:
+    "Combine call sites which appear more than once, and keep the `top` slowest."
+    merged: dict[tuple, dict] = {}
+    for site in sites:
+        key = (site['method'], site['feature'], site['call_site'], site['backend'])
+        into = merged.get(key)
+        if into is None:
+            merged[key] = {**site, 'outcomes': dict(site['outcomes'])}
+            continue
+        into['count'] += site['count']
+        into['total'] += site['total']
+        into['max'] = max(into['max'], site['max'])
+        for outcome, count in site['outcomes'].items():
+            into['outcomes'][outcome] = into['outcomes'].get(outcome, 0) + count
+    return sorted(merged.values(), key=lambda s: s['total'], reverse=True)[:top]
+
+
+def format_site(site: dict) -> str:
+    outcomes = ', '.join(f'{k}={v}' for k, v in sorted(site['outcomes'].items()))
+    return (
+        f"{site['total'] * 1000:9.1f}ms total {site['count']:6d} calls "
+        f"{site['max'] * 1000:8.1f}ms max  {site['method']}({site['feature']!r}) "
+        f"at {site['call_site']} via {site['backend']} [{outcomes}]"
+    )
+
+
+profiler: Profiler | None = None
+
+
+def set_profiler(new_profiler: Profiler | None) -> None:
+    "Profile with `new_profiler` (or stop profiling with None)."
+    global profiler
+    profiler = new_profiler
@@ -0,0 +1,196 @@
+"""
+Record a sample of real feature checks, and replay them later: to check that
+a change to caching or evaluation gives the same answers, or to benchmark
+with production's actual mix of features and actors.
+
+With `FLIPPY_RECORD` in settings (or a `recorder` set here), a fraction of
+`Flippy.is_enabled` calls are written to a local file as JSON lines of
+`[timestamp, feature, flipper_id, result]`, rotated like a log file. The
+`flippy-replay` management command checks the same features against a
+backend, and reports any different results and the throughput. When no
+recorder is set, the only cost is checking that it isn't.
+"""
+import atexit
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from flippy.core import FeatureName
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Record:
+    timestamp: float
+    feature: FeatureName
+    flipper_id: str | None
+    result: bool
+
+
+class Recorder:
+    """
+    Writes `sample_rate` of feature checks to `path`:
+
+    ```python
+    # settings.py
+
+    FLIPPY_RECORD = {
+        'path': '/var/tmp/flippy-trace.jsonl',
+        'sample_rate': 0.01,
+    }
+    ```
+
+    Records are buffered, and written `buffer_size` at a time (and when the
+    process exits). Once `path` is bigger than `max_bytes`, it's renamed to
+    `path.1` (and `path.1` to `path.2`, and so on), keeping `backup_count`
+    old files.
+    """
+    def __init__(
+            self,
+            path: str,
+            sample_rate: float = 0.01,
+            max_bytes: int = 10 * 1024 * 1024,
+            backup_count: int = 3,
+            buffer_size: int = 100,
+            seed: int | None = None,
+        ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer_size = buffer_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._buffer: list[str] = []
+        atexit.register(self.flush)
+
+    def sample(self) -> bool:
+        "Whether to record this call."
+        return self._random.random() < self.sample_rate
+
+    def record(self, feature: FeatureName, flipper_id: str | None, result: bool) -> None:
+        line = json.dumps([round(time.time(), 3), feature, flipper_id, result], separators=(',', ':'))
+        with self._lock:
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        "Write out any buffered records."
+        with self._lock:
+            if not self._buffer:
+                return
+            data = '\n'.join(self._buffer) + '\n'
+            self._buffer = []
+
+            # this runs inside feature checks, so never let a full disk (or
+            # another process rotating the same file) break one; the
+            # records are dropped instead
+            try:
+                try:
+                    size = os.path.getsize(self.path)
+                except FileNotFoundError:
+                    size = 0
+                if size and size + len(data) > self.max_bytes:
+                    self._rotate()
+                with open(self.path, 'a') as f:
+                    f.write(data)
+            except OSError:
+                logger.exception(f"Couldn't write Flippy checks to {self.path}")
+
+    def _rotate(self) -> None:
+        # another process writing the same path may have just rotated it,
+        # in which case there's nothing left to move
+        try:
+            if self.backup_count <= 0:
+                os.remove(self.path)
+                return
+            for i in range(self.backup_count - 1, 0, -1):
+                if os.path.exists(f'{self.path}.{i}'):
+                    os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+            os.replace(self.path, f'{self.path}.1')
+        except FileNotFoundError:
+            pass
+
+    def after_fork(self) -> None:
+        "Drop records buffered by the parent process, which will write them itself."
+        self._lock = threading.Lock()
+        self._buffer = []
+
+
+recorder: Recorder | None = None
+
+
+def set_recorder(new_recorder: Recorder | None) -> None:
+    "Record with `new_recorder` (or stop recording with None)."
+    global recorder
+    recorder = new_recorder
+
+
+def trace_files(path: str) -> list[str]:
+    "`path` and its rotated files, oldest first."
+    files = []
+    i = 1
+    while os.path.exists(f'{path}.{i}'):
+        files.append(f'{path}.{i}')
+        i += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_trace(paths: Iterable[str]) -> Iterator[Record]:
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield Record(*json.loads(line))
+
+
+class RecordedActor:
+    "Stands in for whatever object was checked, by its Flipper ID."
+    def __init__(self, flipper_id: str):
+        self.flipper_id = flipper_id
+
+    def get_flipper_id(self) -> str:
+        return self.flipper_id
+
+
+@dataclass
+class ReplayResult:
+    checks: int = 0
+    seconds: float = 0
+    mismatches: list[Record] = field(default_factory=list)
+
+    @property
+    def checks_per_second(self) -> float:
+        return self.checks / self.seconds if self.seconds else 0
+
+
+def replay(flippy, records: list[Record]) -> ReplayResult:
+    """
+    Check each recorded feature again with `flippy`, noting any results
+    which differ from the recorded ones. Features using a percentage of
+    time gate can legitimately differ.
+    """
+    # build targets first, so that only the checks are timed
+    targets = [None if r.flipper_id is None else RecordedActor(r.flipper_id) for r in records]
+    results = []
+    start = time.perf_counter()
+    for record, target in zip(records, targets):
+        results.append(flippy.is_enabled(record.feature, target))
+    seconds = time.perf_counter() - start
+
+    return ReplayResult(
+        checks=len(records),
+        seconds=seconds,
+        mismatches=[r for r, result in zip(records, results) if r.result != result],
+    )
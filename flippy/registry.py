@@ -0,0 +1,74 @@
+import time
+
+from flippy.core import Feature, FeatureName
+
+
+class FeatureRegistry:
+    """
+    What Flippy knows about features without asking a backend: which ones
+    are declared in code (and their default values), which ones were
+    recently found to be missing, and the last value seen for each one.
+
+    ```python
+    from flippy.config import flippy_registry
+
+    flippy_registry.declare('my_cool_feature')
+    flippy_registry.declare('my_safe_feature', default=True)
+    ```
+    """
+    def __init__(self, miss_ttl: float = 0, declared_only: bool = False):
+        """
+        Missing features are remembered for `miss_ttl` seconds (by default,
+        not at all). With `declared_only`, undeclared features are never
+        looked up and are always disabled.
+        """
+        self.miss_ttl = miss_ttl
+        self.declared_only = declared_only
+        self._declared: dict[FeatureName, bool] = {}
+        # name -> expiry
+        self._misses: dict[FeatureName, float] = {}
+        self._last_seen: dict[FeatureName, Feature] = {}
+        self.timeouts = 0
+
+    def declare(self, feature: FeatureName, default: bool = False) -> None:
+        "Declare a feature, and its value when the backend doesn't know it."
+        self._declared[feature] = default
+
+    def is_declared(self, feature: FeatureName) -> bool:
+        return feature in self._declared
+
+    def default(self, feature: FeatureName) -> bool:
+        "The value to use when a feature can't be looked up."
+        return self._declared.get(feature, False)
+
+    def should_look_up(self, feature: FeatureName) -> bool:
+        "Whether it's worth asking the backend about this feature."
+        if self.declared_only and feature not in self._declared:
+            return False
+        expiry = self._misses.get(feature)
+        return expiry is None or expiry < time.monotonic()
+
+    def record_missing(self, feature: FeatureName) -> None:
+        "Remember that the backend doesn't know this feature."
+        if self.miss_ttl > 0:
+            self._misses[feature] = time.monotonic() + self.miss_ttl
+
+    def forget_missing(self, feature: FeatureName) -> None:
+        "Forget that the backend didn't know this feature, e.g. after creating it."
+        self._misses.pop(feature, None)
+
+    def remember(self, feature: Feature) -> None:
+        "Remember the last value seen for a feature."
+        self._last_seen[feature.key] = feature
+
+    def last_seen(self, feature: FeatureName) -> Feature | None:
+        "The last value seen for a feature, if any."
+        return self._last_seen.get(feature)
+
+    def forget(self, feature: FeatureName) -> None:
+        "Forget the last value seen for a feature, e.g. because it's gone."
+        self._last_seen.pop(feature, None)
+
+    def record_timeout(self, feature: FeatureName) -> None:
+        "Count a lookup which didn't finish in time."
+        self.timeouts += 1
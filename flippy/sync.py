@@ -0,0 +1,51 @@
+from os import environ
+
+from django.core.exceptions import ImproperlyConfigured
+
+from flippy.backends import BaseBackend, FlipperCloudBackend, LayeredBackend
+from flippy.tracing import span
+
+
+def cloud_source(token: str | None = None) -> FlipperCloudBackend:
+    "A Flipper Cloud backend to sync from, using `FLIPPER_CLOUD_TOKEN` by default."
+    token = token or environ.get('FLIPPER_CLOUD_TOKEN')
+    if not token:
+        raise ImproperlyConfigured(
+            "FLIPPER_CLOUD_TOKEN must be set in the environment for sync to operate"
+        )
+    return FlipperCloudBackend(token)
+
+
+def reads_from_cloud(backend: BaseBackend) -> bool:
+    "Whether `backend` reads straight from Flipper Cloud (perhaps through caches or wrappers)."
+    while True:
+        if isinstance(backend, LayeredBackend):
+            backend = backend.backend
+        elif hasattr(backend, 'inner'):
+            # InstrumentedBackend, ChaosBackend
+            backend = backend.inner
+        else:
+            return isinstance(backend, FlipperCloudBackend)
+
+
+def copy_from_cloud(backend: BaseBackend, source: FlipperCloudBackend) -> None:
+    "Replace the state of `backend` with the state in Flipper Cloud."
+    with span('flippy.sync', {'flippy.sync_mode': 'copy'}):
+        backend.from_json(source.to_json())
+
+
+def sync(backend: BaseBackend, source: FlipperCloudBackend | None = None) -> None:
+    """
+    Bring `backend` up to date after a change in Flipper Cloud. Backends
+    which read from Flipper Cloud just forget what they've cached; others
+    get a fresh copy of everything.
+
+    Shared cache tiers (`DjangoCache`) are cleared for every process. Only
+    this process's own `MemoryCache` tiers are, though: other processes
+    keep serving theirs until they expire, so keep those TTLs short.
+    """
+    if reads_from_cloud(backend):
+        with span('flippy.sync', {'flippy.sync_mode': 'invalidate'}):
+            backend.invalidate()
+    else:
+        copy_from_cloud(backend, source or cloud_source())
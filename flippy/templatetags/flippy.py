@@ -0,0 +1,91 @@
+from django import template
+from django.core.exceptions import ImproperlyConfigured
+from django.template import NodeList, TemplateSyntaxError
+
+from flippy.context import FlippyContext
+
+register = template.Library()
+
+RENDER_CONTEXT_KEY = 'flippy_context'
+
+
+def flippy_context(context) -> FlippyContext:
+    "The FlippyContext for this template, from the context processor or the request."
+    flippy = context.get('flippy')
+    if flippy is not None:
+        return flippy
+
+    flippy = context.render_context.get(RENDER_CONTEXT_KEY)
+    if flippy is None:
+        request = getattr(context, 'request', None) or context.get('request')
+        if request is None:
+            raise ImproperlyConfigured(
+                "Flippy's template tags need a request; render with a RequestContext "
+                "(such as through `render()`) or turn on flippy.context.processor."
+            )
+        flippy = context.render_context[RENDER_CONTEXT_KEY] = FlippyContext(request)
+    return flippy
+
+
+@register.simple_tag(takes_context=True)
+def flippy_prefetch(context, *names) -> str:
+    """
+    Read several features at once, before the template checks them:
+    `{% flippy_prefetch "my_cool_feature" "my_other_feature" %}`
+    """
+    flippy_context(context)._prefetch(names)
+    return ''
+
+
+class IfFlagNode(template.Node):
+    child_nodelists = ('nodelist_true', 'nodelist_false')
+
+    def __init__(self, name: str, target, nodelist_true: NodeList, nodelist_false: NodeList):
+        self.name = name
+        self.target = target
+        self.nodelist_true = nodelist_true
+        self.nodelist_false = nodelist_false
+
+    def render(self, context) -> str:
+        target = None if self.target is None else self.target.resolve(context)
+        if flippy_context(context)._is_enabled(self.name, target):
+            return self.nodelist_true.render(context)
+        return self.nodelist_false.render(context)
+
+
+@register.tag
+def ifflag(parser, token):
+    """
+    Render a block only if a feature is enabled, globally or for a target:
+
+    ```html
+    {% ifflag "my_cool_feature" for user %}
+    <p>You have access to the cool new feature!</p>
+    {% else %}
+    <p>Nothing new to see here.</p>
+    {% endifflag %}
+    ```
+
+    The feature name must be a string, so that it's known when the template
+    is compiled.
+    """
+    bits = token.split_contents()
+    usage = '{% ifflag "feature_name" %} or {% ifflag "feature_name" for target %}'
+    if len(bits) not in (2, 4) or (len(bits) == 4 and bits[2] != 'for'):
+        raise TemplateSyntaxError(f"Usage: {usage}")
+
+    name = bits[1]
+    if len(name) < 3 or name[0] != name[-1] or name[0] not in '"\'':
+        raise TemplateSyntaxError(f"The feature name in {bits[0]} must be a quoted string")
+    name = name[1:-1]
+    target = parser.compile_filter(bits[3]) if len(bits) == 4 else None
+
+    nodelist_true = parser.parse(('else', 'endifflag'))
+    token = parser.next_token()
+    if token.contents == 'else':
+        nodelist_false = parser.parse(('endifflag',))
+        parser.delete_first_token()
+    else:
+        nodelist_false = NodeList()
+
+    return IfFlagNode(name, target, nodelist_true, nodelist_false)
@@ -0,0 +1,156 @@
+"""
+Optional spans around the slow parts of Flippy: database queries, calls to
+Flipper Cloud, cache tiers, and syncs.
+
+Spans go to whatever `tracer` is set here (or with `FLIPPY_TRACER` in
+settings). There's no tracing library dependency; a tracer only needs a
+`start_span(name, attributes)` method returning a context manager whose
+value has `set_attribute(key, value)`. When no tracer is set, a span costs
+one function call.
+
+Attributes used:
+
+- `flippy.feature`: the feature's name
+- `flippy.features`: how many features a bulk call asked for
+- `flippy.operation`: the kind of write (`add`, `enable`, ...)
+- `flippy.gate`: the gate being changed
+- `flippy.cache_tier`: which tier answered a `LayeredBackend` read
+  (the cache's class name, or `backend` when every cache missed)
+- `flippy.cache_hits`: how many features the cache tiers answered
+- `flippy.sync_mode`: `invalidate` or `copy`
+- `http.method`, `url.path`, `http.status_code` and `flippy.attempts`:
+  for calls to Flipper Cloud
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, ContextManager, Protocol
+
+
+class Span(Protocol):
+    def set_attribute(self, key: str, value: Any) -> None:
+        ...
+
+
+class Tracer(Protocol):
+    def start_span(self, name: str, attributes: dict[str, Any]) -> ContextManager[Span]:
+        "Start a span, ending it when the context manager exits."
+        ...
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+tracer: Tracer | None = None
+
+
+def set_tracer(new_tracer: Tracer | None) -> None:
+    "Send spans to `new_tracer` (or turn tracing off with None)."
+    global tracer
+    tracer = new_tracer
+
+
+def span(name: str, attributes: dict[str, Any] | None = None) -> ContextManager[Span]:
+    "A span from the current tracer, or one which does nothing."
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start_span(name, attributes or {})
+
+
+@dataclass
+class RecordedSpan:
+    name: str
+    attributes: dict[str, Any]
+    parent: 'RecordedSpan | None' = None
+    start: float = 0
+    end: float | None = None
+    error: BaseException | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+
+class InMemoryTracer:
+    """
+    Keeps finished spans in `spans`, for tests. Spans started inside another
+    span (on the same thread) record it as their `parent`.
+    """
+    def __init__(self):
+        self.spans: list[RecordedSpan] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def start_span(self, name: str, attributes: dict[str, Any]):
+        stack = self._local.__dict__.setdefault('stack', [])
+        recorded = RecordedSpan(
+            name,
+            dict(attributes),
+            parent=stack[-1] if stack else None,
+            start=time.perf_counter(),
+        )
+        stack.append(recorded)
+        try:
+            yield recorded
+        except BaseException as e:
+            recorded.error = e
+            raise
+        finally:
+            recorded.end = time.perf_counter()
+            stack.pop()
+            with self._lock:
+                self.spans.append(recorded)
+
+    def named(self, name: str) -> list[RecordedSpan]:
+        "Finished spans called `name`, in the order they finished."
+        with self._lock:
+            return [s for s in self.spans if s.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class OpenTelemetryTracer:
+    """
+    Sends spans to OpenTelemetry (which must be installed and configured
+    separately):
+
+    ```python
+    # settings.py
+
+    FLIPPY_TRACER = 'flippy.tracing.OpenTelemetryTracer'
+    ```
+    """
+    def __init__(self, name: str = 'flippy'):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            from django.core.exceptions import ImproperlyConfigured
+            raise ImproperlyConfigured(
+                "OpenTelemetryTracer needs the opentelemetry-api package"
+            )
+        self._tracer = trace.get_tracer(name)
+
+    def start_span(self, name: str, attributes: dict[str, Any]) -> ContextManager[Span]:
+        # OpenTelemetry only takes primitive attribute values
+        attributes = {
+            k: v if isinstance(v, (str, bool, int, float)) else str(v)
+            for k, v in attributes.items()
+        }
+        return self._tracer.start_as_current_span(name, attributes=attributes)
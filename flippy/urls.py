@@ -0,0 +1,9 @@
+from django.urls import path
+
+from flippy import views
+
+app_name = 'flippy'
+
+urlpatterns = [
+    path('webhook', views.webhook, name='webhook'),
+]
@@ -0,0 +1,73 @@
+import hashlib
+import hmac
+import logging
+import time
+from os import environ
+
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from flippy.config import flippy_backend
+from flippy.sync import sync
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'Flipper-Cloud-Signature'
+# how old (in seconds) a signed webhook may be, to limit replays
+SIGNATURE_TOLERANCE = 300
+
+
+def verify_signature(payload: bytes, header: str, secret: str, now: float | None = None) -> bool:
+    """
+    Check a `Flipper-Cloud-Signature` header, which looks like `t=<timestamp>,v1=<signature>`.
+    The signature is a hex HMAC-SHA256 of `<timestamp>.<payload>`, keyed with the sync secret.
+    """
+    timestamp = None
+    signatures = []
+    for part in header.split(','):
+        key, _, value = part.strip().partition('=')
+        if key == 't':
+            timestamp = value
+        elif key == 'v1':
+            signatures.append(value)
+
+    if not timestamp or not signatures:
+        return False
+    try:
+        age = (time.time() if now is None else now) - int(timestamp)
+    except ValueError:
+        return False
+    if abs(age) > SIGNATURE_TOLERANCE:
+        return False
+
+    expected = hmac.new(
+        secret.encode(),
+        timestamp.encode() + b'.' + payload,
+        hashlib.sha256,
+    ).hexdigest()
+    return any(hmac.compare_digest(expected, s) for s in signatures)
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """
+    Receive a webhook from Flipper Cloud, and bring the local backend up to
+    date (see `flippy.sync.sync`). Only this process's in-memory caches are
+    cleared; other processes' expire on their own.
+    """
+    secret = environ.get('FLIPPER_CLOUD_SYNC_SECRET')
+    if not secret:
+        raise ImproperlyConfigured(
+            "FLIPPER_CLOUD_SYNC_SECRET must be set in the environment to receive webhooks"
+        )
+
+    header = request.headers.get(SIGNATURE_HEADER, '')
+    if not verify_signature(request.body, header, secret):
+        logger.warning("Rejected a Flipper Cloud webhook with a bad signature")
+        return HttpResponseBadRequest('bad signature')
+
+    sync(flippy_backend)
+    return JsonResponse({'synced': True})
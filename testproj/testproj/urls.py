@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 
 from testproj import views
 
@@ -25,4 +25,6 @@ urlpatterns = [
     path('setup', views.setup, name='setup'),
     path('control/<str:command>', views.control, name='control'),
     path('app', views.app, name='app'),
+    path('flags', views.flags, name='flags'),
+    path('flippy/', include('flippy.urls')),
 ]
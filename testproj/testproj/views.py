@@ -112,3 +112,19 @@ def app(request):
         'app.html',
         {}
     )
+
+
+def flags(request):
+    # a page which checks many flags, like a navigation bar or a settings
+    # page; ?count=N checks flag_0 through flag_N-1 (see benchmarks/load.py)
+    request.user = USER
+    count = int(request.GET.get('count', 20))
+    names = [f'flag_{i}' for i in range(count)]
+
+    return render(
+        request,
+        'flags.html',
+        {
+            'flags': [(name, request.flippy.is_enabled(name, USER)) for name in names],
+        }
+    )
@@ -0,0 +1,69 @@
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+pytestmark = pytest.mark.django_db
+
+from flippy import accounting, instrumentation, middleware
+
+
+@pytest.fixture
+def accounted(monkeypatch):
+    monkeypatch.setattr(middleware, 'flippy_request_stats', True)
+    monkeypatch.setattr(instrumentation, 'listeners', [accounting.RequestAccounting()])
+
+
+def view(request):
+    request.flippy.create('cool')
+    for _ in range(3):
+        request.flippy.is_enabled('cool')
+    request.flippy.is_enabled('missing')
+    return HttpResponse('ok')
+
+
+def test_request_stats(accounted):
+    request = RequestFactory().get('/')
+    response = middleware.flippy_middleware(view)(request)
+
+    stats = request.flippy_stats
+    assert set(stats.flags) == {'cool', 'missing'}
+    assert stats.evaluations == 4
+    assert [e.outcome for e in stats.flags['missing']] == ['not_found']
+    # create, then one read for each feature
+    assert stats.backend_calls == {'add': 1, 'get': 2}
+    assert stats.queries > 0
+    assert stats.backend_time > 0
+    assert response[accounting.HEADER].startswith(
+        'flags=2; evaluations=4; backend-calls=3; queries='
+    )
+    assert accounting.current.get() is None
+
+
+def test_off_by_default():
+    request = RequestFactory().get('/')
+    response = middleware.flippy_middleware(view)(request)
+
+    assert not hasattr(request, 'flippy_stats')
+    assert accounting.HEADER not in response
+
+
+def test_panel_content(accounted):
+    pytest.importorskip('debug_toolbar')
+    from flippy.panels import FlippyPanel
+
+    class Panel(FlippyPanel):
+        # keep stats on the panel rather than in a toolbar's store
+        def record_stats(self, stats):
+            self.stats = stats
+
+        def get_stats(self):
+            return self.stats
+
+    request = RequestFactory().get('/')
+    response = middleware.flippy_middleware(view)(request)
+    panel = Panel(None, view)
+    panel.generate_stats(request, response)
+
+    content = panel.content
+    assert '4 checks of 2 flags' in content
+    assert '<td>cool</td><td>3</td>' in content
@@ -62,6 +62,12 @@ def test_can_get_some_features(backend: BaseBackend):
     assert f'{TEST_FEATURE}_fifth' in found
 
 
+def test_get_some_features_skips_missing(backend: BaseBackend):
+    backend.add(f'{TEST_FEATURE}_sixth')
+    features = backend.get_multi([f'{TEST_FEATURE}_sixth', f'{TEST_FEATURE}_nonexistent'])
+    assert [f.key for f in features] == [f'{TEST_FEATURE}_sixth']
+
+
 def test_can_remove_feature(backend: BaseBackend):
     remove_me = f'{TEST_FEATURE}_removeme'
     backend.add(remove_me)
@@ -168,3 +174,52 @@ def test_to_json(backend: BaseBackend):
     backend.enable(json_me_2, Gate.PercentageOfActors, 25)
     
     assert backend.to_json() == '{"django_flippy_testcase_jsonme1":{"key":"django_flippy_testcase_jsonme1","state":"on","gates":[{"key":"boolean","name":"boolean","value":true},{"key":"actors","name":"actor","value":[]},{"key":"groups","name":"group","value":[]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":null},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]},"django_flippy_testcase_jsonme2":{"key":"django_flippy_testcase_jsonme2","state":"conditional","gates":[{"key":"boolean","name":"boolean","value":null},{"key":"actors","name":"actor","value":["user1"]},{"key":"groups","name":"group","value":["group1"]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":"25"},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]}}'
+
+
+def test_version_moves_on_write(backend: BaseBackend):
+    before = backend.version()
+    if before is None:
+        # this backend can't tell
+        return
+
+    version_me = f'{TEST_FEATURE}_versionme'
+    backend.add(version_me)
+    after_add = backend.version()
+    assert after_add > before
+
+    backend.enable(version_me, Gate.Actors, 'user1')
+    after_enable = backend.version()
+    assert after_enable > after_add
+
+    # nothing changes, so neither does the version
+    backend.disable(version_me, Gate.Actors, 'user2')
+    assert backend.version() == after_enable
+
+
+def test_get_changed_since(backend: BaseBackend):
+    unchanged = f'{TEST_FEATURE}_unchanged'
+    changed = f'{TEST_FEATURE}_changed'
+    backend.add(unchanged)
+    backend.add(changed)
+    revision = backend.version()
+    if revision is None:
+        # this backend can't tell
+        return
+
+    backend.enable(changed, Gate.Groups, 'group1')
+    assert [f.key for f in backend.get_changed_since(revision)] == [changed]
+    assert backend.get_changed_since(backend.version()) == []
+
+
+def test_get_removed_since(backend: BaseBackend):
+    kept = f'{TEST_FEATURE}_kept'
+    removed = f'{TEST_FEATURE}_removed'
+    backend.add(kept)
+    backend.add(removed)
+    revision = backend.version()
+    known = set(backend.features())
+    assert backend.get_removed_since(revision, known) == set()
+
+    backend.remove(removed)
+    assert backend.get_removed_since(revision, known) == {removed}
+    assert removed not in {f.key for f in backend.get_changed_since(revision)}
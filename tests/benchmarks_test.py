@@ -0,0 +1,19 @@
+from benchmarks.harness import compare, measure
+
+
+def test_measure():
+    stats = measure(lambda: None, repeat=3, min_time=0.01)
+    assert stats['repeat'] == 3
+    assert stats['loops'] >= 1
+    assert 0 < stats['min'] <= stats['median']
+
+
+def test_compare():
+    baseline = {'benchmarks': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'gone': {'median': 1.0}}}
+    results = {'benchmarks': {'a': {'median': 1.1}, 'b': {'median': 1.5}, 'new': {'median': 1.0}}}
+
+    comparisons = {c['name']: c for c in compare(results, baseline, threshold=0.2)}
+    assert set(comparisons) == {'a', 'b'}
+    assert not comparisons['a']['regression']
+    assert comparisons['b']['regression']
+    assert comparisons['b']['ratio'] == 1.5
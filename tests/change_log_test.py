@@ -0,0 +1,133 @@
+import importlib
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from flippy import instrumentation
+from flippy.backends import DjangoBackend, MemoryBackend
+from flippy.core import Gate
+from flippy.exceptions import ChangeLogTruncated
+from flippy.instrumentation import InstrumentedBackend, Metrics
+from tests.backend_shared import TEST_FEATURE
+
+
+@pytest.fixture
+def backend() -> DjangoBackend:
+    return DjangoBackend(change_log_retention=timedelta(days=1))
+
+
+def test_every_write_is_logged(backend: DjangoBackend):
+    start = backend.version()
+    log_me = f'{TEST_FEATURE}_logme'
+    backend.add(log_me)
+    backend.enable(log_me, Gate.Actors, 'user1')
+    backend.enable(log_me, Gate.PercentageOfActors, 30)
+    backend.disable(log_me, Gate.Actors, 'user1')
+    backend.clear(log_me)
+    backend.remove(log_me)
+
+    changes = backend.get_changes_since(start)
+    assert [(c.operation, c.gate, c.thing) for c in changes] == [
+        ('add', None, None),
+        ('enable', Gate.Actors, 'user1'),
+        ('enable', Gate.PercentageOfActors, 30),
+        ('disable', Gate.Actors, 'user1'),
+        ('clear', None, None),
+        ('remove', None, None),
+    ]
+    assert [c.sequence for c in changes] == list(range(start + 1, backend.version() + 1))
+
+
+def test_failed_writes_are_not_logged(backend: DjangoBackend):
+    start = backend.version()
+    backend.enable(f'{TEST_FEATURE}_doesnotexist', Gate.Boolean)
+    backend.disable(f'{TEST_FEATURE}_doesnotexist', Gate.Boolean)
+    assert backend.get_changes_since(start) == []
+
+
+def test_follower_can_replay_changes(backend: DjangoBackend):
+    follower = MemoryBackend()
+    follower.from_json(backend.to_json())
+    sequence = backend.version()
+
+    follow_me = f'{TEST_FEATURE}_followme'
+    backend.add(follow_me)
+    backend.enable(follow_me, Gate.Groups, 'group1')
+    backend.enable(follow_me, Gate.PercentageOfTime, 10)
+    backend.disable(follow_me, Gate.PercentageOfTime)
+
+    changes = backend.get_changes_since(sequence)
+    follower.apply_changes(changes)
+    assert follower.to_json() == backend.to_json()
+    assert changes[-1].sequence == backend.version()
+
+
+def test_from_json_only_logs_differences(backend: DjangoBackend):
+    same = f'{TEST_FEATURE}_same'
+    different = f'{TEST_FEATURE}_different'
+    gone = f'{TEST_FEATURE}_gone'
+    for name in (same, different, gone):
+        backend.add(name)
+
+    source = MemoryBackend()
+    source.add(same)
+    source.add(different)
+    source.enable(different, Gate.Boolean)
+
+    start = backend.version()
+    backend.from_json(source.to_json())
+
+    changes = backend.get_changes_since(start)
+    assert [(c.feature, c.operation) for c in changes] == [
+        (gone, 'remove'),
+        (different, 'clear'),
+        (different, 'enable'),
+    ]
+    assert backend.to_json() == source.to_json()
+
+
+def test_compaction_truncates_log(backend: DjangoBackend):
+    start = backend.version()
+    backend.add(f'{TEST_FEATURE}_compactme')
+    after_add = backend.version()
+
+    # nothing is old enough yet
+    assert backend.compact_change_log() == 0
+
+    assert backend.compact_change_log(timezone.now() + timedelta(seconds=1)) == 1
+    with pytest.raises(ChangeLogTruncated):
+        backend.get_changes_since(start)
+    assert backend.get_changes_since(after_add) == []
+
+
+def test_compact_command(backend: DjangoBackend):
+    backend.add(f'{TEST_FEATURE}_commandme')
+    call_command('compact-change-log', '--days', '-1')
+    with pytest.raises(ChangeLogTruncated):
+        backend.get_changes_since(backend.version() - 1)
+
+
+def test_compact_command_sees_through_instrumentation(backend: DjangoBackend):
+    # as FLIPPY_LISTENERS configures it
+    command = importlib.import_module('flippy.management.commands.compact-change-log')
+    with patch.object(instrumentation, 'listeners', [Metrics()]), \
+            patch.object(command, 'flippy_backend', InstrumentedBackend(backend)):
+        backend.add(f'{TEST_FEATURE}_instrumentme')
+        call_command('compact-change-log', '--days', '-1')
+    with pytest.raises(ChangeLogTruncated):
+        backend.get_changes_since(backend.version() - 1)
+
+
+def test_removed_since_survives_compaction(backend: DjangoBackend):
+    removed = f'{TEST_FEATURE}_compactremoved'
+    backend.add(removed)
+    revision = backend.version()
+    backend.remove(removed)
+    backend.compact_change_log(timezone.now() + timedelta(seconds=1))
+    assert backend.get_removed_since(revision, {removed}) == {removed}
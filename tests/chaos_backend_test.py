@@ -0,0 +1,73 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from flippy import Flippy
+from flippy.backends import BaseBackend, ChaosBackend, MemoryBackend
+from flippy.exceptions import FeatureNotFound
+from tests.backend_shared import *
+
+
+@pytest.fixture
+def backend() -> BaseBackend:
+    # with no chaos configured, it should behave just like the inner backend
+    return ChaosBackend('MemoryBackend')
+
+
+def outcomes(backend: ChaosBackend, n: int = 200) -> list[str]:
+    results = []
+    for _ in range(n):
+        try:
+            backend.get(f'{TEST_FEATURE}_chaos')
+            results.append('ok')
+        except FeatureNotFound:
+            results.append('not_found')
+        except TimeoutError:
+            results.append('timeout')
+    return results
+
+
+def make_chaos(**kwargs) -> ChaosBackend:
+    inner = MemoryBackend()
+    inner.add(f'{TEST_FEATURE}_chaos')
+    return ChaosBackend(inner, **kwargs)
+
+
+def test_errors_are_reproducible():
+    first = outcomes(make_chaos(error_rate=0.2, seed=1))
+    second = outcomes(make_chaos(error_rate=0.2, seed=1))
+    assert first == second
+    assert {'ok', 'not_found', 'timeout'} == set(first)
+    assert 20 < first.count('ok') < 200
+
+
+def test_latency():
+    backend = make_chaos(latency_distribution=('uniform', 0.1, 0.2), seed=1)
+    with patch('flippy.deadline.time.sleep') as sleep:
+        backend.get(f'{TEST_FEATURE}_chaos')
+    assert 0.1 <= sleep.call_args.args[0] <= 0.2
+
+
+def test_unknown_distribution():
+    with pytest.raises(ValueError):
+        ChaosBackend(MemoryBackend(), latency_distribution=('zipf', 2))
+
+
+def test_flippy_survives_chaos():
+    backend = make_chaos(error_rate=1, errors=('timeout',))
+    assert Flippy(backend).is_enabled(f'{TEST_FEATURE}_chaos') == False
+
+
+@pytest.mark.django_db
+def test_timeout_covers_injected_latency():
+    from flippy.backends import DjangoBackend
+    from flippy.registry import FeatureRegistry
+
+    backend = ChaosBackend(DjangoBackend(), latency_distribution=0.5)
+    registry = FeatureRegistry()
+    flippy = Flippy(backend, registry, timeout=0.05)
+    start = time.monotonic()
+    assert flippy.is_enabled(f'{TEST_FEATURE}_chaos') == False
+    assert time.monotonic() - start < 0.4
+    assert registry.timeouts == 1
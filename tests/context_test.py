@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import pytest
+from django.template import Context, Engine, RequestContext, TemplateSyntaxError
+from django.test import RequestFactory
+
+from flippy import Flippy
+from flippy.backends import MemoryBackend
+from flippy.core import Gate
+from flippy.context import FlippyContext, processor
+from flippy.decorators import uses_flags
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+        self.multis = 0
+
+    def get(self, feature):
+        self.gets += 1
+        return super().get(feature)
+
+    def get_multi(self, features):
+        self.multis += 1
+        return [self._features[f] for f in features if f in self._features]
+
+
+@dataclass
+class User:
+    id: int
+
+
+def make_request(backend):
+    request = RequestFactory().get('/')
+    request.flippy = Flippy(backend, memoize=True)
+    return request
+
+
+def test_template_reads_each_flag_once():
+    backend = CountingBackend()
+    backend.add('cool')
+    request = make_request(backend)
+
+    template = Engine().from_string(
+        "{% for i in items %}"
+        "{% if flippy.cool.globally %}yes{% else %}no{% endif %}"
+        "{% if flippy.missing.globally %}?{% endif %}"
+        "{% endfor %}"
+    )
+    rendered = template.render(Context({'items': range(5)} | processor(request)))
+
+    assert rendered == 'no' * 5
+    assert backend.gets == 2
+
+
+def test_feature_context_is_memoized():
+    request = make_request(CountingBackend())
+    request.flippy.create('cool')
+    context = FlippyContext(request)
+    assert context.cool is context.cool
+
+
+def test_memoized_flippy_sees_its_own_writes():
+    request = make_request(CountingBackend())
+    flippy = request.flippy
+    flippy.create('cool')
+    assert flippy.is_enabled('cool') == False
+    flippy.enable('cool')
+    assert flippy.is_enabled('cool') == True
+
+
+def test_uses_flags_prefetches():
+    backend = CountingBackend()
+    backend.add('a')
+    backend.add('b')
+
+    @uses_flags('a', 'b', 'c')
+    def view(request):
+        return [request.flippy.is_enabled(f) for f in 'abc']
+
+    assert view(make_request(backend)) == [False, False, False]
+    assert backend.multis == 1
+    assert backend.gets == 0
+
+
+def test_prefetch_tag():
+    backend = CountingBackend()
+    backend.add('a')
+    backend.add('b')
+    request = make_request(backend)
+
+    engine = Engine(libraries={'flippy': 'flippy.templatetags.flippy'})
+    template = engine.from_string(
+        '{% load flippy %}{% flippy_prefetch "a" "b" %}'
+        '{% if flippy.a.globally %}a{% endif %}{% if flippy.b.globally %}b{% endif %}'
+    )
+    template.render(Context(processor(request)))
+    assert backend.multis == 1
+    assert backend.gets == 0
+
+
+def test_ifflag():
+    backend = CountingBackend()
+    backend.add('cool')
+    backend.enable('cool', Gate.Actors, 'User;1')
+    request = make_request(backend)
+    request.user = User(id=1)
+
+    engine = Engine(libraries={'flippy': 'flippy.templatetags.flippy'})
+    template = engine.from_string(
+        '{% load flippy %}{% for i in items %}'
+        '{% ifflag "cool" for user %}yes{% else %}no{% endifflag %}'
+        '{% ifflag "cool" %}!{% endifflag %}'
+        '{% endfor %}'
+    )
+    context = RequestContext(request, {'items': range(3), 'user': request.user})
+    assert template.render(context) == 'yes' * 3
+    assert backend.gets == 1
+
+
+def test_ifflag_needs_a_literal_name():
+    engine = Engine(libraries={'flippy': 'flippy.templatetags.flippy'})
+    with pytest.raises(TemplateSyntaxError):
+        engine.from_string('{% load flippy %}{% ifflag name %}{% endifflag %}')
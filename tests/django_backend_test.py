@@ -3,6 +3,7 @@ import pytest
 pytestmark = pytest.mark.django_db
 
 from flippy.backends import BaseBackend, DjangoBackend
+from flippy.core import Gate
 from tests.backend_shared import *
 
 
@@ -24,3 +25,86 @@ def test_from_json(backend: BaseBackend):
     assert feat.actors_gate.value == ['user1']
     assert feat.groups_gate.value == ['group1']
     assert feat.percentage_of_actors_gate.value == 25
+
+
+def test_version_file(tmp_path, django_capture_on_commit_callbacks):
+    version_file = tmp_path / 'flippy.version'
+    backend = DjangoBackend(version_file=str(version_file))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        backend.add(f'{TEST_FEATURE}_versionfile')
+    first = backend.version()
+    assert first == DjangoBackend().version()
+    assert version_file.read_text() == str(first)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        backend.enable(f'{TEST_FEATURE}_versionfile', Gate.Boolean)
+    assert backend.version() > first
+
+
+def test_version_file_errors_dont_fail_writes(tmp_path, django_capture_on_commit_callbacks):
+    backend = DjangoBackend(version_file=str(tmp_path / 'missing' / 'flippy.version'))
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert backend.add(f'{TEST_FEATURE}_versionfile') == True
+    assert backend.version() == DjangoBackend().version()
+
+
+def test_get_changed_since_fetches_only_changed(backend: BaseBackend, django_assert_num_queries):
+    for i in range(20):
+        backend.add(f'{TEST_FEATURE}_many{i}')
+    revision = backend.version()
+    backend.enable(f'{TEST_FEATURE}_many3', Gate.Actors, 'user1')
+    backend.enable(f'{TEST_FEATURE}_many7', Gate.Groups, 'group1')
+
+    # features, then prefetched actors and groups
+    with django_assert_num_queries(3):
+        changed = backend.get_changed_since(revision)
+    assert sorted(f.key for f in changed) == [f'{TEST_FEATURE}_many3', f'{TEST_FEATURE}_many7']
+
+
+def test_timeout_stays_on_the_request_connection(backend: BaseBackend):
+    from flippy import Flippy
+
+    # created in this test's transaction, which other connections can't see
+    flippy = Flippy(backend, timeout=2)
+    flippy.create(f'{TEST_FEATURE}_timeout')
+    flippy.enable(f'{TEST_FEATURE}_timeout')
+    assert flippy.is_enabled(f'{TEST_FEATURE}_timeout') == True
+
+
+def slow_query():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+            "SELECT count(*) FROM (SELECT i FROM n LIMIT 100000000)"
+        )
+        return cursor.fetchone()
+
+
+def test_timeout_cancels_slow_queries(backend: DjangoBackend):
+    with pytest.raises(TimeoutError):
+        backend.call_with_deadline(0.05, slow_query)
+    # and the connection still works
+    assert backend.features() is not None
+
+
+def test_timeout_inside_a_transaction_uses_a_savepoint(backend: DjangoBackend):
+    from django.db import connection, transaction
+
+    savepoints = []
+    def slow():
+        savepoints.append(len(connection.savepoint_ids))
+        slow_query()
+
+    with transaction.atomic():
+        backend.add(f'{TEST_FEATURE}_savepoint')
+        outer = len(connection.savepoint_ids)
+        with pytest.raises(TimeoutError):
+            backend.call_with_deadline(0.05, slow)
+        assert savepoints == [outer + 1]
+        # the rest of the transaction carries on
+        assert not connection.needs_rollback
+        assert f'{TEST_FEATURE}_savepoint' in backend.features()
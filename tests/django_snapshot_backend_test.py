@@ -0,0 +1,113 @@
+import importlib
+from unittest.mock import patch
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+from django.core.management import call_command
+
+from flippy.backends import BaseBackend, DjangoBackend, DjangoSnapshotBackend
+from flippy.core import Gate
+from tests.backend_shared import *
+
+
+@pytest.fixture
+def backend() -> BaseBackend:
+    return DjangoSnapshotBackend()
+
+
+# Flipper Cloud does not implement from_json, so this can't be shared
+def test_from_json(backend: BaseBackend):
+    backend.from_json('{"django_flippy_testcase_unjsonme1":{"key":"django_flippy_testcase_unjsonme1","state":"on","gates":[{"key":"boolean","name":"boolean","value":true},{"key":"actors","name":"actor","value":[]},{"key":"groups","name":"group","value":[]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":null},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]},"django_flippy_testcase_unjsonme2":{"key":"django_flippy_testcase_unjsonme2","state":"conditional","gates":[{"key":"boolean","name":"boolean","value":null},{"key":"actors","name":"actor","value":["user1"]},{"key":"groups","name":"group","value":["group1"]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":"25"},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]}}')
+
+    unjson_me_1 = f'{TEST_FEATURE}_unjsonme1'
+    unjson_me_2 = f'{TEST_FEATURE}_unjsonme2'
+
+    assert backend.get(unjson_me_1).state == 'on'
+
+    feat = backend.get(unjson_me_2)
+    assert feat.actors_gate.value == ['user1']
+    assert feat.groups_gate.value == ['group1']
+    assert feat.percentage_of_actors_gate.value == 25
+
+
+def test_snapshot_matches_normalized_tables(backend: BaseBackend):
+    snap_me = f'{TEST_FEATURE}_snapme'
+    backend.add(snap_me)
+    backend.enable(snap_me, Gate.Actors, 'user1')
+    backend.enable(snap_me, Gate.PercentageOfTime, 10)
+    backend.disable(snap_me, Gate.Actors, 'user1')
+    assert backend.to_json() == DjangoBackend().to_json()
+
+
+# reads inside a transaction skip the cache, so these need real commits
+@pytest.mark.django_db(transaction=True)
+def test_get_all_is_one_row(backend: BaseBackend, django_assert_num_queries):
+    for i in range(5):
+        backend.add(f'{TEST_FEATURE}_onerow{i}')
+        backend.enable(f'{TEST_FEATURE}_onerow{i}', Gate.Groups, 'group1')
+
+    # check the version, then fetch the snapshot row
+    with django_assert_num_queries(2):
+        features = DjangoSnapshotBackend().get_all()
+    assert len(features) == 5
+
+
+# reads inside a transaction skip the cache, so these need real commits
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_picks_up_outside_writes(backend: BaseBackend):
+    outside = f'{TEST_FEATURE}_outside'
+    # writing through the backend saves a snapshot
+    backend.add(f'{TEST_FEATURE}_inside')
+    backend.warm_up()
+    DjangoBackend().add(outside)
+    assert outside not in backend.features()
+    backend.rebuild_snapshot()
+    assert outside in backend.features()
+
+
+# reads inside a transaction skip the cache, so these need real commits
+@pytest.mark.django_db(transaction=True)
+def test_warm_reads_only_check_version(backend: BaseBackend, django_assert_num_queries):
+    backend.add(f'{TEST_FEATURE}_warm')
+    backend.warm_up()
+
+    with django_assert_num_queries(1):
+        backend.get(f'{TEST_FEATURE}_warm')
+
+    backend.enable(f'{TEST_FEATURE}_warm', Gate.Boolean)
+    assert backend.get(f'{TEST_FEATURE}_warm').state == 'on'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_reads_are_not_cached(backend: BaseBackend):
+    from django.db import transaction
+
+    backend.warm_up()
+    with pytest.raises(ZeroDivisionError):
+        with transaction.atomic():
+            backend.add(f'{TEST_FEATURE}_rolledback')
+            assert f'{TEST_FEATURE}_rolledback' in backend.features()
+            1 / 0
+
+    # the next write reuses the rolled back version number
+    backend.add(f'{TEST_FEATURE}_committed')
+    assert backend.features() == {f'{TEST_FEATURE}_committed'}
+
+
+def test_reads_without_a_snapshot_dont_write(backend: BaseBackend):
+    from flippy.models import FlippySnapshot
+
+    DjangoBackend().add(f'{TEST_FEATURE}_nosnapshot')
+    assert backend.features() == {f'{TEST_FEATURE}_nosnapshot'}
+    assert not FlippySnapshot.objects.exists()
+
+
+def test_rebuild_command(backend: BaseBackend):
+    from flippy.models import FlippySnapshot
+
+    command = importlib.import_module('flippy.management.commands.rebuild-snapshot')
+    with patch.object(command, 'flippy_backend', backend):
+        call_command('rebuild-snapshot')
+    assert FlippySnapshot.objects.exists()
@@ -0,0 +1,157 @@
+"""
+A stand-in for Flipper Cloud's adapter API, for tests and benchmarks which
+shouldn't touch the network. Use it as an `httpx` transport:
+
+    cloud = FakeFlipperCloud(latency=0.02)
+    backend = FlipperCloudBackend('token', transport=cloud.transport())
+"""
+import json
+import random
+import threading
+import time
+from typing import Callable
+
+import httpx
+
+from flippy.backends import MemoryBackend
+from flippy.core import Gate
+from flippy.exceptions import FeatureNotFound
+
+PREFIX = '/adapter/features'
+
+
+class FakeFlipperCloud:
+    """
+    Keeps its state in a `MemoryBackend`, and answers the endpoints (and
+    error codes) which `FlipperCloudBackend` uses.
+
+    - `latency` is seconds per request, or a function returning them
+    - `error_rate` is the chance of a request failing with `error_status`,
+      or with a connection error if `error_status` is None
+    - `fail_next(n)` makes the next `n` requests fail
+    - `populate(count, actors)` makes a catalog of features of a given size
+    """
+    def __init__(
+            self,
+            latency: float | Callable[[], float] = 0,
+            error_rate: float = 0,
+            error_status: int | None = 503,
+            seed: int | None = None,
+        ):
+        self.backend = MemoryBackend()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests: list[httpx.Request] = []
+        self._random = random.Random(seed)
+        self._failures_left = 0
+        self._lock = threading.Lock()
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self)
+
+    def fail_next(self, n: int = 1) -> None:
+        self._failures_left = n
+
+    def populate(self, count: int, actors: int = 0, prefix: str = 'feature') -> list[str]:
+        "Add `count` features, each enabled for `actors` actors."
+        keys = [f'{prefix}_{i}' for i in range(count)]
+        for key in keys:
+            self.backend.add(key)
+            for actor in range(actors):
+                self.backend.enable(key, Gate.Actors, f'User;{actor}')
+        return keys
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests.append(request)
+            fail = self._failures_left > 0 or self._random.random() < self.error_rate
+            if self._failures_left > 0:
+                self._failures_left -= 1
+            delay = self.latency() if callable(self.latency) else self.latency
+
+        if delay:
+            time.sleep(delay)
+        if fail:
+            if self.error_status is None:
+                raise httpx.ConnectError('injected failure', request=request)
+            return httpx.Response(self.error_status, json={'message': 'injected failure'})
+
+        with self._lock:
+            return self._route(request)
+
+    def _route(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if not path.startswith(PREFIX):
+            return httpx.Response(404)
+        parts = [p for p in path[len(PREFIX):].split('/') if p]
+        body = json.loads(request.content) if request.content else {}
+
+        match request.method, parts:
+            case 'GET', []:
+                return self._list(request.url.params.get('keys'))
+            case 'POST', []:
+                self.backend.add(body['name'])
+                return self._feature(body['name'])
+            case 'GET', [key]:
+                return self._feature(key)
+            case 'DELETE', [key]:
+                self.backend.remove(key)
+                return httpx.Response(204)
+            case 'DELETE', [key, 'clear']:
+                if key not in self.backend.features():
+                    return self._not_found()
+                self.backend.clear(key)
+                return httpx.Response(204)
+            case 'POST' | 'DELETE', [key, gate]:
+                return self._set_gate(request.method, key, Gate(gate), body)
+        return httpx.Response(404)
+
+    def _list(self, keys: str | None) -> httpx.Response:
+        if keys is None:
+            features = self.backend.get_all()
+        else:
+            features = self.backend.get_multi([k for k in keys.split(',') if k])
+        return httpx.Response(200, json={'features': [f.to_api() for f in features]})
+
+    def _feature(self, key: str) -> httpx.Response:
+        try:
+            return httpx.Response(200, json=self.backend.get(key).to_api())
+        except FeatureNotFound:
+            return self._not_found()
+
+    def _set_gate(self, method: str, key: str, gate: Gate, body: dict) -> httpx.Response:
+        if key not in self.backend.features():
+            return self._not_found()
+
+        match gate:
+            case Gate.Boolean:
+                thing = None
+            case Gate.Actors:
+                thing = body.get('flipper_id')
+                if not thing:
+                    return self._error(4, 'Required parameter flipper_id is missing.')
+            case Gate.Groups:
+                thing = body.get('name')
+            case Gate.PercentageOfActors | Gate.PercentageOfTime:
+                try:
+                    thing = int(body.get('percentage', 0))
+                except ValueError:
+                    thing = -1
+                if not 0 <= thing <= 100:
+                    return self._error(3, 'Percentage must be a positive number less than or equal to 100.')
+            case _:
+                return httpx.Response(404)
+
+        if method == 'POST':
+            self.backend.enable(key, gate, thing)
+        else:
+            self.backend.disable(key, gate, thing)
+        return self._feature(key)
+
+    def _not_found(self) -> httpx.Response:
+        return self._error(1, 'Feature not found.', 404)
+
+    @staticmethod
+    def _error(code: int, message: str, status: int = 422) -> httpx.Response:
+        return httpx.Response(status, json={'code': code, 'message': message, 'more_info': ''})
@@ -0,0 +1,44 @@
+import pytest
+
+from flippy.backends import BaseBackend, FlipperCloudBackend
+from flippy.exceptions import (BackendUnavailable, FeatureNotFound,
+                               PercentageInvalid)
+from tests.backend_shared import *
+from tests.fake_flipper_cloud import FakeFlipperCloud
+
+
+@pytest.fixture
+def cloud() -> FakeFlipperCloud:
+    return FakeFlipperCloud()
+
+
+@pytest.fixture
+def backend(cloud: FakeFlipperCloud) -> BaseBackend:
+    return FlipperCloudBackend('token', backoff=0, transport=cloud.transport())
+
+
+def test_error_codes(backend: FlipperCloudBackend):
+    with pytest.raises(FeatureNotFound):
+        backend.get(f'{TEST_FEATURE}_missing')
+
+    backend.add(f'{TEST_FEATURE}_percent')
+    with pytest.raises(PercentageInvalid):
+        backend.enable(f'{TEST_FEATURE}_percent', Gate.PercentageOfActors, 101)
+
+
+def test_injected_errors_are_retried(cloud: FakeFlipperCloud, backend: FlipperCloudBackend):
+    backend.add(f'{TEST_FEATURE}_flaky')
+    cloud.fail_next(2)
+    assert backend.get(f'{TEST_FEATURE}_flaky').key == f'{TEST_FEATURE}_flaky'
+
+    # never read successfully, so there's no last known good value
+    backend.add(f'{TEST_FEATURE}_down')
+    cloud.fail_next(3)
+    with pytest.raises(BackendUnavailable):
+        backend.get(f'{TEST_FEATURE}_down')
+
+
+def test_large_catalog(cloud: FakeFlipperCloud, backend: FlipperCloudBackend):
+    keys = cloud.populate(250, actors=2)
+    assert len(backend.get_multi(keys)) == 250
+    assert len(backend.get_all()) == 250
@@ -0,0 +1,186 @@
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from flippy import Flippy
+from flippy.backends import FlipperCloudBackend
+from flippy.backends.circuitbreaker import CircuitBreaker
+from flippy.core import Feature
+from flippy.exceptions import BackendUnavailable, FeatureNotFound
+from flippy.registry import FeatureRegistry
+
+
+def feature_payload(key, enabled=False):
+    f = Feature(key)
+    f.boolean_gate.value = enabled
+    return f.to_api()
+
+
+class FlakyCloud:
+    "Answers like Flipper Cloud, until it's told to go down."
+    def __init__(self):
+        self.features = {'on': feature_payload('on', True), 'off': feature_payload('off')}
+        self.down = False
+        # an exception class to raise instead of answering
+        self.error = None
+        self.requests = 0
+        self.chunks = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.down:
+            raise httpx.ConnectError('down', request=request)
+        if self.error:
+            raise self.error('broken', request=request)
+        if request.url.path == '/adapter/features':
+            keys = request.url.params.get('keys')
+            if keys is None:
+                found = list(self.features.values())
+            else:
+                self.chunks.append(keys.split(','))
+                found = [self.features[k] for k in keys.split(',') if k in self.features]
+            return httpx.Response(200, json={'features': found})
+        key = request.url.path.rsplit('/', 1)[-1]
+        if key not in self.features:
+            return httpx.Response(404, json={'code': 1, 'message': 'Feature not found.'})
+        return httpx.Response(200, json=self.features[key])
+
+
+@pytest.fixture
+def cloud() -> FlakyCloud:
+    return FlakyCloud()
+
+
+def make_backend(cloud, **kwargs) -> FlipperCloudBackend:
+    kwargs = {'backoff': 0, 'transport': httpx.MockTransport(cloud)} | kwargs
+    return FlipperCloudBackend('token', **kwargs)
+
+
+def test_retries_reads(cloud: FlakyCloud):
+    backend = make_backend(cloud, retries=2)
+    cloud.down = True
+
+    with pytest.raises(BackendUnavailable):
+        backend.get('on')
+    assert cloud.requests == 3
+
+
+def test_breaker_opens(cloud: FlakyCloud):
+    backend = make_backend(cloud, retries=0, failure_threshold=2)
+    cloud.down = True
+
+    for _ in range(2):
+        with pytest.raises(BackendUnavailable):
+            backend.get('on')
+    with pytest.raises(BackendUnavailable):
+        backend.get('on')
+    assert cloud.requests == 2
+
+
+def test_unexpected_error_ends_half_open_trial(cloud: FlakyCloud):
+    backend = make_backend(cloud, retries=0, failure_threshold=1, reset_timeout=0)
+    cloud.down = True
+    with pytest.raises(BackendUnavailable):
+        backend.get('on')
+
+    # the trial fails with something other than a transport error
+    cloud.down = False
+    cloud.error = httpx.TooManyRedirects
+    with pytest.raises(httpx.TooManyRedirects):
+        backend.get('on')
+
+    # and the breaker still allows the next trial, which closes it
+    cloud.error = None
+    assert backend.get('on').boolean_gate.value == True
+
+
+def test_serves_last_known_good(cloud: FlakyCloud):
+    backend = make_backend(cloud, retries=0)
+    assert backend.get('on').boolean_gate.value == True
+    cloud.down = True
+
+    assert backend.get('on').boolean_gate.value == True
+    with pytest.raises(BackendUnavailable):
+        backend.get('off')
+
+
+def test_serves_everything_after_get_all(cloud: FlakyCloud):
+    backend = make_backend(cloud, retries=0)
+    backend.warm_up()
+    cloud.down = True
+
+    assert backend.features() == {'on', 'off'}
+    assert [f.key for f in backend.get_multi(['off', 'on'])] == ['off', 'on']
+    with pytest.raises(FeatureNotFound):
+        backend.get('never_heard_of_it')
+
+
+def test_snapshot_file(cloud: FlakyCloud, tmp_path):
+    path = tmp_path / 'snapshot.json'
+    make_backend(cloud, snapshot_path=str(path)).warm_up()
+    assert set(json.loads(path.read_text())) == {'on', 'off'}
+
+    cloud.down = True
+    backend = make_backend(cloud, retries=0, snapshot_path=str(path))
+    assert backend.get('on').boolean_gate.value == True
+
+
+def test_removed_features_leave_the_snapshot(cloud: FlakyCloud, tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    backend = make_backend(cloud, retries=0, snapshot_path=path)
+    backend.warm_up()
+
+    del cloud.features['on']
+    with pytest.raises(FeatureNotFound):
+        backend.get('on')
+    cloud.down = True
+    with pytest.raises(FeatureNotFound):
+        backend.get('on')
+
+    # nor does it come back from the file
+    restarted = make_backend(cloud, retries=0, snapshot_path=path)
+    assert restarted.features() == {'off'}
+
+
+def test_flippy_uses_default_when_unavailable(cloud: FlakyCloud):
+    registry = FeatureRegistry()
+    registry.declare('safe', default=True)
+    flippy = Flippy(make_backend(cloud, retries=0), registry)
+    cloud.down = True
+
+    assert flippy.is_enabled('on') == False
+    assert flippy.is_enabled('safe') == True
+
+
+def test_get_multi_chunks(cloud: FlakyCloud):
+    for i in range(25):
+        cloud.features[f'f{i}'] = feature_payload(f'f{i}')
+    backend = make_backend(cloud, max_keys_per_request=10)
+
+    keys = [f'f{i}' for i in range(25)] + ['nope']
+    assert [f.key for f in backend.get_multi(keys)] == keys[:-1]
+    assert sorted(len(c) for c in cloud.chunks) == [6, 10, 10]
+
+
+def test_breaker_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    with patch('flippy.backends.circuitbreaker.time.monotonic', return_value=100):
+        breaker.failure()
+        assert breaker.state == 'open'
+        assert not breaker.allow()
+
+    with patch('flippy.backends.circuitbreaker.time.monotonic', return_value=111):
+        assert breaker.state == 'half-open'
+        assert breaker.allow()
+        # only one trial at a time
+        assert not breaker.allow()
+        breaker.failure()
+        assert breaker.state == 'open'
+
+    with patch('flippy.backends.circuitbreaker.time.monotonic', return_value=122):
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.state == 'closed'
+        assert breaker.allow()
@@ -1,10 +1,15 @@
+import threading
+import time
 import warnings
 from dataclasses import dataclass
+from unittest.mock import patch
 
 import pytest
 
 from flippy import Flippy
 from flippy.backends import MemoryBackend
+from flippy.core import Gate
+from flippy.registry import FeatureRegistry
 
 
 @dataclass
@@ -196,3 +201,115 @@ def test_can_get_all_features(flippy: Flippy):
     assert 'first_feature' in features
     assert 'second_feature' in features
     assert 'third_feature' in features
+
+
+class CountingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, feature):
+        self.gets += 1
+        return super().get(feature)
+
+
+def test_missing_features_are_remembered():
+    backend = CountingBackend()
+    flippy = Flippy(backend, FeatureRegistry(miss_ttl=60))
+
+    assert flippy.is_enabled('nope') == False
+    assert flippy.is_enabled('nope') == False
+    assert flippy.feature_exists('nope') == False
+    assert backend.gets == 1
+
+
+def test_missing_features_are_not_remembered_by_default():
+    backend = CountingBackend()
+    flippy = Flippy(backend)
+
+    flippy.is_enabled('nope')
+    flippy.is_enabled('nope')
+    assert backend.gets == 2
+
+
+def test_creating_forgets_missing_feature():
+    flippy = Flippy(MemoryBackend(), FeatureRegistry(miss_ttl=60))
+
+    assert flippy.is_enabled('later') == False
+    flippy.create('later')
+    flippy.enable('later')
+    assert flippy.is_enabled('later') == True
+
+
+def test_missing_feature_expires():
+    backend = CountingBackend()
+    flippy = Flippy(backend, FeatureRegistry(miss_ttl=60))
+
+    flippy.is_enabled('nope')
+    with patch('flippy.registry.time.monotonic', return_value=time.monotonic() + 61):
+        flippy.is_enabled('nope')
+    assert backend.gets == 2
+
+
+def test_declared_default():
+    registry = FeatureRegistry()
+    registry.declare('safe', default=True)
+    flippy = Flippy(MemoryBackend(), registry)
+
+    assert flippy.is_enabled('safe') == True
+    flippy.create('safe')
+    assert flippy.is_enabled('safe') == False
+
+
+def test_declared_only():
+    backend = CountingBackend()
+    registry = FeatureRegistry(declared_only=True)
+    registry.declare('known')
+    flippy = Flippy(backend, registry)
+    flippy.create('known')
+    flippy.create('unknown')
+    flippy.enable('known')
+    flippy.enable('unknown')
+    backend.gets = 0
+
+    assert flippy.is_enabled('known') == True
+    assert flippy.is_enabled('unknown') == False
+    assert flippy.feature_exists('unknown') == False
+    assert backend.gets == 1
+
+
+class SlowBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.slow = threading.Event()
+
+    def get(self, feature):
+        if self.slow.is_set():
+            time.sleep(0.5)
+        return super().get(feature)
+
+
+def test_timeout_uses_default():
+    backend = SlowBackend()
+    backend.add('safe')
+    backend.enable('safe', Gate.Boolean)
+    backend.slow.set()
+    registry = FeatureRegistry()
+    registry.declare('safe', default=False)
+    flippy = Flippy(backend, registry)
+
+    assert flippy.is_enabled('safe', timeout=0.01) == False
+    assert registry.timeouts == 1
+
+
+def test_timeout_uses_last_seen_value():
+    backend = SlowBackend()
+    registry = FeatureRegistry()
+    flippy = Flippy(backend, registry, timeout=0.01)
+    flippy.create('cool')
+    flippy.enable('cool')
+    assert flippy.is_enabled('cool') == True
+
+    backend.slow.set()
+    assert flippy.is_enabled('cool') == True
+    assert registry.timeouts == 1
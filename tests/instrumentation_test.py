@@ -0,0 +1,72 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from flippy import Flippy, instrumentation
+from flippy.backends import MemoryBackend
+from flippy.instrumentation import (Histogram, InstrumentedBackend,
+                                    JSONLinesSink, Metrics)
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    with patch.object(instrumentation, 'listeners', [metrics]):
+        yield metrics
+
+
+def test_counts_evaluations(metrics: Metrics):
+    backend = InstrumentedBackend(MemoryBackend())
+    flippy = Flippy(backend)
+    flippy.create('on')
+    flippy.enable('on')
+
+    flippy.is_enabled('on')
+    flippy.is_enabled('on')
+    flippy.is_enabled('nope')
+
+    snapshot = metrics.snapshot()
+    on = snapshot['features']['on']
+    assert (on['calls'], on['true'], on['false']) == (2, 2, 0)
+    assert on['latency']['count'] == 2
+    nope = snapshot['features']['nope']
+    assert (nope['calls'], nope['false'], nope['not_found']) == (1, 1, 1)
+
+    get = snapshot['backend_calls']['MemoryBackend.get']
+    # two from enable() and is_enabled('on'), one for 'nope'
+    assert get['calls'] == 4
+    assert get['not_found'] == 1
+    assert snapshot['backend_calls']['MemoryBackend.enable']['calls'] == 1
+
+
+def test_broken_listener_is_ignored():
+    class Broken:
+        def evaluated(self, *args):
+            raise RuntimeError('oops')
+
+    with patch.object(instrumentation, 'listeners', [Broken()]):
+        assert Flippy(MemoryBackend()).is_enabled('nope') == False
+
+
+def test_export(tmp_path):
+    path = tmp_path / 'metrics.jsonl'
+    metrics = Metrics(sinks=[JSONLinesSink(str(path))])
+    metrics.evaluated('f', True, 'found', 0.001)
+    metrics.export()
+    metrics.export()
+
+    lines = [json.loads(l) for l in path.read_text().splitlines()]
+    assert lines[0]['features']['f']['true'] == 1
+    # exporting starts counting afresh
+    assert lines[1]['features'] == {}
+
+
+def test_histogram():
+    h = Histogram((0.001, 0.01, 0.1))
+    for value in [0.0005] * 98 + [0.05, 5]:
+        h.observe(value)
+    assert h.counts == [98, 0, 1, 1]
+    assert h.quantile(0.5) == 0.001
+    assert h.quantile(0.99) == 0.1
+    assert h.quantile(1) == float('inf')
@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+from django.core.cache import cache
+
+from flippy.backends import (BaseBackend, DjangoCache, LayeredBackend,
+                             MemoryBackend, MemoryCache)
+from flippy.backends.loading import build_backend
+from flippy.core import Gate
+from tests.backend_shared import *
+
+
+@pytest.fixture
+def backend() -> BaseBackend:
+    cache.clear()
+    return LayeredBackend([MemoryCache(), DjangoCache(), MemoryBackend()])
+
+
+# Flipper Cloud does not implement from_json, so this can't be shared
+def test_from_json(backend: BaseBackend):
+    backend.from_json('{"django_flippy_testcase_unjsonme1":{"key":"django_flippy_testcase_unjsonme1","state":"on","gates":[{"key":"boolean","name":"boolean","value":true},{"key":"actors","name":"actor","value":[]},{"key":"groups","name":"group","value":[]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":null},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]},"django_flippy_testcase_unjsonme2":{"key":"django_flippy_testcase_unjsonme2","state":"conditional","gates":[{"key":"boolean","name":"boolean","value":null},{"key":"actors","name":"actor","value":["user1"]},{"key":"groups","name":"group","value":["group1"]},{"key":"percentage_of_actors","name":"percentage_of_actors","value":"25"},{"key":"percentage_of_time","name":"percentage_of_time","value":null},{"key":"expression","name":"expression","value":null}]}}')
+
+    unjson_me_1 = f'{TEST_FEATURE}_unjsonme1'
+    unjson_me_2 = f'{TEST_FEATURE}_unjsonme2'
+
+    assert backend.get(unjson_me_1).state == 'on'
+
+    feat = backend.get(unjson_me_2)
+    assert feat.actors_gate.value == ['user1']
+    assert feat.groups_gate.value == ['group1']
+    assert feat.percentage_of_actors_gate.value == 25
+
+
+def test_reads_backfill_faster_tiers(backend: LayeredBackend):
+    backfill_me = f'{TEST_FEATURE}_backfillme'
+    backend.backend.add(backfill_me)
+    l1, l2 = backend.caches
+    assert l1.get(backfill_me) is None
+    assert l2.get(backfill_me) is None
+
+    backend.get(backfill_me)
+    assert l1.get(backfill_me) is not None
+    assert l2.get(backfill_me) is not None
+
+    # a fresh L1 is backfilled from L2, without asking the backend
+    backend.caches[0] = MemoryCache()
+    backend.backend.remove(backfill_me)
+    assert backend.get(backfill_me).key == backfill_me
+    assert backend.caches[0].get(backfill_me) is not None
+
+
+def test_get_multi_only_fetches_misses(backend: LayeredBackend):
+    backend.add(f'{TEST_FEATURE}_cached')
+    backend.add(f'{TEST_FEATURE}_uncached')
+    backend.get(f'{TEST_FEATURE}_cached')
+
+    backend.backend.remove(f'{TEST_FEATURE}_cached')
+    features = backend.get_multi([f'{TEST_FEATURE}_cached', f'{TEST_FEATURE}_uncached'])
+    assert [f.key for f in features] == [f'{TEST_FEATURE}_cached', f'{TEST_FEATURE}_uncached']
+
+
+def test_reads_own_writes(backend: LayeredBackend):
+    write_me = f'{TEST_FEATURE}_writeme'
+    backend.add(write_me)
+    assert backend.get(write_me).state == 'off'
+    assert write_me in backend.features()
+
+    backend.enable(write_me, Gate.Boolean)
+    assert backend.get(write_me).state == 'on'
+    assert backend.get_all()[0].state == 'on'
+
+
+def test_invalidate_drops_features_removed_upstream(backend: LayeredBackend):
+    gone = f'{TEST_FEATURE}_gone'
+    backend.add(gone)
+    backend.get_all()
+    backend.get(gone)
+
+    # removed behind the caches' backs, leaving the backend empty
+    backend.backend.remove(gone)
+    assert backend.get(gone).key == gone
+
+    backend.invalidate()
+    for cache in backend.caches:
+        assert cache.get(gone) is None
+        assert cache.get_all() is None
+    assert backend.get_all() == []
+
+
+def test_memory_cache_expires():
+    memory_cache = MemoryCache(ttl=0.01)
+    backend = LayeredBackend([memory_cache, MemoryBackend()])
+    expire_me = f'{TEST_FEATURE}_expireme'
+    backend.add(expire_me)
+    backend.get(expire_me)
+    assert memory_cache.get(expire_me) is not None
+    time.sleep(0.02)
+    assert memory_cache.get(expire_me) is None
+
+
+def test_build_from_settings_style_spec():
+    backend = build_backend([
+        ('MemoryCache', {'ttl': 1}),
+        ('flippy.backends.DjangoCache', {'ttl': 10}),
+        'MemoryBackend',
+    ])
+    assert isinstance(backend, LayeredBackend)
+    assert [type(c) for c in backend.caches] == [MemoryCache, DjangoCache]
+    assert isinstance(backend.backend, MemoryBackend)
+
+
+def test_last_tier_must_be_a_backend():
+    with pytest.raises(ValueError):
+        LayeredBackend([MemoryCache(), MemoryCache()])
+
+
+def test_timeout_covers_cache_tiers():
+    class SlowCache(MemoryCache):
+        def get(self, feature):
+            time.sleep(0.1)
+            return super().get(feature)
+
+    backend = LayeredBackend([SlowCache(), SlowCache(), MemoryBackend()])
+    backend.add(f'{TEST_FEATURE}_slow')
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        backend.call_with_deadline(0.05, backend.get, f'{TEST_FEATURE}_slow')
+    assert time.monotonic() - start < 0.15
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from flippy.backends import FlipperCloudBackend, MemoryBackend
+
+
+def test_default_hooks_are_harmless():
+    backend = MemoryBackend()
+    backend.add('lifecycle_feature')
+    backend.warm_up()
+    backend.after_fork()
+    assert 'lifecycle_feature' in backend.features()
+
+
+def test_flipper_cloud_after_fork_rebuilds_client():
+    backend = FlipperCloudBackend('not-a-real-token')
+    old_client = backend.client
+    backend.after_fork()
+    assert backend.client is not old_client
+    assert backend.client.headers['Flipper-Cloud-Token'] == 'not-a-real-token'
+    assert not old_client.is_closed
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_after_fork_gives_child_a_new_client():
+    backend = FlipperCloudBackend('not-a-real-token')
+    parent_client_id = id(backend.client)
+
+    # as the hook registered by flippy.config would, but without registering
+    # a hook that would outlive this test
+    pid = os.fork()
+    if pid == 0:
+        backend.after_fork()
+        os._exit(0 if id(backend.client) != parent_client_id else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert id(backend.client) == parent_client_id
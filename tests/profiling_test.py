@@ -0,0 +1,92 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.template import Context, Engine
+from django.test import RequestFactory
+
+from flippy import Flippy, profiling
+from flippy.backends import MemoryBackend
+from flippy.context import processor
+from flippy.exceptions import FeatureNotFound
+
+
+@pytest.fixture
+def profiler():
+    profiler = profiling.Profiler(sample_rate=1, threshold=0, interval=None)
+    profiling.set_profiler(profiler)
+    yield profiler
+    profiling.set_profiler(None)
+
+
+def test_records_call_sites(profiler: profiling.Profiler):
+    flippy = Flippy(MemoryBackend(), memoize=True)
+    flippy.create('cool')
+    for _ in range(3):
+        flippy.is_enabled('cool')
+    with pytest.raises(FeatureNotFound):
+        flippy.get_feature_state('missing')
+
+    state, checks = sorted(profiler.report()['sites'], key=lambda s: s['method'])
+    assert checks['method'] == 'is_enabled'
+    assert checks['count'] == 3
+    assert checks['backend'] == 'MemoryBackend'
+    assert checks['outcomes'] == {'found': 1, 'memoized': 2}
+    assert checks['call_site'].startswith(f'{__file__}:')
+    assert checks['call_site'].endswith('(test_records_call_sites)')
+    assert state['method'] == 'get_feature_state'
+    assert state['outcomes'] == {'not_found': 1}
+
+
+def test_template_call_sites(profiler: profiling.Profiler):
+    request = RequestFactory().get('/')
+    request.flippy = Flippy(MemoryBackend(), memoize=True)
+    request.flippy.create('cool')
+
+    template = Engine().from_string(
+        "first line\n"
+        "{% if flippy.cool.globally %}yes{% endif %}\n"
+    )
+    template.render(Context(processor(request)))
+
+    (site,) = profiler.report()['sites']
+    assert site['call_site'].endswith(':2')
+
+
+def test_sampling_and_threshold():
+    flippy = Flippy(MemoryBackend())
+    flippy.create('cool')
+
+    profiler = profiling.Profiler(sample_rate=0.5, threshold=0, interval=None, seed=1)
+    profiling.set_profiler(profiler)
+    try:
+        for _ in range(1000):
+            flippy.is_enabled('cool')
+        assert 400 < profiler.report()['sites'][0]['count'] < 600
+
+        profiler.threshold = 10
+        profiler.report(reset=True)
+        flippy.is_enabled('cool')
+        assert profiler.report()['sites'] == []
+    finally:
+        profiling.set_profiler(None)
+
+
+def test_report_command(profiler: profiling.Profiler, tmp_path):
+    profiler.path = str(tmp_path / 'profile.jsonl')
+    flippy = Flippy(MemoryBackend())
+    flippy.create('cool')
+    for _ in range(2):
+        flippy.is_enabled('cool')
+        profiler.export()
+
+    out = io.StringIO()
+    call_command('flippy-profile', path=profiler.path, json=True, stdout=out)
+    (site,) = json.loads(out.getvalue())
+    assert site['feature'] == 'cool'
+    assert site['count'] == 2
+
+    out = io.StringIO()
+    call_command('flippy-profile', path=profiler.path, stdout=out)
+    assert "is_enabled('cool')" in out.getvalue()
@@ -0,0 +1,141 @@
+import io
+import os
+from dataclasses import dataclass
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from flippy import Flippy, recording
+from flippy.backends import MemoryBackend
+
+
+@dataclass
+class User:
+    id: int
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = recording.Recorder(str(tmp_path / 'trace.jsonl'), sample_rate=1, buffer_size=10)
+    recording.set_recorder(recorder)
+    yield recorder
+    recording.set_recorder(None)
+
+
+@pytest.fixture
+def flippy() -> Flippy:
+    flippy = Flippy(MemoryBackend())
+    flippy.create('cool')
+    flippy.enable_actor('cool', User(1))
+    return flippy
+
+
+def check_some(flippy: Flippy, n: int = 25) -> None:
+    for i in range(n):
+        flippy.is_enabled('cool', User(i % 3))
+    flippy.is_enabled('cool')
+    flippy.is_enabled('missing')
+
+
+def test_record_and_replay(recorder: recording.Recorder, flippy: Flippy):
+    check_some(flippy)
+    recorder.flush()
+    recording.set_recorder(None)
+
+    records = list(recording.read_trace(recording.trace_files(recorder.path)))
+    assert len(records) == 27
+    assert records[1].feature == 'cool'
+    assert records[1].flipper_id == 'User;1'
+    assert records[1].result is True
+    assert records[-2].flipper_id is None
+
+    result = recording.replay(flippy, records)
+    assert result.checks == 27
+    assert result.mismatches == []
+
+    flippy.disable_actor('cool', User(1))
+    result = recording.replay(flippy, records)
+    assert len(result.mismatches) == 8
+
+
+def test_rotation(recorder: recording.Recorder, flippy: Flippy):
+    recorder.max_bytes = 500
+    recorder.backup_count = 2
+    for _ in range(10):
+        check_some(flippy)
+    recorder.flush()
+
+    files = recording.trace_files(recorder.path)
+    assert files == [f'{recorder.path}.2', f'{recorder.path}.1', recorder.path]
+    records = list(recording.read_trace(files))
+    assert 0 < len(records) < 270
+    assert all(r.feature in ('cool', 'missing') for r in records)
+
+
+def test_sampling(tmp_path, flippy: Flippy):
+    recorder = recording.Recorder(str(tmp_path / 'trace.jsonl'), sample_rate=0.1, seed=1)
+    recording.set_recorder(recorder)
+    try:
+        for _ in range(1000):
+            flippy.is_enabled('cool')
+        recorder.flush()
+    finally:
+        recording.set_recorder(None)
+    assert 50 < len(list(recording.read_trace([recorder.path]))) < 150
+
+
+@pytest.mark.django_db
+def test_replay_command(recorder: recording.Recorder, flippy: Flippy):
+    check_some(flippy)
+    recorder.flush()
+    recording.set_recorder(None)
+
+    out = io.StringIO()
+    with pytest.raises(CommandError, match='8 of 27 results differed'):
+        # the configured backend doesn't know 'cool'
+        call_command('flippy-replay', recorder.path, stdout=out)
+    assert "cool for User;1: recorded True, got False" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_replay_command_does_not_record(recorder: recording.Recorder, flippy: Flippy):
+    check_some(flippy)
+    recorder.flush()
+
+    # still recording, into the trace being replayed
+    with pytest.raises(CommandError):
+        call_command('flippy-replay', recorder.path, stdout=io.StringIO())
+    recorder.flush()
+    assert len(list(recording.read_trace([recorder.path]))) == 27
+    assert recording.recorder is recorder
+
+
+def test_write_errors_dont_break_checks(recorder: recording.Recorder, flippy: Flippy, monkeypatch, caplog):
+    recorder.max_bytes = 1
+    check_some(flippy, 10)
+    recorder.flush()
+
+    def broken(*args):
+        raise PermissionError('nope')
+    monkeypatch.setattr(recording.os, 'replace', broken)
+    check_some(flippy, 10)
+    recorder.flush()
+    assert "Couldn't write Flippy checks" in caplog.text
+
+
+def test_rotation_by_another_process(recorder: recording.Recorder, flippy: Flippy, monkeypatch):
+    recorder.max_bytes = 1
+    recorder.buffer_size = 100
+    check_some(flippy, 10)
+    recorder.flush()
+
+    # another process rotates the file between our size check and our rename
+    replace = recording.os.replace
+    def racing(src, dst):
+        if src == recorder.path and os.path.exists(src):
+            replace(src, dst)
+        replace(src, dst)
+    monkeypatch.setattr(recording.os, 'replace', racing)
+    check_some(flippy, 10)
+    recorder.flush()
+    assert len(list(recording.read_trace([recorder.path]))) == 12
@@ -0,0 +1,82 @@
+import threading
+import time
+
+from flippy.backends import DjangoBackend
+from flippy.backends.singleflight import SingleFlight
+from flippy.core import Feature
+from flippy.exceptions import FeatureNotFound
+
+
+def _run_concurrently(fn, count=10):
+    results = [None] * count
+    errors = [None] * count
+
+    def target(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_calls_are_coalesced():
+    flights = SingleFlight()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'value'
+
+    results, errors = _run_concurrently(lambda: flights.do('key', slow_fetch))
+    assert results == ['value'] * 10
+    assert errors == [None] * 10
+    assert len(calls) == 1
+
+
+def test_errors_are_shared():
+    flights = SingleFlight()
+    calls = []
+
+    def slow_miss():
+        calls.append(1)
+        time.sleep(0.05)
+        raise FeatureNotFound('missing')
+
+    results, errors = _run_concurrently(lambda: flights.do('key', slow_miss))
+    assert all(isinstance(e, FeatureNotFound) for e in errors)
+    assert len(calls) == 1
+
+
+def test_sequential_calls_are_not_cached():
+    flights = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flights.do('key', calls.append, 1)
+    assert len(calls) == 3
+
+
+def test_django_backend_coalesces_gets(monkeypatch):
+    backend = DjangoBackend()
+    calls = []
+
+    def slow_get(feature):
+        calls.append(feature)
+        time.sleep(0.05)
+        return Feature(feature)
+
+    monkeypatch.setattr(backend, '_get', slow_get)
+    monkeypatch.setattr(
+        'flippy.backends.django.transaction.get_connection',
+        lambda: type('Connection', (), {'in_atomic_block': False}),
+    )
+
+    results, _ = _run_concurrently(lambda: backend.get('popular_feature'))
+    assert [r.key for r in results] == ['popular_feature'] * 10
+    assert calls == ['popular_feature']
@@ -0,0 +1,103 @@
+import pytest
+
+from flippy import tracing
+from flippy.backends import (DjangoBackend, FlipperCloudBackend,
+                             LayeredBackend, MemoryBackend, MemoryCache)
+from flippy.core import Gate
+from flippy.exceptions import BackendUnavailable
+from flippy.sync import sync
+from tests.fake_flipper_cloud import FakeFlipperCloud
+
+
+@pytest.fixture
+def tracer():
+    tracer = tracing.InMemoryTracer()
+    tracing.set_tracer(tracer)
+    yield tracer
+    tracing.set_tracer(None)
+
+
+def test_no_tracer():
+    assert tracing.tracer is None
+    with tracing.span('anything', {'a': 1}) as s:
+        s.set_attribute('b', 2)
+
+
+def test_nesting_and_errors(tracer: tracing.InMemoryTracer):
+    with pytest.raises(ValueError):
+        with tracing.span('outer'):
+            with tracing.span('inner', {'a': 1}):
+                raise ValueError()
+
+    inner, outer = tracer.spans
+    assert inner.parent is outer
+    assert inner.attributes == {'a': 1}
+    assert isinstance(inner.error, ValueError)
+    assert outer.duration >= inner.duration
+
+
+@pytest.mark.django_db
+def test_django_backend(tracer: tracing.InMemoryTracer):
+    backend = DjangoBackend()
+    backend.add('f')
+    backend.enable('f', Gate.Actors, 'User;1')
+    backend.get('f')
+
+    add, enable = tracer.named('flippy.django.write')
+    assert add.attributes == {'flippy.operation': 'add', 'flippy.feature': 'f'}
+    assert enable.attributes['flippy.gate'] == 'actors'
+    assert tracer.named('flippy.django.get')[0].attributes == {'flippy.feature': 'f'}
+
+
+def test_cache_tiers(tracer: tracing.InMemoryTracer):
+    inner = MemoryBackend()
+    inner.add('f')
+    backend = LayeredBackend([MemoryCache(), inner])
+
+    backend.get('f')
+    backend.get('f')
+    backend.get_multi(['f', 'g'])
+
+    miss, hit = tracer.named('flippy.layered.get')
+    assert miss.attributes['flippy.cache_tier'] == 'backend'
+    assert hit.attributes['flippy.cache_tier'] == 'MemoryCache'
+    assert tracer.named('flippy.layered.get_multi')[0].attributes == {
+        'flippy.features': 2,
+        'flippy.cache_hits': 1,
+    }
+
+
+def test_flipper_cloud_requests(tracer: tracing.InMemoryTracer):
+    cloud = FakeFlipperCloud()
+    backend = FlipperCloudBackend('token', retries=1, backoff=0, transport=cloud.transport())
+    backend.add('f')
+    cloud.fail_next(1)
+    backend.get('f')
+    cloud.fail_next(2)
+    with pytest.raises(BackendUnavailable):
+        backend.get('g')
+
+    assert tracer.named('flippy.cloud.write')[0].attributes == {
+        'flippy.operation': 'add',
+        'flippy.feature': 'f',
+    }
+    ok, failed = tracer.named('flippy.cloud.request')
+    assert ok.attributes == {
+        'http.method': 'GET',
+        'url.path': '/features/f',
+        'flippy.attempts': 2,
+        'http.status_code': 200,
+    }
+    assert failed.attributes['http.status_code'] == 503
+    assert isinstance(failed.error, BackendUnavailable)
+
+
+def test_sync(tracer: tracing.InMemoryTracer):
+    cloud = FakeFlipperCloud()
+    backend = LayeredBackend([MemoryCache(), FlipperCloudBackend('token', transport=cloud.transport())])
+    sync(backend)
+
+    (synced,) = tracer.named('flippy.sync')
+    assert synced.attributes == {'flippy.sync_mode': 'invalidate'}
+    # invalidating clears the caches without asking Flipper Cloud anything
+    assert tracer.named('flippy.cloud.request') == []
@@ -0,0 +1,115 @@
+import hashlib
+import hmac
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.test import RequestFactory
+
+from flippy import instrumentation
+from flippy.backends import (DjangoCache, FlipperCloudBackend, LayeredBackend,
+                             MemoryBackend, MemoryCache)
+from flippy.core import Feature
+from flippy.instrumentation import InstrumentedBackend, Metrics
+from flippy.sync import sync
+from flippy.views import verify_signature, webhook
+
+SECRET = 'shh'
+BODY = b'{"environment_id":1}'
+
+
+def sign(payload: bytes, timestamp: int, secret: str = SECRET) -> str:
+    signature = hmac.new(
+        secret.encode(),
+        f'{timestamp}.'.encode() + payload,
+        hashlib.sha256,
+    ).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def test_verify_signature():
+    now = int(time.time())
+    assert verify_signature(BODY, sign(BODY, now), SECRET)
+    assert not verify_signature(BODY, sign(BODY, now, 'wrong'), SECRET)
+    assert not verify_signature(BODY + b' ', sign(BODY, now), SECRET)
+    assert not verify_signature(BODY, sign(BODY, now - 3600), SECRET)
+    assert not verify_signature(BODY, 'nonsense', SECRET)
+
+
+@pytest.fixture
+def post(monkeypatch):
+    monkeypatch.setenv('FLIPPER_CLOUD_SYNC_SECRET', SECRET)
+    factory = RequestFactory()
+
+    def _post(signature):
+        request = factory.post(
+            '/flippy/webhook',
+            data=BODY,
+            content_type='application/json',
+            headers={'Flipper-Cloud-Signature': signature},
+        )
+        return webhook(request)
+    return _post
+
+
+def test_webhook_syncs(post):
+    with patch('flippy.views.sync') as mock_sync:
+        response = post(sign(BODY, int(time.time())))
+    assert response.status_code == 200
+    mock_sync.assert_called_once()
+
+
+def test_webhook_rejects_bad_signature(post):
+    with patch('flippy.views.sync') as mock_sync:
+        response = post(sign(BODY, int(time.time()), 'wrong'))
+    assert response.status_code == 400
+    mock_sync.assert_not_called()
+
+
+def cloud_with(*keys) -> FlipperCloudBackend:
+    def handler(request: httpx.Request) -> httpx.Response:
+        features = [Feature(k).to_api() for k in keys]
+        if request.url.path == '/adapter/features':
+            return httpx.Response(200, json={'features': features})
+        return httpx.Response(200, json=Feature(request.url.path.rsplit('/', 1)[-1]).to_api())
+    return FlipperCloudBackend('token', transport=httpx.MockTransport(handler))
+
+
+def test_sync_copies_to_local_backend():
+    backend = MemoryBackend()
+    backend.add('stale')
+    sync(backend, cloud_with('fresh'))
+    assert backend.features() == {'fresh'}
+
+
+def test_sync_invalidates_cached_cloud_backend():
+    cache = MemoryCache(ttl=60)
+    backend = LayeredBackend([cache, cloud_with('fresh')])
+    backend.get('fresh')
+    assert cache.get('fresh') is not None
+
+    sync(backend)
+    assert cache.get('fresh') is None
+
+
+def test_sync_sees_through_instrumentation():
+    # as FLIPPY_LISTENERS configures it
+    cache = MemoryCache(ttl=60)
+    backend = InstrumentedBackend(LayeredBackend([cache, cloud_with('fresh')]))
+    with patch.object(instrumentation, 'listeners', [Metrics()]):
+        backend.get('fresh')
+        sync(backend)
+    assert cache.get('fresh') is None
+
+
+def test_sync_clears_shared_tier_for_other_processes():
+    shared = DjangoCache(key_prefix='flippy-webhook-test')
+    cloud = cloud_with('fresh')
+    this_process = LayeredBackend([MemoryCache(), shared, cloud])
+    other_process = LayeredBackend([DjangoCache(key_prefix='flippy-webhook-test'), cloud])
+    other_process.get('fresh')
+    assert shared.get('fresh') is not None
+
+    sync(this_process)
+    assert other_process.caches[0].get('fresh') is None
@@ -0,0 +1,130 @@
+import threading
+
+import httpx
+
+from flippy.backends import FlipperCloudBackend
+from flippy.backends.writebehind import WriteBehindQueue
+from flippy.core import Change, Gate
+
+
+class Recorder:
+    "Applies changes by writing them down; holds the first one until released."
+    def __init__(self):
+        self.applied = []
+        self.release = threading.Event()
+
+    def __call__(self, change: Change):
+        if change.feature == 'blocker':
+            self.release.wait(5)
+        if change.feature == 'broken':
+            raise RuntimeError('nope')
+        self.applied.append(change)
+
+
+def queued(changes: list[Change]) -> list[Change]:
+    "Run changes through a one-worker queue while it's stuck on something else."
+    recorder = Recorder()
+    queue = WriteBehindQueue(recorder, max_workers=1)
+    queue.put(Change('blocker', 'add'))
+    for change in changes:
+        queue.put(change)
+    recorder.release.set()
+    assert queue.flush(5)
+    return recorder.applied[1:]
+
+
+def test_enable_then_disable_coalesces():
+    assert queued([
+        Change('f', 'enable', Gate.Actors, 'a'),
+        Change('f', 'enable', Gate.Actors, 'b'),
+        Change('f', 'disable', Gate.Actors, 'a'),
+    ]) == [
+        Change('f', 'enable', Gate.Actors, 'b'),
+        Change('f', 'disable', Gate.Actors, 'a'),
+    ]
+
+
+def test_percentages_coalesce():
+    assert queued([
+        Change('f', 'enable', Gate.PercentageOfActors, 10),
+        Change('f', 'enable', Gate.PercentageOfActors, 20),
+        Change('f', 'enable', Gate.PercentageOfActors, 30),
+    ]) == [
+        Change('f', 'enable', Gate.PercentageOfActors, 30),
+    ]
+
+
+def test_clear_and_remove_drop_pending_changes():
+    assert queued([
+        Change('f', 'add'),
+        Change('f', 'enable', Gate.Actors, 'a'),
+        Change('f', 'clear'),
+        Change('f', 'enable', Gate.Boolean),
+        Change('g', 'enable', Gate.Boolean),
+        Change('g', 'remove'),
+    ]) == [
+        Change('f', 'add'),
+        Change('f', 'clear'),
+        Change('f', 'enable', Gate.Boolean),
+        Change('g', 'remove'),
+    ]
+
+
+def test_errors_go_to_callback():
+    errors = []
+    queue = WriteBehindQueue(Recorder(), on_error=lambda c, e: errors.append((c, e)))
+    queue.put(Change('broken', 'add'))
+    assert queue.flush(5)
+    assert errors[0][0] == Change('broken', 'add')
+    assert isinstance(errors[0][1], RuntimeError)
+
+
+def test_broken_callback_doesnt_stop_the_queue():
+    def on_error(change, error):
+        raise ValueError('also nope')
+
+    recorder = Recorder()
+    queue = WriteBehindQueue(recorder, on_error=on_error)
+    queue.put(Change('broken', 'add'))
+    assert queue.flush(5)
+    queue.put(Change('broken', 'remove'))
+    queue.put(Change('fine', 'add'))
+    assert queue.flush(5)
+    assert recorder.applied == [Change('fine', 'add')]
+
+
+def test_queues_can_be_garbage_collected():
+    import gc
+    import weakref
+
+    queue = WriteBehindQueue(Recorder())
+    queue.put(Change('fine', 'add'))
+    assert queue.flush(5)
+    # idle workers exit soon after the queue drains
+    for t in threading.enumerate():
+        if t.name == 'flippy-write-behind':
+            t.join(5)
+    ref = weakref.ref(queue)
+    del queue
+    gc.collect()
+    assert ref() is None
+
+
+def test_flipper_cloud_write_behind():
+    requests = []
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append((request.method, request.url.path))
+        return httpx.Response(200, json={})
+
+    backend = FlipperCloudBackend(
+        'token',
+        write_behind=True,
+        transport=httpx.MockTransport(handler),
+    )
+    for actor in range(10):
+        backend.enable('f', Gate.Actors, actor)
+        backend.disable('f', Gate.Actors, actor)
+    assert backend.flush(5)
+
+    assert 0 < len(requests) <= 20
+    assert requests[-1] == ('DELETE', '/adapter/features/f/actors')